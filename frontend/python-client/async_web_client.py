@@ -0,0 +1,127 @@
+import asyncio
+import json_codec
+import websockets
+from new_web_client import WebSocketClient
+
+
+# =========================================
+# asyncio 客户端：收消息、显示文本、喂 TTS、执行动作各自独立
+# =========================================
+# WebSocketClient 在 run_forever 的回调线程里串行处理一切，动作批次中的 time.sleep 会卡住后续所有流式文本。
+# 这里改为一个事件循环 + 多个任务：
+#   receiver    : 只负责收消息、解析、分发到各队列，永不阻塞
+#   text_worker : 打印 / 回调 UI
+#   tts_worker  : 把文本按到达顺序送入 StreamingTTS（放到线程池，避免 TTS 网络发送阻塞事件循环）
+#   action_worker: 串行执行动作批次（放到线程池），GUI 动作之间仍然互斥，但不再影响文本流
+# GUI 方法、截图、编码、二进制帧等全部复用 WebSocketClient。
+
+class ThreadSafeSender:
+    """让同步代码（动作线程、输入线程）通过 ws.send 向事件循环中的连接发消息，接口与 WebSocketApp 一致"""
+
+    def __init__(self, connection, loop):
+        self.connection = connection
+        self.loop = loop
+
+    def send(self, data, opcode=None):
+        # websockets 按 str / bytes 自动选择文本帧或二进制帧，opcode 仅为兼容 WebSocketApp.send 的签名
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        if self._on_loop_thread():
+            # 在事件循环线程里（如 text_worker 中的 UI 回调）等待 future 会卡死循环，只排入任务不等待
+            task = self.loop.create_task(self.connection.send(data))
+            task.add_done_callback(self._report_send_error)
+            return
+        future = asyncio.run_coroutine_threadsafe(self.connection.send(data), self.loop)
+        future.result()
+
+    def _on_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    @staticmethod
+    def _report_send_error(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"\033[91m[ERROR] 发送失败: {task.exception()}\033[0m")
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.connection.close(), self.loop)
+
+
+class AsyncWebSocketClient(WebSocketClient):
+
+    def connect(self):
+        print(f"正在连接到 {self.url}... (asyncio 模式)")
+        asyncio.run(self.run())
+
+    async def run(self):
+        async with websockets.connect(self.url, max_size=None) as connection:
+            loop = asyncio.get_running_loop()
+            self.ws = ThreadSafeSender(connection, loop)
+            self.text_queue = asyncio.Queue()
+            self.tts_queue = asyncio.Queue()
+            self.action_queue = asyncio.Queue()
+
+            workers = [
+                asyncio.create_task(self.text_worker()),
+                asyncio.create_task(self.tts_worker()),
+                asyncio.create_task(self.action_worker()),
+            ]
+            # on_open 里的协商请求和输入线程都走 ThreadSafeSender；ws.send 会等待事件循环，放到线程里调用
+            await asyncio.to_thread(self.on_open, self.ws)
+            try:
+                await self.receiver(connection)
+            finally:
+                for task in workers:
+                    task.cancel()
+                self.on_close(self.ws, None, None)
+
+    async def receiver(self, connection):
+        """收消息 -> 解析 -> 分发，不做任何耗时操作"""
+        try:
+            async for message in connection:
+                try:
+                    response = json_codec.loads(message)
+                    if not self.check_response(response):
+                        continue
+                    self.text_queue.put_nowait(response)
+                    self.tts_queue.put_nowait(response)
+                    call_id = response.get("callId")
+                    actions = response.get("actions", [])
+                    if call_id and actions:
+                        self.action_queue.put_nowait((actions, call_id, response.get("captureAfter", False)))
+                except Exception as e:
+                    print(f"\033[91m解析消息失败: {e}\033[0m")
+        except websockets.ConnectionClosed as e:
+            self.on_error(connection, e)
+
+    async def text_worker(self):
+        while True:
+            response = await self.text_queue.get()
+            try:
+                self.show_text(response)
+            except Exception as e:
+                print(f"\033[91m文本处理失败: {e}\033[0m")
+
+    async def tts_worker(self):
+        while True:
+            response = await self.tts_queue.get()
+            try:
+                await asyncio.to_thread(self.feed_tts, response)
+            except Exception as e:
+                print(f"\033[91mTTS 处理失败: {e}\033[0m")
+
+    async def action_worker(self):
+        while True:
+            actions, call_id, capture_after = await self.action_queue.get()
+            try:
+                # execute_actions 内部通过 self.ws.send 回传结果，对应 ThreadSafeSender
+                await asyncio.to_thread(self.execute_actions, actions, call_id, capture_after)
+            except Exception as e:
+                print(f"\033[91m执行动作失败: {e}\033[0m")
+
+
+if __name__ == "__main__":
+    client = AsyncWebSocketClient("ws://localhost:8600/ws") # 替换为你的后端地址
+    client.connect()
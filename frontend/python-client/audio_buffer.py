@@ -0,0 +1,142 @@
+import threading
+import time
+
+
+# =========================================
+# PCM 环形缓冲 + 抖动缓冲
+# =========================================
+# TTS 回调线程（唯一生产者）写入解码后的 PCM，播放线程（唯一消费者）按固定帧长取出。
+# 读写位置都是单调递增的字节计数，各自只由一方修改，因此读写两端都不加锁；
+# 清空由第三方（UI 线程）发起时只记录“丢弃到哪个写位置”，由消费者在下一帧生效。
+# 存储是一块预分配的 bytearray，内存有上限，播放时也不再为每个小块分配对象。
+
+SAMPLE_RATE = 24000
+BYTES_PER_SAMPLE = 2  # 16bit 单声道
+
+
+def ms_to_bytes(ms, rate=SAMPLE_RATE):
+    """毫秒 -> 字节数，按采样对齐"""
+    return int(rate * ms / 1000) * BYTES_PER_SAMPLE
+
+
+class PcmRingBuffer:
+    """
+    单生产者单消费者的定长 PCM 环形缓冲。
+    播放开始前先攒够 jitter_ms 的音频（抖动缓冲），放空后插入静音并重新攒；
+    生产者调用 end_segment() 表示暂时没有后续音频，此时不足抖动深度也直接播完，放空不计为欠载。
+    """
+
+    def __init__(self, capacity_ms=60000, jitter_ms=100, frame_ms=20, rate=SAMPLE_RATE):
+        self.capacity = ms_to_bytes(capacity_ms, rate)
+        self.jitter_bytes = ms_to_bytes(jitter_ms, rate)
+        self.frame_bytes = ms_to_bytes(frame_ms, rate)
+        self._data = bytearray(self.capacity)
+        self._view = memoryview(self._data)
+        self._write_pos = 0         # 仅生产者修改
+        self._read_pos = 0          # 仅消费者修改
+        self._clear_to = None       # 清空请求：消费者下一次读取时跳到该写位置
+        self._clear_requested_at = 0.0
+        self._draining = False      # 生产者已声明本段结束
+        self._playing = False       # 消费者已越过抖动缓冲，正在连续播放
+        self.data_event = threading.Event()  # 有新数据时置位，播放线程空闲时清除后阻塞等待
+
+        # 统计
+        self.underruns = 0          # 播放途中数据不足、被迫插入静音的次数
+        self.silence_bytes = 0      # 欠载时插入的静音字节数
+        self.overrun_bytes = 0      # 缓冲已满被丢弃的字节数
+        self.cleared_bytes = 0      # 清空丢弃的字节数
+        self.peak_fill = 0          # 缓冲占用峰值（字节）
+        self.clear_latency = None   # 最近一次清空从请求到播放端生效的秒数，即打断到静音的时间
+
+    def available(self):
+        return self._write_pos - self._read_pos
+
+    @property
+    def playing(self):
+        """正在连续播放：此时即使缓冲为空也应继续取帧，由 read_into 补静音并记一次欠载"""
+        return self._playing
+
+    # ---------- 生产者 ----------
+
+    def write(self, pcm_bytes):
+        """写入 PCM，返回实际写入的字节数；空间不足时丢弃超出部分并计入 overrun"""
+        data = memoryview(pcm_bytes).cast("B")
+        free = self.capacity - (self._write_pos - self._read_pos)
+        size = len(data)
+        if size > free:
+            self.overrun_bytes += size - free
+            size = free
+        start = self._write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if size > first:
+            self._view[:size - first] = data[first:size]
+        self._draining = False
+        self._write_pos += size
+        self.peak_fill = max(self.peak_fill, self._write_pos - self._read_pos)
+        self.data_event.set()
+        return size
+
+    def end_segment(self):
+        """暂无后续音频：剩余数据不等抖动缓冲直接播放，放空不计欠载"""
+        self._draining = True
+        self.data_event.set()
+
+    def clear(self):
+        """立即丢弃已缓冲的音频（可从任意线程调用，下一帧生效）"""
+        self._clear_requested_at = time.perf_counter()
+        self._clear_to = self._write_pos
+
+    # ---------- 消费者 ----------
+
+    def read_into(self, frame):
+        """
+        填满一帧（可写缓冲，如 bytearray），返回其中真实音频的字节数，其余补静音。
+        返回 0 表示整帧都是静音。
+        """
+        clear_to = self._clear_to
+        if clear_to is not None:
+            self._clear_to = None
+            if clear_to > self._read_pos:
+                self.clear_latency = time.perf_counter() - self._clear_requested_at
+                self.cleared_bytes += clear_to - self._read_pos
+                self._read_pos = clear_to
+            self._playing = False
+
+        frame = memoryview(frame)
+        want = len(frame)
+        available = self._write_pos - self._read_pos
+        if not self._playing:
+            if available == 0 or (available < self.jitter_bytes and not self._draining):
+                frame[:] = bytes(want)
+                return 0
+            self._playing = True
+
+        size = min(want, available)
+        start = self._read_pos % self.capacity
+        first = min(size, self.capacity - start)
+        frame[:first] = self._view[start:start + first]
+        if size > first:
+            frame[first:size] = self._view[:size - first]
+        self._read_pos += size
+
+        if size < want:
+            frame[size:] = bytes(want - size)
+            self._playing = False
+            if not self._draining:
+                self.underruns += 1
+                self.silence_bytes += want - size
+        return size
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "jitter_bytes": self.jitter_bytes,
+            "buffered": self.available(),
+            "peak_fill": self.peak_fill,
+            "underruns": self.underruns,
+            "silence_bytes": self.silence_bytes,
+            "overrun_bytes": self.overrun_bytes,
+            "cleared_bytes": self.cleared_bytes,
+            "clear_latency": self.clear_latency,
+        }
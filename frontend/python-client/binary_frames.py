@@ -0,0 +1,68 @@
+import json
+import struct
+
+
+# =========================================
+# 二进制 WebSocket 帧：替代 base64-in-JSON 传输截图 / 音频
+# =========================================
+# 帧格式（网络字节序）：
+#   magic(2s) = b"NG" | version(B) | type(B) | code(H) | callId 长度(B) | callId(utf-8) | 原始负载字节
+# 头部固定 7 字节 + callId，负载为原始 JPEG / PCM，省去 base64 的 33% 膨胀以及两端的编解码。
+#
+# 协商：连接建立后客户端发送 {"type": "capabilities", "data": "binary-frames/1"}，
+# 服务端回以同 type、content 为 "binary-frames/1" 的 BaseResponse 才切换；未收到确认则一直使用 JSON。
+
+MAGIC = b"NG"
+VERSION = 1
+CAPABILITY = "binary-frames/1"
+HEADER = struct.Struct("!2sBBHB")
+
+# BaseRequest.type 与二进制类型编号的映射
+FRAME_TYPES = {
+    "screen shot": 1,
+    "screen shot delta": 2,
+    "action result": 3,
+    "audio": 4,
+}
+FRAME_TYPE_NAMES = {value: key for key, value in FRAME_TYPES.items()}
+
+
+def capability_request():
+    """连接建立后发送的能力协商请求（JSON 文本帧）"""
+    return json.dumps({
+        "type": "capabilities",
+        "data": CAPABILITY,
+        "code": 200,
+        "callId": None
+    })
+
+
+def encode_frame(req_type, data, code, call_id):
+    """把 BaseRequest 打包成二进制帧，data 为 bytes / bytearray / memoryview / uint8 ndarray"""
+    type_id = FRAME_TYPES.get(req_type)
+    if type_id is None:
+        raise ValueError(f"类型 {req_type} 不支持二进制帧")
+    call_id_bytes = (call_id or "").encode("utf-8")
+    if len(call_id_bytes) > 255:
+        raise ValueError("callId 过长，二进制帧最多 255 字节")
+    header = HEADER.pack(MAGIC, VERSION, type_id, code or 0, len(call_id_bytes))
+    # 一次拼接成完整帧；memoryview 避免 ndarray 负载的额外中间拷贝
+    return b"".join((header, call_id_bytes, memoryview(data).cast("B")))
+
+
+def decode_frame(frame):
+    """解析二进制帧，返回 {"type", "code", "callId", "data"}，data 为负载的 memoryview（零拷贝）"""
+    view = memoryview(frame)
+    if len(view) < HEADER.size:
+        raise ValueError("二进制帧长度不足")
+    magic, version, type_id, code, call_id_len = HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"无法识别的二进制帧: magic={magic}, version={version}")
+    offset = HEADER.size
+    call_id = bytes(view[offset:offset + call_id_len]).decode("utf-8")
+    return {
+        "type": FRAME_TYPE_NAMES.get(type_id, type_id),
+        "code": code,
+        "callId": call_id or None,
+        "data": view[offset + call_id_len:],
+    }
@@ -0,0 +1,50 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# =========================================
+# 可替换的 JSON 编解码
+# =========================================
+# 安装了 orjson 时默认使用它（解析流式 token、序列化截图载荷都快数倍），否则回退到标准库 json。
+# 调用方统一写 json_codec.loads / json_codec.dumps，运行时可用 set_backend 切换（基准测试对比用）。
+# 两个后端输出一致：紧凑分隔符、非 ASCII 字符原样输出，dumps 总是返回 str，可直接作为文本帧发送。
+
+BACKENDS = ("orjson", "json")
+
+BACKEND = None
+loads = None
+dumps = None
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != "orjson" or orjson is not None]
+
+
+def set_backend(name=None):
+    """切换后端；name 为 None 时优先 orjson，返回实际使用的后端名"""
+    global BACKEND, loads, dumps
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    if name not in available_backends():
+        raise ValueError(f"JSON 后端 {name} 不可用，可选: {available_backends()}")
+    if name == "orjson":
+        loads, dumps = orjson.loads, _orjson_dumps
+    else:
+        loads, dumps = json.loads, _json_dumps
+    BACKEND = name
+    return name
+
+
+set_backend()
@@ -0,0 +1,145 @@
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+
+# =========================================
+# 端到端时延追踪
+# =========================================
+# 一轮对话：松开按键 -> ASR 最终结果 -> 发送聊天 -> 首个流式 token -> 首句提交 TTS
+#          -> 首个音频 delta -> 扬声器首次出声。
+# 各模块在对应位置调用 tracer.mark(stage)，时间戳取 time.perf_counter()（单调时钟）。
+# 每个阶段每轮只记第一次；热路径上已记录过的 mark 只是一次字典查找，可常驻生产环境。
+# 一轮结束（出声）后由后台线程追加写入 JSONL，不在音频回调里做 I/O。
+
+STAGES = ("key_release", "asr_final", "chat_send", "first_token", "sentence_commit", "first_delta", "first_audio")
+# 开启新一轮的阶段：按键总是新一轮；打字发送时若本轮已发送过也开启新一轮
+START_STAGES = ("key_release", "chat_send")
+# 阶段前提：前提阶段尚未出现时忽略该 mark，避免上一轮迟到的事件记到本轮
+REQUIRES = {
+    "asr_final": "key_release",
+    "first_token": "chat_send",
+    "sentence_commit": "first_token",
+    "first_delta": "sentence_commit",
+    "first_audio": "sentence_commit",
+}
+FINAL_STAGE = "first_audio"
+
+
+class TurnTracer:
+    def __init__(self, path=None, keep=500):
+        self.path = path
+        self.lock = threading.Lock()
+        self.turn_id = 0
+        self.current = None                 # 当前轮 {stage: perf_counter 秒}
+        self.turns = deque(maxlen=keep)     # 最近完成（或被下一轮取代）的轮次，供 summary 使用
+        self._pending = queue.Queue()
+        if path:
+            threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def mark(self, stage, at=None):
+        turn = self.current
+        if stage not in START_STAGES and (turn is None or stage in turn):
+            return  # 热路径：不加锁直接返回
+        with self.lock:
+            turn = self.current
+            if stage in START_STAGES and (turn is None or stage == "key_release" or stage in turn):
+                self._close(turn)
+                self.turn_id += 1
+                turn = self.current = {"turn": self.turn_id, "wall": time.time()}
+            # 没有前提的阶段用每轮都有的 "turn" 键代替
+            elif turn is None or stage in turn or REQUIRES.get(stage, "turn") not in turn:
+                return
+            turn[stage] = time.perf_counter() if at is None else at
+            if stage == FINAL_STAGE:
+                self._close(turn)
+                self.current = None
+
+    def _close(self, turn):
+        if turn is None or len(turn) <= 3:
+            return  # 只有起点的轮次（如按键后没说话）不记录
+        record = self.to_record(turn)
+        self.turns.append(record)
+        if self.path:
+            self._pending.put(record)
+
+    @staticmethod
+    def to_record(turn):
+        marks = [(stage, turn[stage]) for stage in STAGES if stage in turn]
+        origin = marks[0][1]
+        record = {
+            "turn": turn["turn"],
+            "wall": round(turn["wall"], 3),
+            "complete": FINAL_STAGE in turn,
+            "at_ms": {stage: round((t - origin) * 1000, 1) for stage, t in marks},
+            "stage_ms": {},
+        }
+        # 每个阶段相对上一个已记录阶段的耗时
+        for (_, previous), (stage, t) in zip(marks, marks[1:]):
+            record["stage_ms"][stage] = round((t - previous) * 1000, 1)
+        return record
+
+    def _write_loop(self):
+        while True:
+            record = self._pending.get()
+            if isinstance(record, threading.Event):  # flush() 的标记
+                record.set()
+                continue
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"[LatencyTrace error] {e}")
+
+    def flush(self, timeout=2.0):
+        """等待已完成的轮次写入文件（测试与退出时用）"""
+        if not self.path:
+            return
+        done = threading.Event()
+        self._pending.put(done)
+        done.wait(timeout)
+
+    def summary(self):
+        return summarize(list(self.turns))
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(records):
+    """各阶段耗时与总时延的 p50 / p90 / p99，records 为 to_record 的结果"""
+    rows = {}
+    for stage in STAGES[1:] + ("total",):
+        if stage == "total":
+            values = [max(r["at_ms"].values()) for r in records if r["complete"]]
+        else:
+            values = [r["stage_ms"][stage] for r in records if stage in r["stage_ms"]]
+        if values:
+            rows[stage] = {"n": len(values), "p50": percentile(values, 0.5),
+                           "p90": percentile(values, 0.9), "p99": percentile(values, 0.99)}
+    return rows
+
+
+def format_summary(rows):
+    lines = [f"{'stage':<17}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"]
+    for stage, row in rows.items():
+        lines.append(f"{stage:<17}{row['n']:>6}{row['p50']:>10.1f}{row['p90']:>10.1f}{row['p99']:>10.1f}")
+    return "\n".join(lines)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    # python latency_trace.py latency_trace.jsonl
+    if len(sys.argv) != 2:
+        print("用法: python latency_trace.py <trace.jsonl>")
+        sys.exit(1)
+    print(format_summary(summarize(load(sys.argv[1]))))
@@ -1,95 +1,247 @@
-import json
 import time
 import base64
 import sys
 import threading
 import select
+from collections import deque
 import websocket
 import cv2
-import numpy as np
 import pyautogui
 import pyperclip
-from mss import mss
 from voiceConverter import StreamingTTS
+from screen_codec import DeltaFrameEncoder, FixedEncoder, FrameCache
+from screen_capture import ScreenCaptureWorker, ScreenSettleDetector
+import binary_frames
+import json_codec
+
+
+class StreamEcho:
+    """流式文本的控制台回显：攒够 max_chars 个字符或缓冲的文本等待满 interval 秒才写一次终端，
+    代替每个 token 一次 print(flush=True)；enabled=False 时完全不输出。
+    流中途停顿时由定时器补一次输出，不必等到下一个 token 才显示已到达的文本。"""
+
+    def __init__(self, enabled=True, max_chars=64, interval=0.1, stream=None):
+        self.enabled = enabled
+        self.max_chars = max_chars
+        self.interval = interval
+        self.stream = stream
+        self.parts = []
+        self.chars = 0
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def write(self, text):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.parts.append(text)
+            self.chars += len(text)
+            delay = self.interval - (time.monotonic() - self.last_flush)
+            if self.chars >= self.max_chars or delay <= 0:
+                self._flush_locked()
+            elif self._timer is None:
+                self._start_timer(delay)
+
+    def end(self):
+        """流结束：输出剩余文本并换行"""
+        if self.enabled:
+            with self._lock:
+                self.parts.append("\n\n")
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _start_timer(self, delay):
+        # 按攒够字符数刷新时不取消定时器：每次刷新都新建线程的开销比回显本身还大
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            if not self.parts:
+                return
+            delay = self.interval - (time.monotonic() - self.last_flush)
+            if delay <= 0:
+                self._flush_locked()
+            else:
+                self._start_timer(delay)
+
+    def _flush_locked(self):
+        self.last_flush = time.monotonic()
+        if not self.parts:
+            return
+        stream = self.stream or sys.stdout
+        stream.write("".join(self.parts))
+        stream.flush()
+        self.parts.clear()
+        self.chars = 0
 
 
 class WebSocketClient:
-    def __init__(self, url, text_callback=None):
+    def __init__(self, url, text_callback=None, screenshot_mode="full", screen_encoder=None, prefer_binary=False,
+                 tts=None, capture=None, settle_mode="fixed", frame_cache=False, tracer=None, echo=True):
         self.url = url
         self.text_callback = text_callback
         self.ws = None
         self.is_connected = False
         self.running = True
         self.should_tts = True  # 是否允许 TTS
+        # 二进制帧：prefer_binary 时连接后发起协商，服务端确认后截图改用原始字节发送
+        self.prefer_binary = prefer_binary
+        self.binary_frames = False
         
-        # 屏幕捕获初始化
-        tmp_sct = mss()
-        monitor = tmp_sct.monitors[1]
-        self.screen_width = monitor["width"]
-        self.screen_height = monitor["height"]
-        tmp_sct.close()
+        # 屏幕捕获初始化：常驻截屏线程，分辨率也由它读取（可传入已启动的 capture / tts，便于离线测试替换）
+        if capture is None:
+            capture = ScreenCaptureWorker()
+            capture.start()
+        self.capture = capture
+        self.screen_width = self.capture.width
+        self.screen_height = self.capture.height
+        # 普通截图直接取环形缓冲里最新的帧；截屏线程空闲停采后最新帧可能已过时，超过该秒数才等待新帧
+        self.frame_max_age = 0.25
         print(f"[INFO] 屏幕分辨率: {self.screen_width}x{self.screen_height}")
 
+        # 动作后等待：fixed 固定 sleep(wait)；adaptive 采样画面，稳定即返回，wait 作为上限
+        self.settle_mode = settle_mode
+        self.settle_detector = ScreenSettleDetector(self.capture)
+        self.settle_log = deque(maxlen=200)  # (动作, 实际等待秒数, 是否在上限前稳定)
+
+        # 截图模式：full 每次发送完整 JPEG；delta 只发送变化区域（需服务端持有 DeltaFrameDecoder）
+        self.screenshot_mode = screenshot_mode
+        self.delta_encoder = DeltaFrameEncoder()
+        # 截图编码：默认固定 JPEG 85；传入 EncoderAutoTuner 可按体积 / 耗时预算自动选择格式、质量和缩放
+        self.screen_encoder = screen_encoder or FixedEncoder()
+        self.encode_stats = deque(maxlen=100)  # 最近每帧的编码耗时与字节数
+        # 截图去重：full 模式下画面与近期已发送的某帧相同时，只回传那次截图的 callId（需服务端按 callId 保留近期截图）
+        self.frame_cache = FrameCache() if frame_cache else None
+
         # PyAutoGUI 配置
         pyautogui.PAUSE = 0.1
         pyautogui.FAILSAFE = True
         self.scale = 1 # 普通屏幕为1，高分屏按需调整
-        self.tts = StreamingTTS()
-        self.tts.start()
+        if tts is None:
+            tts = StreamingTTS()
+            tts.start()
+        self.tts = tts
+        self.tracer = tracer  # latency_trace.TurnTracer，记录发送聊天与首个流式 token
+        # 流式文本的控制台回显：True / False，或传入自定义的 StreamEcho
+        self.echo = echo if isinstance(echo, StreamEcho) else StreamEcho(enabled=echo)
+
+        # 按消息类型分发：流式 token 走最短路径，其余类型走通用处理
+        self.handlers = {
+            "stream": self.handle_stream,
+            "capabilities": self.handle_capabilities,
+        }
 
     # ---------------- 核心逻辑：消息处理 ----------------
 
     def on_message(self, ws, message):
         """收到服务端 BaseResponse 的处理逻辑"""
         try:
-            response = json.loads(message)
-            type = response.get("type")
-            code = response.get("code")
-            content = response.get("content")
-            call_id = response.get("callId")
-            actions = response.get("actions", [])
-            end = response.get("end", False)
-
-            # 1. 检查状态码
-            if code != 200:
-                print(f"\033[91m[ERROR] 服务端错误 ({code}): {response.get('message')}\033[0m")
-                return
-            
-            # 2. 打印 AI 回应内容，调用 qwen_tts 处理语音合成
-            if type and type == 'stream':
-
-                if content:
-                    print(content, end="", flush=True)
-
-                    if self.text_callback:
-                        self.text_callback(content)
-
-                    if self.should_tts:
-                        self.tts.process_llm_chunk(content)
-
-                if end:
-                    print("\n")
-
-            else:
-                if content and str(content).strip():
-
-                    print(f"\n🤖 AI: {content}")
-
-                    if self.text_callback:
-                        self.text_callback(content)
-
-                    self.tts.process_llm_chunk(content)
-
-
-            # 3. 执行 Actions
-            if call_id and actions:
-                self.execute_actions(actions, call_id)
-
+            response = json_codec.loads(message)
+            self.handlers.get(response.get("type"), self.handle_response)(response)
         except Exception as e:
             print(f"\033[91m解析消息失败: {e}\033[0m")
 
-    def execute_actions(self, actions, call_id):
-        """Execute an action batch and send exactly one result for the call_id."""
+    def handle_stream(self, response):
+        """流式 token：每个字段只取一次，回显、UI 回调与 TTS 共用"""
+        if response.get("code") != 200:
+            self.report_error(response)
+            return
+        content = response.get("content")
+        end = response.get("end", False)
+        self.show_stream(content, end)
+        self.feed_stream(content, end)
+        self.run_actions(response)
+
+    def handle_response(self, response):
+        """非流式回应：状态码检查 -> 打印 -> TTS -> 执行 Actions"""
+        if response.get("code") != 200:
+            self.report_error(response)
+            return
+        self.show_text(response)
+        self.feed_tts(response)
+        self.run_actions(response)
+
+    def handle_capabilities(self, response):
+        """二进制帧协商确认"""
+        self.binary_frames = self.prefer_binary and response.get("content") == binary_frames.CAPABILITY
+        print(f"[INFO] 二进制帧: {'已启用' if self.binary_frames else '未启用'}")
+
+    def report_error(self, response):
+        self.echo.flush()
+        print(f"\033[91m[ERROR] 服务端错误 ({response.get('code')}): {response.get('message')}\033[0m")
+
+    def run_actions(self, response):
+        call_id = response.get("callId")
+        actions = response.get("actions")
+        if call_id and actions:
+            self.echo.flush()
+            # captureAfter：服务端希望动作完成后直接附带截图
+            self.execute_actions(actions, call_id, response.get("captureAfter", False))
+
+    def check_response(self, response):
+        """处理二进制帧协商确认并检查状态码，返回 False 表示该消息无需继续处理"""
+        if response.get("type") == "capabilities":
+            self.handle_capabilities(response)
+            return False
+        if response.get("code") != 200:
+            self.report_error(response)
+            return False
+        return True
+
+    def show_text(self, response):
+        """打印 AI 回应内容并回调 UI"""
+        content = response.get("content")
+        if response.get("type") == 'stream':
+            self.show_stream(content, response.get("end", False))
+
+        elif content and str(content).strip():
+            self.echo.flush()
+            print(f"\n🤖 AI: {content}")
+            if self.text_callback:
+                self.text_callback(content)
+
+    def show_stream(self, content, end):
+        if content:
+            self.echo.write(content)
+            if self.text_callback:
+                self.text_callback(content)
+        if end:
+            self.echo.end()
+
+    def feed_tts(self, response):
+        """把回应文本送入 TTS；流式文本受 should_tts 控制"""
+        content = response.get("content")
+        if response.get("type") == 'stream':
+            self.feed_stream(content, response.get("end", False))
+
+        elif content and str(content).strip():
+            if self.tracer:
+                self.tracer.mark("first_token")
+            self.tts.process_llm_chunk(content)
+            self.tts.flush_pending()
+
+    def feed_stream(self, content, end):
+        if content:
+            if self.tracer:
+                self.tracer.mark("first_token")
+            if self.should_tts:
+                self.tts.process_llm_chunk(content)
+        # 流结束时提交没有以标点结尾的剩余文本
+        if end and self.should_tts:
+            self.tts.flush_pending()
+
+    def execute_actions(self, actions, call_id, capture_after=False):
+        """Execute an action batch and send exactly one result for the call_id.
+
+        With capture_after the post-settle screenshot is returned in the same response.
+        """
         if len(actions) == 1 and actions[0].get("command", "").upper() == "SCREENSHOT":
             self.handle_screenshot(call_id)
             return
@@ -119,7 +271,10 @@ class WebSocketClient:
                 self.send_base_request("action result", error_msg, 504, call_id)
                 return
         if len(actions) > 1:
-            time.sleep(1)  # Ensure all actions have completed before sending the result
+            self.settle(1, "batch")  # Ensure all actions have completed before sending the result
+        if capture_after:
+            self.send_result_with_screenshot(" | ".join(results), call_id)
+            return
         self.send_base_request("action result", " | ".join(results), 200, call_id)
 
     def execute_action(self, action, call_id):
@@ -152,55 +307,100 @@ class WebSocketClient:
             self.send_base_request("action result", str(e), 504, call_id)
 
     def send_base_request(self, req_type, data, code, call_id):
-        """发送 BaseRequest 到服务端"""
+        """发送 BaseRequest 到服务端；data 为字节时，已协商则走二进制帧，否则回退为 base64 字符串"""
+        if isinstance(data, (bytes, bytearray, memoryview)) or hasattr(data, "__array_interface__"):
+            if self.binary_frames:
+                frame = binary_frames.encode_frame(req_type, data, code, call_id)
+                self.ws.send(frame, opcode=websocket.ABNF.OPCODE_BINARY)
+                return
+            data = base64.b64encode(data).decode('utf-8')
         payload = {
             "type": req_type,
             "data": data,
             "code": code,
             "callId": call_id
         }
-        self.ws.send(json.dumps(payload))
+        self.ws.send(json_codec.dumps(payload))
 
     # ---------------- 工具函数：截图与坐标 ----------------
 
+    def capture_frame(self, max_size=1024, newer_than=None):
+        """截屏 -> 转 BGR -> 缩放到最长边不超过 max_size
+
+        newer_than 为 time.monotonic() 时间戳时只接受该时刻之后采集的帧（动作后截图）；
+        否则取已就绪的最新帧，只在它比 frame_max_age 更旧时才等待。
+        """
+        if newer_than is None:
+            newer_than = time.monotonic() - self.frame_max_age
+        # latest 返回的是环形缓冲槽位的视图，转换期间可能被工作线程覆盖，因此取锁内拷贝
+        frame, _, _ = self.capture.latest(newer_than=newer_than, copy=True)
+        img = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+        h, w = img.shape[:2]
+        if max(h, w) > max_size:
+            scale = max_size / max(h, w)
+            new_w, new_h = int(w * scale), int(h * scale)
+            # 使用 INTER_AREA 插值法，这是缩小图片时的最佳实践
+            img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+            print(f"[DEBUG] 缩放图片从 {w}x{h} 到 {new_w}x{new_h}")
+        return img
+
+    def encode_screenshot(self, call_id, newer_than=None):
+        """截屏并编码，返回 (请求类型, 数据)：增量模式为 JSON 载荷，缓存命中为先前截图的 callId，否则为编码后的原始字节"""
+        # 1. 截屏并缩放
+        img = self.capture_frame(newer_than=newer_than)
+
+        # 2. 增量模式：只发送变化区域 / 无变化标记 / 周期关键帧
+        if self.screenshot_mode == "delta":
+            payload = self.delta_encoder.encode(img)
+            print(f"[DEBUG] 增量截图: {payload['mode']} seq={payload['seq']}")
+            return "screen shot delta", json_codec.dumps(payload)
+
+        # 3. 与近期已发送的帧相同：只回传引用，省去编码和上传
+        signature = None
+        if self.frame_cache is not None:
+            ref, signature = self.frame_cache.lookup(img)
+            if ref is not None:
+                print(f"[DEBUG] 截图与 {ref} 相同，发送引用 {self.frame_cache.stats()}")
+                return "screen shot ref", ref
+
+        # 4. 编码（默认 JPEG 85），记录每帧编码耗时与体积
+        buffer, stats = self.screen_encoder.encode(img)
+        self.encode_stats.append(stats)
+        print(f"[DEBUG] 截图编码 {stats['encoder']} scale={stats['scale']} "
+              f"{stats['encode_ms']:.1f}ms {stats['bytes'] / 1024:.1f}KB")
+        if signature is not None:
+            self.frame_cache.add(call_id, signature)
+        return "screen shot", buffer
+
     def handle_screenshot(self, call_id):
         """处理截图指令：截图 -> 缩放 -> 编码 -> 发送"""
         try:
-            # 1. 截屏
-            with mss() as sct:
-                screenshot = sct.grab(
-                    sct.monitors[1]
-                )
-            img = np.array(screenshot)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            
-            # 2. 🚀 新增：图片缩放逻辑 (参照参考代码)
-            max_size = 1024
-            h, w = img.shape[:2]
-            if max(h, w) > max_size:
-                scale = max_size / max(h, w)
-                new_w, new_h = int(w * scale), int(h * scale)
-                # 使用 INTER_AREA 插值法，这是缩小图片时的最佳实践
-                img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
-                print(f"[DEBUG] 缩放图片从 {w}x{h} 到 {new_w}x{new_h}")
-
-            # 3. 编码为 JPEG (质量设为 85)
-            success, buffer = cv2.imencode('.jpeg', img, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-            
-            if not success:
-                raise Exception("JPEG 编码失败")
-
-            # 4. 转换为 Base64 字符串
-            b64_str = base64.b64encode(buffer).decode('utf-8')
-            
-            # 5. 发送给后端
-            self.send_base_request("screen shot", b64_str, 200, call_id)
-            print("\033[94m[SUCCESS] 缩放后的 JPEG 截图已发送\033[0m")
+            # 原始字节交给 send_base_request，按协商结果走二进制帧或 base64
+            req_type, data = self.encode_screenshot(call_id)
+            self.send_base_request(req_type, data, 200, call_id)
+            print("\033[94m[SUCCESS] 缩放后的截图已发送\033[0m")
             
         except Exception as e:
             print(f"\033[91m[ERROR] 截图失败: {e}\033[0m")
             self.send_base_request("screen shot", str(e), 504, call_id)
 
+    def send_result_with_screenshot(self, result, call_id):
+        """动作结果与动作后的截图合并为一条回应，省去服务端单独请求截图的一次往返"""
+        try:
+            # 必须是动作与等待结束之后采集的帧
+            req_type, data = self.encode_screenshot(call_id, newer_than=time.monotonic())
+            if not isinstance(data, str):
+                data = base64.b64encode(data).decode('utf-8')
+            payload = {"result": result, "screenshotType": req_type, "screenshot": data}
+            self.send_base_request("action result with screen shot", json_codec.dumps(payload), 200, call_id)
+            print("\033[94m[SUCCESS] 动作结果与截图已合并发送\033[0m")
+        except Exception as e:
+            # 截图失败不影响动作结果，服务端缺少 screenshot 字段时可自行再请求一次
+            print(f"\033[91m[ERROR] 动作后截图失败: {e}\033[0m")
+            payload = {"result": result, "screenshotError": str(e)}
+            self.send_base_request("action result with screen shot", json_codec.dumps(payload), 200, call_id)
+
     def denormalize_coordinates(self, args):
         """将 0-1000 归一化坐标转换为像素坐标"""
         new_args = args.copy()
@@ -215,22 +415,31 @@ class WebSocketClient:
 
     # ---------------- GUI 执行函数 ----------------
 
+    def settle(self, wait, action):
+        """动作后等待界面响应：fixed 模式固定等待 wait 秒；adaptive 模式画面稳定即返回，最多等 wait 秒"""
+        if self.settle_mode != "adaptive":
+            time.sleep(wait)
+            return
+        elapsed, settled = self.settle_detector.wait(wait)
+        self.settle_log.append((action, elapsed, settled))
+        print(f"[SETTLE] {action}: {elapsed:.2f}s / 上限 {wait}s{'' if settled else '（未稳定，已达上限）'}")
+
     def click_position(self, x, y, wait=1.5):
         pyautogui.moveTo(x, y, duration=0.3)
         pyautogui.click()
-        time.sleep(wait)
+        self.settle(wait, "click_position")
         return f"Clicked at ({x}, {y})"
 
     def double_click_position(self, x, y, wait=1.5):
         pyautogui.moveTo(x, y, duration=0.3)
         pyautogui.doubleClick()
-        time.sleep(wait)
+        self.settle(wait, "double_click_position")
         return f"Double clicked at ({x}, {y})"
 
     def right_click_position(self, x, y, wait=1.5):
         pyautogui.moveTo(x, y, duration=0.3)
         pyautogui.rightClick()
-        time.sleep(wait)
+        self.settle(wait, "right_click_position")
         return f"Right clicked at ({x}, {y})"
 
     def type_text(self, text, press_enter=False, wait=1.5):
@@ -240,29 +449,29 @@ class WebSocketClient:
         pyautogui.hotkey(hotkey, 'v')
         if press_enter:
             pyautogui.press('enter')
-        time.sleep(wait)
+        self.settle(wait, "type_text")
         return f"Typed: {text}"
 
     def scroll(self, clicks, wait=1.5):
         pyautogui.scroll(clicks * 100)
-        time.sleep(wait)
+        self.settle(wait, "scroll")
         return f"Scrolled {clicks}"
 
     def drag_mouse(self, start_x, start_y, end_x, end_y, duration=1.0, wait=1.5):
         pyautogui.moveTo(start_x, start_y)
         pyautogui.dragTo(end_x, end_y, duration=duration)
-        time.sleep(wait)
+        self.settle(wait, "drag_mouse")
         return f"Dragged from {start_x},{start_y} to {end_x},{end_y}"
 
     def press_key(self, key, wait=1.5):
         pyautogui.press(key)
-        time.sleep(wait)
+        self.settle(wait, "press_key")
         return f"Pressed key: {key}"
 
     def hotkey(self, keys, wait=1.5):
         key_list = keys.split('+')
         pyautogui.hotkey(*key_list)
-        time.sleep(wait)
+        self.settle(wait, "hotkey")
         return f"Pressed hotkey: {keys}"
 
     # ---------------- WebSocket 基础维护 ----------------
@@ -280,6 +489,14 @@ class WebSocketClient:
 
     def on_open(self, ws):
         self.is_connected = True
+        # 新连接上服务端没有参考帧，增量截图从关键帧重新开始
+        self.delta_encoder.reset()
+        if self.frame_cache is not None:
+            self.frame_cache.clear()
+        # 每个连接重新协商，确认前一律使用 JSON
+        self.binary_frames = False
+        if self.prefer_binary:
+            ws.send(binary_frames.capability_request())
         print("✅ 连接成功！请输入指令或直接对话。")
         self.input_thread = threading.Thread(target=self.input_loop, daemon=True)
         self.input_thread.start()
@@ -292,7 +509,9 @@ class WebSocketClient:
             "code": None,
             "callId": None
         }
-        self.ws.send(json.dumps(payload))
+        if self.tracer:
+            self.tracer.mark("chat_send")
+        self.ws.send(json_codec.dumps(payload))
 
     def on_error(self, ws, error):
         print(f"❌ WebSocket错误: {error}")
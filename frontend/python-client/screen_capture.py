@@ -0,0 +1,197 @@
+import threading
+import time
+import numpy as np
+from mss import mss
+
+
+# =========================================
+# 常驻截屏线程 + 预分配帧环形缓冲
+# =========================================
+# mss 句柄在部分平台（Windows GDI）上与创建线程绑定，因此句柄的创建、使用和关闭都在工作线程内完成。
+# 工作线程循环把最新画面拷贝进 ring_size 个预分配的 BGRA 数组之一，调用方拿到的是已就绪的帧，
+# 不再为每次截图付出 mss 初始化和大数组分配的开销。
+
+class ScreenCaptureWorker:
+    """后台截屏线程：独占一个 mss 句柄，循环写入预分配的帧环形缓冲"""
+
+    def __init__(self, monitor_index=1, interval=0.05, ring_size=3, idle_after=5.0):
+        self.monitor_index = monitor_index
+        self.interval = interval        # 活跃时的采集间隔（秒）
+        self.ring_size = ring_size      # 环形缓冲帧数，至少 3：一帧在写、一帧最新、一帧留给正在读的调用方
+        self.idle_after = idle_after    # 超过该时长无人取帧则停止采集，直到下一次 latest() 唤醒
+        self.max_backoff = 2.0          # 截屏连续失败时重建句柄的最长间隔（秒）
+        self.width = None               # 显示器逻辑分辨率（pyautogui 坐标系）
+        self.height = None
+
+        self._ring = None
+        self._seq = 0
+        self._index = -1
+        self._timestamp = 0.0
+        self._last_request = time.monotonic()
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._error = None              # 最近一次截屏失败的异常，成功截到新帧后清空
+        self._failures = 0              # 截屏失败次数，latest 据此判断请求之后是否又失败了一次
+        self._thread = None
+
+    def start(self, timeout=5.0):
+        """启动采集线程，阻塞到首帧就绪，以便调用方立刻读取分辨率"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("截屏线程启动超时")
+        if self._index < 0:
+            raise RuntimeError(f"截屏线程启动失败: {self._error}")
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        backoff = self.interval
+        while not self._stop_event.is_set():
+            try:
+                with mss() as sct:
+                    monitor = sct.monitors[self.monitor_index]
+                    self.width = monitor["width"]
+                    self.height = monitor["height"]
+                    while not self._stop_event.is_set():
+                        self._grab_into_ring(sct, monitor)
+                        self._ready.set()
+                        backoff = self.interval
+                        if self._is_idle():
+                            self._wait_for_request()
+                        else:
+                            self._stop_event.wait(self.interval)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._failures += 1
+                    self._condition.notify_all()  # 正在等帧的调用方立即失败，不必等到超时
+                if not self._ready.is_set():
+                    # 首帧就失败（没有显示器、权限不足）：交给 start() 报错，不再重试
+                    self._ready.set()
+                    print(f"\033[91m[ERROR] 截屏线程启动失败: {e}\033[0m")
+                    return
+                if backoff == self.interval:
+                    print(f"\033[91m[ERROR] 截屏失败，退避后重建截屏句柄: {e}\033[0m")
+                # 锁屏、UAC 安全桌面等期间截屏会暂时失败：退避后重建 mss 句柄重试；
+                # 期间有取帧请求（latest 会 set _wakeup）则立即重试，调用方不必等完整个退避
+                if self._is_idle():
+                    self._wait_for_request()
+                else:
+                    self._wakeup.wait(backoff)
+                    self._wakeup.clear()
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def _is_idle(self):
+        return time.monotonic() - self._last_request > self.idle_after
+
+    def _wait_for_request(self):
+        # 空闲：不再采集，等待下一次取帧请求（先 wait 再 clear，避免丢失唤醒）
+        self._wakeup.wait()
+        self._wakeup.clear()
+
+    def _grab_into_ring(self, sct, monitor):
+        # 以开始截屏的时刻作为帧时间戳，latest(newer_than=...) 才不会拿到动作前就已开始的截屏
+        started = time.monotonic()
+        shot = sct.grab(monitor)
+        # 高分屏下物理像素可能大于逻辑分辨率，以首帧实际尺寸分配缓冲
+        if self._ring is None or self._ring[0].shape[:2] != (shot.height, shot.width):
+            self._ring = [np.empty((shot.height, shot.width, 4), dtype=np.uint8) for _ in range(self.ring_size)]
+        index = (self._index + 1) % self.ring_size
+        # frombuffer 只是视图，唯一的拷贝是写入预分配的槽位
+        np.copyto(self._ring[index], np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4))
+        with self._condition:
+            self._index = index
+            self._seq += 1
+            self._timestamp = started
+            self._error = None
+            self._condition.notify_all()
+
+    def latest(self, newer_than=None, timeout=1.0, copy=False):
+        """
+        返回 (frame, seq, timestamp)，frame 为环形缓冲中的 BGRA 视图（只读使用，尽快消费）。
+        newer_than 为 time.monotonic() 时间戳时，等待该时刻之后采集的帧，用于保证截到动作执行后的画面。
+        copy=True 时在锁内拷贝该帧：持锁期间工作线程无法发布新帧，也就不会轮转回这个槽位覆盖它。
+        """
+        self._last_request = time.monotonic()
+        with self._condition:
+            failures = self._failures
+        self._wakeup.set()
+        with self._condition:
+            if newer_than is not None:
+                deadline = time.monotonic() + timeout
+                while self._timestamp <= newer_than:
+                    self._raise_if_failed(failures)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("等待新截屏帧超时")
+                    self._condition.wait(remaining)
+            if self._index < 0:
+                self._raise_if_failed(-1)
+                raise RuntimeError("截屏线程尚未产出任何帧")
+            frame = self._ring[self._index]
+            return (frame.copy() if copy else frame), self._seq, self._timestamp
+
+    def _raise_if_failed(self, failures):
+        """取不到所需的帧时：线程已退出，或本次请求之后截屏又失败了，立即报错而不是等到超时"""
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError(f"截屏线程未运行: {self._error}") from self._error
+        if self._error is not None and self._failures != failures:
+            raise RuntimeError(f"截屏失败: {self._error}") from self._error
+
+
+# =========================================
+# 画面稳定检测：替代动作后的固定等待
+# =========================================
+
+class ScreenSettleDetector:
+    """动作执行后持续采样低分辨率画面，连续若干帧不再变化即视为界面已稳定"""
+
+    def __init__(self, capture, step=8, pixel_threshold=16, changed_ratio=0.002, stable_frames=2, min_wait=0.1):
+        self.capture = capture
+        self.step = step                      # 下采样步长，1920x1080 -> 240x135
+        self.pixel_threshold = pixel_threshold
+        self.changed_ratio = changed_ratio    # 变化像素占比低于该值视为"没变"，容忍光标闪烁等微小变化
+        self.stable_frames = stable_frames    # 需要连续多少次采样无变化
+        self.min_wait = min_wait              # 给界面响应事件的最短时间，避免动作尚未生效就判定稳定
+
+    def _sample(self, newer_than, deadline):
+        # 等帧的时间也计入 max_wait，否则截屏线程迟迟不出帧时 wait 最多会超出上限 1 秒（latest 的默认超时）
+        frame, _, timestamp = self.capture.latest(newer_than=newer_than, timeout=max(0.0, deadline - time.monotonic()))
+        # 步长切片得到的是视图，立即拷贝一份小图，避免环形缓冲被覆盖
+        return frame[::self.step, ::self.step, :3].copy(), timestamp
+
+    def wait(self, max_wait):
+        """阻塞直到画面稳定或达到 max_wait，返回 (耗时秒数, 是否稳定)"""
+        start = time.monotonic()
+        deadline = start + max_wait
+        time.sleep(min(self.min_wait, max_wait))
+
+        try:
+            prev, timestamp = self._sample(time.monotonic(), deadline)
+        except (TimeoutError, RuntimeError):
+            # 截屏线程取不到帧（超时、截屏失败）时退化为固定等待
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            return time.monotonic() - start, False
+        stable = 0
+        while time.monotonic() < deadline:
+            try:
+                curr, timestamp = self._sample(timestamp, deadline)
+            except (TimeoutError, RuntimeError):
+                break
+            diff = np.maximum(prev, curr)
+            diff -= np.minimum(prev, curr)
+            if (diff.max(axis=2) > self.pixel_threshold).mean() < self.changed_ratio:
+                stable += 1
+                if stable >= self.stable_frames:
+                    return time.monotonic() - start, True
+            else:
+                stable = 0
+            prev = curr
+        return time.monotonic() - start, False
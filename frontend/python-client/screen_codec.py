@@ -0,0 +1,373 @@
+import json
+import time
+from collections import OrderedDict
+import base64
+import cv2
+import numpy as np
+
+
+# =========================================
+# 图像编码器：JPEG / WebP / PNG
+# =========================================
+
+class ImageEncoder:
+    """编码器基类：子类给出扩展名和 imencode 参数，encode 返回编码后的 uint8 数组（可直接 base64）"""
+    ext = None
+    format = None
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    @property
+    def name(self):
+        return f"{self.format}-{self.quality}"
+
+    def params(self):
+        return []
+
+    def encode(self, img):
+        success, buffer = cv2.imencode(self.ext, img, self.params())
+        if not success:
+            raise Exception(f"{self.name} 编码失败")
+        return buffer
+
+
+class JpegEncoder(ImageEncoder):
+    ext = '.jpeg'
+    format = 'jpeg'
+
+    def __init__(self, quality=85):
+        super().__init__(quality)
+
+    def params(self):
+        return [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+
+
+class WebpEncoder(ImageEncoder):
+    ext = '.webp'
+    format = 'webp'
+
+    def __init__(self, quality=80):
+        super().__init__(quality)
+
+    def params(self):
+        return [int(cv2.IMWRITE_WEBP_QUALITY), self.quality]
+
+
+class PngEncoder(ImageEncoder):
+    """无损，适合以文字为主的界面（代码、表格），quality 即压缩级别 0-9，越低越快"""
+    ext = '.png'
+    format = 'png'
+
+    def __init__(self, quality=1):
+        super().__init__(quality)
+
+    def params(self):
+        return [int(cv2.IMWRITE_PNG_COMPRESSION), self.quality]
+
+
+def scale_image(img, scale):
+    if scale >= 1.0:
+        return img
+    h, w = img.shape[:2]
+    return cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+# 候选按"对模型识别越友好越靠前"排序，自动调优时取第一个满足约束的组合。
+# 当前服务端按 JPEG 解析截图，因此默认只在 JPEG 质量和缩放之间调优；服务端能识别格式时可换成 MIXED_FORMAT_CANDIDATES。
+JPEG_CANDIDATES = [
+    (JpegEncoder(90), 1.0), (JpegEncoder(85), 1.0), (JpegEncoder(75), 1.0),
+    (JpegEncoder(60), 1.0), (JpegEncoder(75), 0.75), (JpegEncoder(60), 0.75),
+    (JpegEncoder(60), 0.5),
+]
+MIXED_FORMAT_CANDIDATES = [
+    (PngEncoder(1), 1.0), (WebpEncoder(90), 1.0), (JpegEncoder(90), 1.0),
+    (WebpEncoder(75), 1.0), (JpegEncoder(75), 1.0), (WebpEncoder(75), 0.75),
+    (JpegEncoder(60), 0.75), (WebpEncoder(60), 0.5), (JpegEncoder(60), 0.5),
+]
+
+
+def measure_encode(encoder, img, scale=1.0):
+    """编码一帧并返回 (buffer, stats)，stats 包含编码器、缩放、耗时(ms)和字节数"""
+    start = time.perf_counter()
+    buffer = encoder.encode(scale_image(img, scale))
+    encode_ms = (time.perf_counter() - start) * 1000
+    return buffer, {"encoder": encoder.name, "scale": scale, "encode_ms": encode_ms, "bytes": len(buffer)}
+
+
+class EncoderAutoTuner:
+    """
+    在本机实测各 (编码器, 缩放) 组合的耗时与体积，选出满足目标体积 / 编码耗时预算的最优组合。
+    每 recalibrate_every 帧，或实际结果超出目标 50% 以上时，重新测量（画面内容变化会显著影响体积）。
+    """
+
+    def __init__(self, target_bytes=None, encode_budget_ms=None, candidates=None, recalibrate_every=50):
+        self.target_bytes = target_bytes
+        self.encode_budget_ms = encode_budget_ms
+        self.candidates = candidates or JPEG_CANDIDATES
+        self.recalibrate_every = recalibrate_every
+        self.choice = None
+        self.frames_since_calibration = 0
+        self.calibration = []   # 最近一次测量结果，便于日志与基准脚本查看
+
+    def _fits(self, stats, slack=1.0):
+        if self.target_bytes and stats["bytes"] > self.target_bytes * slack:
+            return False
+        if self.encode_budget_ms and stats["encode_ms"] > self.encode_budget_ms * slack:
+            return False
+        return True
+
+    def calibrate(self, img):
+        self.calibration = [measure_encode(encoder, img, scale)[1] for encoder, scale in self.candidates]
+        fitting = [i for i, stats in enumerate(self.calibration) if self._fits(stats)]
+        if fitting:
+            index = fitting[0]
+        else:
+            # 没有组合满足约束时退而求其次：选体积最小的
+            index = min(range(len(self.calibration)), key=lambda i: self.calibration[i]["bytes"])
+        self.choice = self.candidates[index]
+        self.frames_since_calibration = 0
+        return self.choice
+
+    def encode(self, img):
+        """按当前选择编码，返回 (buffer, stats)"""
+        if self.choice is None or self.frames_since_calibration >= self.recalibrate_every:
+            self.calibrate(img)
+        encoder, scale = self.choice
+        buffer, stats = measure_encode(encoder, img, scale)
+        self.frames_since_calibration += 1
+        if not self._fits(stats, slack=1.5):
+            # 画面内容突变导致明显超标，下一帧重新测量
+            self.frames_since_calibration = self.recalibrate_every
+        return buffer, stats
+
+
+class FixedEncoder:
+    """与 EncoderAutoTuner 接口一致的固定编码器，默认即原先的 JPEG 85"""
+
+    def __init__(self, encoder=None, scale=1.0):
+        self.choice = (encoder or JpegEncoder(85), scale)
+
+    def encode(self, img):
+        encoder, scale = self.choice
+        return measure_encode(encoder, img, scale)
+
+
+# =========================================
+# 增量截图：脏块检测 + 区域编码
+# =========================================
+# 载荷格式（JSON 字符串，作为 BaseRequest.data 发送）：
+#   keyframe : {"mode": "keyframe", "seq", "width", "height", "image"}
+#   delta    : {"mode": "delta", "seq", "base", "width", "height", "regions": [{"x","y","w","h","image"}]}
+#   unchanged: {"mode": "unchanged", "seq", "base"}
+# image 均为 base64 编码的图像（默认 JPEG，可换成任一 ImageEncoder）；base 为解码端必须持有的上一帧序号。
+
+MODE_KEYFRAME = "keyframe"
+MODE_DELTA = "delta"
+MODE_UNCHANGED = "unchanged"
+
+
+def encode_image_b64(encoder, img):
+    return base64.b64encode(encoder.encode(img)).decode('utf-8')
+
+
+def decode_image_b64(b64_str):
+    buffer = np.frombuffer(base64.b64decode(b64_str), dtype=np.uint8)
+    # imdecode 按文件头识别格式，JPEG / WebP / PNG 都可解
+    img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("图像解码失败")
+    return img
+
+
+def dirty_tile_mask(prev, curr, tile_size, threshold):
+    """向量化比较两帧，返回 (rows, cols) 的布尔矩阵，True 表示该 tile 有变化"""
+    # cv2.absdiff 一趟饱和相减得到逐像素绝对差（SIMD），比 numpy 的 max - min 两趟加一次临时数组快一倍多
+    diff = cv2.absdiff(prev, curr)
+
+    # 展平通道后先把每 tile_size 行压成一行：连续内存上沿中间轴取最大值可整行向量化，
+    # 比直接沿列 reduceat 整帧快；不满一个 tile 的底边单独压一行
+    h, w = diff.shape[:2]
+    channels = diff.shape[2] if diff.ndim == 3 else 1
+    diff = diff.reshape(h, w * channels)
+    full_rows = h // tile_size
+    row_max = diff[:full_rows * tile_size].reshape(full_rows, tile_size, w * channels).max(axis=1)
+    if h % tile_size:
+        row_max = np.vstack([row_max, diff[full_rows * tile_size:].max(axis=0, keepdims=True)])
+    # reduceat 天然处理最右侧不满一个 tile 的边缘，无需 padding
+    tile_max = np.maximum.reduceat(row_max, np.arange(0, w * channels, tile_size * channels), axis=1)
+    return tile_max > threshold
+
+
+def merge_dirty_tiles(mask, tile_size, width, height):
+    """把脏 tile 合并成矩形：先按行合并连续 tile，再把上下相邻且列范围相同的行段拼起来"""
+    rects = []
+    open_runs = {}  # (c0, c1) -> [x, y, w, h]，上一行仍可向下延伸的矩形
+    for r in range(mask.shape[0]):
+        row = np.concatenate(([0], mask[r].astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(row))
+        next_runs = {}
+        for c0, c1 in zip(edges[::2], edges[1::2]):
+            key = (int(c0), int(c1))
+            rect = open_runs.pop(key, None)
+            if rect is None:
+                rect = [key[0] * tile_size, r * tile_size, (key[1] - key[0]) * tile_size, 0]
+                rects.append(rect)
+            rect[3] += tile_size
+            next_runs[key] = rect
+        open_runs = next_runs
+
+    # 裁剪到图像边界
+    for rect in rects:
+        rect[2] = min(rect[2], width - rect[0])
+        rect[3] = min(rect[3], height - rect[1])
+    return rects
+
+
+class DeltaFrameEncoder:
+    """保存上一帧，只编码变化区域；画面无变化时只发标记，并定期发送完整关键帧"""
+
+    def __init__(self, tile_size=64, threshold=12, keyframe_interval=20, max_dirty_ratio=0.5, encoder=None):
+        self.tile_size = tile_size
+        self.threshold = threshold                  # tile 内最大像素差超过该值才视为变化，过滤 JPEG/渲染噪声
+        self.keyframe_interval = keyframe_interval  # 每隔多少帧强制发送一次关键帧
+        self.max_dirty_ratio = max_dirty_ratio      # 脏块占比超过该值时直接发关键帧，更省
+        self.encoder = encoder or JpegEncoder(85)
+        self.reset()
+
+    def reset(self):
+        """丢弃参考帧，下一帧必为关键帧（新连接建立、解码端失步时调用）"""
+        self.prev = None
+        self.seq = 0
+        self.since_keyframe = 0
+
+    def encode(self, img):
+        """输入 BGR 图像，返回可直接 json.dumps 的载荷"""
+        h, w = img.shape[:2]
+        self.seq += 1
+
+        need_keyframe = (
+            self.prev is None
+            or self.prev.shape != img.shape
+            or self.since_keyframe >= self.keyframe_interval
+        )
+        if not need_keyframe:
+            mask = dirty_tile_mask(self.prev, img, self.tile_size, self.threshold)
+            dirty_ratio = mask.mean()
+            if dirty_ratio == 0:
+                self.since_keyframe += 1
+                return {"mode": MODE_UNCHANGED, "seq": self.seq, "base": self.seq - 1}
+            need_keyframe = dirty_ratio > self.max_dirty_ratio
+
+        if need_keyframe:
+            self.prev = img.copy()
+            self.since_keyframe = 0
+            return {
+                "mode": MODE_KEYFRAME, "seq": self.seq, "width": w, "height": h,
+                "image": encode_image_b64(self.encoder, img),
+            }
+
+        regions = []
+        for x, y, rw, rh in merge_dirty_tiles(mask, self.tile_size, w, h):
+            patch = img[y:y + rh, x:x + rw]
+            # 参考帧只更新发送过的区域，低于阈值的缓慢变化会继续累积直至被检测到
+            self.prev[y:y + rh, x:x + rw] = patch
+            regions.append({"x": x, "y": y, "w": rw, "h": rh, "image": encode_image_b64(self.encoder, patch)})
+        self.since_keyframe += 1
+        return {
+            "mode": MODE_DELTA, "seq": self.seq, "base": self.seq - 1,
+            "width": w, "height": h, "regions": regions,
+        }
+
+
+class DeltaFrameDecoder:
+    """DeltaFrameEncoder 的解码端：按载荷把变化区域贴回上一帧，还原完整画面"""
+
+    def __init__(self):
+        self.frame = None
+        self.seq = 0
+
+    def decode(self, payload):
+        """payload 可以是 dict 或 JSON 字符串，返回还原后的 BGR 图像"""
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        mode = payload.get("mode")
+
+        if mode == MODE_KEYFRAME:
+            self.frame = decode_image_b64(payload["image"])
+        else:
+            if self.frame is None or payload.get("base") != self.seq:
+                raise ValueError(f"增量帧基准不匹配: base={payload.get('base')}, 当前={self.seq}，需要重新请求关键帧")
+            if mode == MODE_DELTA:
+                for region in payload["regions"]:
+                    x, y = region["x"], region["y"]
+                    patch = decode_image_b64(region["image"])
+                    self.frame[y:y + patch.shape[0], x:x + patch.shape[1]] = patch
+            elif mode != MODE_UNCHANGED:
+                raise ValueError(f"未知的截图载荷类型: {mode}")
+
+        self.seq = payload["seq"]
+        return self.frame
+
+
+# =========================================
+# 感知哈希缓存：画面与近期已发送的某帧相同时只回传引用
+# =========================================
+
+def dhash(img, hash_size=16):
+    """差分哈希：缩到 (hash_size+1) x hash_size 灰度图，比较水平相邻像素，得到 hash_size^2 位整数"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class FrameCache:
+    """
+    最近发送帧的 LRU：键为感知哈希，值为 (帧引用, 缩略图)。
+    哈希只用于快速定位候选，命中后再用 1/4 缩略图逐 tile 比对确认，
+    避免哈希对小字、光标等细微变化不敏感而把已变化的画面误判为相同。
+    """
+
+    def __init__(self, capacity=8, max_distance=4, thumb_scale=4, tile_size=16, threshold=12):
+        self.capacity = capacity
+        self.max_distance = max_distance  # 哈希汉明距离阈值
+        self.thumb_scale = thumb_scale
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.entries = OrderedDict()      # hash -> (ref, thumbnail)
+        self.hits = 0
+        self.misses = 0
+
+    def _thumbnail(self, img):
+        h, w = img.shape[:2]
+        return cv2.resize(img, (max(1, w // self.thumb_scale), max(1, h // self.thumb_scale)),
+                          interpolation=cv2.INTER_AREA)
+
+    def lookup(self, img):
+        """命中返回之前那一帧的引用，否则返回 None；同时返回本帧的 (hash, thumbnail) 供 add 复用"""
+        key = dhash(img)
+        thumb = self._thumbnail(img)
+        for cached_key, (ref, cached_thumb) in reversed(self.entries.items()):
+            if (key ^ cached_key).bit_count() > self.max_distance or cached_thumb.shape != thumb.shape:
+                continue
+            if not dirty_tile_mask(cached_thumb, thumb, self.tile_size, self.threshold).any():
+                self.entries.move_to_end(cached_key)
+                self.hits += 1
+                return ref, (key, thumb)
+        self.misses += 1
+        return None, (key, thumb)
+
+    def add(self, ref, signature):
+        key, thumb = signature
+        self.entries[key] = (ref, thumb)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
@@ -1,8 +1,9 @@
 import pyaudio
 import queue
 import threading
-import base64
+import binascii
 import time
+from collections import deque
 import signal
 import sys
 import os
@@ -21,15 +22,116 @@ SAMPLE_WIDTH  = 2       # 16-bit = 2 字节/样本
 CHUNK_FRAMES  = 1600    # 每块帧数 = 0.1 秒
 FORMAT        = pyaudio.paInt16
 
+ASR_URL       = "wss://dashscope.aliyuncs.com/api-ws/v1/realtime"
+COMMIT_TIMEOUT = 10     # commit 后等待转录结果的最长时间（秒）
+
 # ─── 回调与队列 ────────────────────────────────────────────────────
+# 队列、停止信号、发送 / 控制线程都属于各自的 RealtimeSTT 实例，同一进程可以并行运行多路会话
+
+# 放入 audio_queue 的提交标记：发送线程发完它之前的全部音频后，再对云端 commit
+COMMIT_MARKER = object()
+
+# ─── 有界采集队列 ──────────────────────────────────────────────────
+class CaptureQueue:
+    """
+    麦克风回调与发送线程之间的有界队列，元素为 (采集时刻, PCM) 或提交标记。
+    网络卡住时音频不再无限堆积：满了按 policy 处理——
+        drop-oldest : 丢最旧的一块，恢复后只补发最近 maxsize 块（默认）
+        drop-newest : 丢刚采集的一块
+        block       : 让音频回调最多等 block_timeout 秒，仍满则丢弃刚采集的一块
+    提交标记不计入容量、也不会被丢弃。接口与 queue.Queue 的 put / get / empty / qsize 一致。
+    """
+
+    POLICIES = ("drop-oldest", "drop-newest", "block")
+
+    def __init__(self, maxsize=30, policy="drop-oldest", block_timeout=0.05, late_after=0.5):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的采集队列策略: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.late_after = late_after    # 取出时已等待超过该秒数的音频计为迟到
+        self.items = deque()
+        self.audio_count = 0
+        self.condition = threading.Condition()
+
+        # 统计
+        self.dropped = 0
+        self.dropped_bytes = 0
+        self.late = 0
+        self.peak = 0
+
+    def put(self, item):
+        with self.condition:
+            if item[0] is not COMMIT_MARKER and self.audio_count >= self.maxsize:
+                if self.policy == "block":
+                    self.condition.wait_for(lambda: self.audio_count < self.maxsize, self.block_timeout)
+                if self.audio_count >= self.maxsize:
+                    if self.policy == "drop-oldest":
+                        self._drop_oldest()
+                    else:
+                        self._count_drop(item)
+                        return
+            self.items.append(item)
+            if item[0] is not COMMIT_MARKER:
+                self.audio_count += 1
+                self.peak = max(self.peak, self.audio_count)
+            self.condition.notify_all()
+
+    def _drop_oldest(self):
+        for index, queued in enumerate(self.items):
+            if queued[0] is not COMMIT_MARKER:
+                del self.items[index]
+                self.audio_count -= 1
+                self._count_drop(queued)
+                return
+
+    def _count_drop(self, item):
+        self.dropped += 1
+        self.dropped_bytes += len(item[1])
+
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items, timeout):
+                raise queue.Empty
+            item = self.items.popleft()
+            if item[0] is not COMMIT_MARKER:
+                self.audio_count -= 1
+                if time.perf_counter() - item[0] > self.late_after:
+                    self.late += 1
+                self.condition.notify_all()  # 唤醒 block 策略下等待空位的音频回调
+            return item
+
+    def empty(self):
+        return not self.items
+
+    def qsize(self):
+        return len(self.items)
+
+    def stats(self):
+        return {
+            "policy": self.policy,
+            "depth": self.audio_count,
+            "peak": self.peak,
+            "dropped": self.dropped,
+            "dropped_bytes": self.dropped_bytes,
+            "late": self.late,
+        }
 
-stop_event  = threading.Event()
 
 # ─── ASR 回调 ──────────────────────────────────────────────────────
 class RealtimeCallback(OmniRealtimeCallback):
-    def __init__(self, transcript_queue, text_callback=None, completed_event=None):
-        self.transcript_queue = transcript_queue
+    def __init__(self, text_callback=None, completed_event=None, speech_callback=None,
+                 completed_callback=None, committed_callback=None, stop_event=None):
+        # 所属 RealtimeSTT 的停止信号：连接关闭只停止本会话
+        self.stop_event = stop_event or threading.Event()
         self.text_callback = text_callback
+        # 最终转录结果到达时调用 completed_callback(transcript, item_id)（RealtimeSTT 用它把结果交给发起 commit 的一方）
+        self.completed_callback = completed_callback
+        # 服务端确认 commit 时调用 committed_callback(item_id)，用于把 commit 与转录结果对应起来
+        self.committed_callback = committed_callback
+        # 检测到用户开始说话时调用（如打断正在播放的 TTS）
+        self.speech_callback = speech_callback
         # 手动commit模式completed回调触发标识
         self.completed_event = completed_event
 
@@ -38,7 +140,7 @@ class RealtimeCallback(OmniRealtimeCallback):
 
     def on_close(self, code, msg):
         print(f"✗ 连接关闭 code={code} msg={msg}")
-        stop_event.set()
+        self.stop_event.set()
 
     def on_event(self, response):
         t = response.get("type", "")
@@ -46,8 +148,14 @@ class RealtimeCallback(OmniRealtimeCallback):
             print(f"  会话已创建: {response['session']['id']}")
         elif t == "input_audio_buffer.speech_started":
             print("\n  🎙  说话开始...")
+            # 仅在服务端 VAD（enable_turn_detection=True）下会收到该事件
+            if self.speech_callback:
+                self.speech_callback()
         elif t == "input_audio_buffer.speech_stopped":
             print("\n  🔇 说话结束")
+        elif t == "input_audio_buffer.committed":
+            if self.committed_callback:
+                self.committed_callback(response.get("item_id"))
         elif t == "conversation.item.input_audio_transcription.text":
             # 中间结果（边说边出）
             text = response["text"] + response.get("stash", "")
@@ -59,27 +167,61 @@ class RealtimeCallback(OmniRealtimeCallback):
             if self.text_callback:
                 self.text_callback(response['transcript'])
             print(f"\n  ✓ 最终: {response['transcript']}")
-            self.transcript_queue.put(response['transcript'])
             if self.completed_event:
-                self.completed_event.set()  # 唤醒等待的线程，如 keyboard listener
+                self.completed_event.set()  # 唤醒等待的线程
+            if self.completed_callback:
+                self.completed_callback(response['transcript'], response.get("item_id"))
 
 
 
 # todo 识别语音结束间隔稍微快了一点
 # ─── STT 类封装 ──────────────────────────────────────────────────
 class RealtimeSTT:
-    def __init__(self, api_key=None, model="qwen3-asr-flash-realtime", text_callback=None):
+    def __init__(self, api_key=None, model="qwen3-asr-flash-realtime", text_callback=None, speech_callback=None,
+                 url=ASR_URL, audio=None, vad=None, vad_auto_commit=False, chunk_frames=CHUNK_FRAMES,
+                 upload_batch=1, capture_policy="drop-oldest", max_backlog_ms=3000, tracer=None):
         dashscope.api_key = api_key or os.environ.get("DASHSCOPE_API_KEY", "YOUR_KEY")
         self.model = model
-        self.transcript_queue = queue.Queue()
+        self.url = url
+        self.audio = audio  # PyAudio 或接口一致的替身（离线测试用）
         self.completed_event = threading.Event()
-        self.callback = RealtimeCallback(self.transcript_queue, text_callback=text_callback, completed_event=self.completed_event)
+        self.stop_event = threading.Event()
+        self.callback = RealtimeCallback(text_callback=text_callback, completed_event=self.completed_event,
+                                         speech_callback=speech_callback, completed_callback=self._on_completed,
+                                         committed_callback=self._on_committed, stop_event=self.stop_event)
+        # 已 commit、等待转录结果的请求，按提交顺序排列：{"released_at", "on_transcript", "item_id"}；
+        # committed 事件按顺序给记录绑定 item_id，转录结果按 item_id 找回对应的请求
+        self.pending_commits = []
+        self.expired_items = deque(maxlen=32)  # 已超时放弃的 item_id，迟到的转录结果直接丢弃
+        self.pending_lock = threading.Lock()
+        self.last_commit_latency = None  # 最近一次从松开按键到拿到转录结果的秒数
+        self.tracer = tracer             # latency_trace.TurnTracer，记录松开按键与 ASR 最终结果
+        # 采集启停放到控制线程按顺序执行：stop_stream 会等待当前音频回调结束，不能卡住键盘线程
+        self.control_queue = queue.Queue()
+        self.controller = None
         self.is_paused = False
         self.conversation = None
         self.pa = None
         self.stream = None
         self.sender = None
-        self.audio_queue = queue.Queue()
+        # 有界采集队列：最多积压 max_backlog_ms 的音频，满时按 capture_policy 处理
+        chunk_ms = chunk_frames * 1000 / SAMPLE_RATE
+        self.audio_queue = CaptureQueue(maxsize=max(1, int(max_backlog_ms / chunk_ms)), policy=capture_policy)
+        self.uncommitted_bytes = 0  # 上次 commit 之后已上传的音频字节数
+        # 可选的本地 VAD（voice_activity.EnergyVad）：丢弃首尾静音；vad_auto_commit 时在本地判定说完后自动 commit，
+        # 适合免按键的连续对话（需配合 enable_turn_detection=False）
+        self.vad = vad
+        self.vad_auto_commit = vad_auto_commit
+        # 上传策略：chunk_frames 为麦克风每块帧数（320 = 20ms，更低时延、更多消息），
+        # upload_batch 为合并多少块后发一次 append（更少消息、更高时延）；commit 前总会先发出未满的批次
+        self.chunk_frames = chunk_frames
+        self.upload_batch = upload_batch
+        self._batch = bytearray(chunk_frames * SAMPLE_WIDTH * upload_batch)  # 复用的上传缓冲
+        self._batch_len = 0
+        self._batch_chunks = 0
+        self._batch_captured_at = None
+        # 每次上传：采集到发出的时延（以批内最早一块计）、发送耗时、发出后队列积压
+        self.upload_stats = deque(maxlen=200)
         
 
     def audio_callback(self,in_data, frame_count, time_info, status):
@@ -89,7 +231,7 @@ class RealtimeSTT:
         """
         if status:
             print(f"[Audio status] {status}")
-        self.audio_queue.put(in_data)
+        self.audio_queue.put((time.perf_counter(), in_data))
         return (None, pyaudio.paContinue)
     
     # ─── 发送线程：队列 → Base64 → WebSocket ──────────────────────────
@@ -98,12 +240,30 @@ class RealtimeSTT:
         独立线程，持续从队列取数据并发送。
         与音频回调解耦，避免阻塞采集。
         """
-        while not stop_event.is_set():
+        while not self.stop_event.is_set():
             try:
                 # 最多等 0.5 秒，避免永久阻塞
-                chunk = self.audio_queue.get(timeout=0.5)
-                audio_b64 = base64.b64encode(chunk).decode("ascii")
-                self.conversation.append_audio(audio_b64)
+                item = self.audio_queue.get(timeout=0.5)
+                if item[0] is COMMIT_MARKER:
+                    # 标记之前的音频都已发出，此时 commit 不会漏掉句尾
+                    if self.vad:
+                        self.vad.reset()
+                    self._flush_upload()
+                    self._send_commit(*item[1:])
+                    continue
+                captured_at, chunk = item
+                if self.vad is None:
+                    self._queue_upload(captured_at, chunk)
+                    continue
+                # 本地 VAD：只上传语音段，开口时通知打断，说完后可直接 commit
+                for kind, payload in self.vad.feed(chunk):
+                    if kind == "audio":
+                        self._queue_upload(captured_at, payload)
+                    elif kind == "start" and self.callback.speech_callback:
+                        self.callback.speech_callback()
+                    elif kind == "end" and self.vad_auto_commit:
+                        self._flush_upload()
+                        self._send_commit(time.perf_counter(), None)
             except queue.Empty:
                 continue
             except Exception as e:
@@ -113,12 +273,12 @@ class RealtimeSTT:
     # 一共三个线程，与云端的websocket连接的回调执行线程，PyAudio的stream音频采集回调执行线程，以及在wss连接上发送音频给云端的发送线程
     # 工作流程为，麦克风stream流每0.1秒采集一次音频数据并触发回调，回调函数audio_callback将采集到的PCM原始音频数据放入audio_queue队列中；
     # 发送线程send_loop不断从audio_queue队列中取出音频数据，进行Base64编码后通过WebSocket连接发送给云端；
-    # 云端处理后将转录结果通过WebSocket的回调函数on_event返回，由wss连接的回调线程执行，最终将转录结果放入transcript_queue队列中，主线程不断从transcript_queue队列中取出转录结果进行打印或其他处理。
+    # 云端处理后将转录结果通过WebSocket的回调函数on_event返回，由wss连接的回调线程执行，按 item_id 交给发起该 commit 的 on_transcript。
     def start(self):
         # 1. 初始化 ASR 会话
         self.conversation = OmniRealtimeConversation(
             model    = self.model,
-            url      = "wss://dashscope.aliyuncs.com/api-ws/v1/realtime",
+            url      = self.url,
             callback = self.callback,
         )
         self.conversation.connect()
@@ -135,13 +295,13 @@ class RealtimeSTT:
         )
 
         # 2. 启动 PyAudio 采集流
-        self.pa = pyaudio.PyAudio()
+        self.pa = self.audio or pyaudio.PyAudio()
         self.stream = self.pa.open(
             format               = FORMAT,
             channels             = CHANNELS,
             rate                 = SAMPLE_RATE,
             input                = True,
-            frames_per_buffer    = CHUNK_FRAMES,
+            frames_per_buffer    = self.chunk_frames,
             stream_callback      = self.audio_callback,
         )
         self.stream.start_stream()
@@ -151,6 +311,10 @@ class RealtimeSTT:
         self.sender = threading.Thread(target=self.send_loop, daemon=True)
         self.sender.start()
 
+        # 4. 启动控制线程
+        self.controller = threading.Thread(target=self.control_loop, daemon=True)
+        self.controller.start()
+
     def pause(self):
         """暂停麦克风采集并设置标识"""
         self.is_paused = True
@@ -163,9 +327,136 @@ class RealtimeSTT:
         if self.stream and not self.stream.is_active():
             self.stream.start_stream()
 
+    # ─── 非阻塞的按键说话（PTT）控制 ─────────────────────────────────
+    # 键盘线程只投递请求，立即返回；控制线程按顺序执行启停，发送线程在发完音频后 commit，
+    # 转录结果在 ASR 回调线程里通过 on_transcript 交回，整个过程没有轮询和阻塞等待。
+    def control_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                action = self.control_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                action()
+            except Exception as e:
+                print(f"[Control error] {e}")
+
+    def resume_async(self):
+        """按下 PTT：恢复采集（不阻塞）"""
+        self.control_queue.put(self.resume)
+
+    def commit_async(self, on_transcript=None):
+        """
+        松开 PTT：暂停采集，并在已采集的音频全部发送后 commit（不阻塞）。
+        转录完成后在 ASR 回调线程调用 on_transcript(text)。
+        """
+        released_at = time.perf_counter()
+        if self.tracer:
+            self.tracer.mark("key_release", released_at)
+
+        def finish():
+            # stop_stream 返回后不会再有音频回调，此时放入的标记一定排在最后一块音频之后
+            self.pause()
+            self.audio_queue.put((COMMIT_MARKER, released_at, on_transcript))
+
+        self.control_queue.put(finish)
+
+    # ─── 上传批次 ─────────────────────────────────────────────────
+    def _queue_upload(self, captured_at, pcm):
+        """把一块音频拷进复用的批次缓冲，凑满 upload_batch 块即发送"""
+        end = self._batch_len + len(pcm)
+        if end > len(self._batch):
+            # VAD 开口时会连同 pre_roll 一起交出，比一块大
+            self._batch.extend(bytes(end - len(self._batch)))
+        self._batch[self._batch_len:end] = pcm
+        self._batch_len = end
+        if self._batch_captured_at is None:
+            self._batch_captured_at = captured_at
+        self._batch_chunks += 1
+        if self._batch_chunks >= self.upload_batch:
+            self._flush_upload()
+
+    def _flush_upload(self):
+        if not self._batch_len:
+            return
+        # 直接对缓冲区切片编码，不再为每块拼接 / 复制 bytes
+        audio_b64 = binascii.b2a_base64(memoryview(self._batch)[:self._batch_len], newline=False).decode("ascii")
+        start = time.perf_counter()
+        self.conversation.append_audio(audio_b64)
+        sent_at = time.perf_counter()
+        self.upload_stats.append({
+            "bytes": self._batch_len,
+            "chunks": self._batch_chunks,
+            "latency_ms": (sent_at - self._batch_captured_at) * 1000,
+            "send_ms": (sent_at - start) * 1000,
+            "backlog": self.audio_queue.qsize(),
+        })
+        self.uncommitted_bytes += self._batch_len
+        self._batch_len = 0
+        self._batch_chunks = 0
+        self._batch_captured_at = None
+
+    def _send_commit(self, released_at, on_transcript):
+        if not self.uncommitted_bytes:
+            # 本地 VAD 把整段都判为静音时缓冲区为空，云端会拒绝空 commit
+            print("\n  🔇 未检测到语音，跳过 commit")
+            return
+        self.uncommitted_bytes = 0
+        pending = {"released_at": released_at, "on_transcript": on_transcript, "item_id": None}
+        with self.pending_lock:
+            self.pending_commits.append(pending)
+        self.conversation.commit()
+        # 超时未收到转录结果时放弃该请求；它的 item_id 记入 expired_items，迟到的结果不会交给下一次按键
+        timer = threading.Timer(COMMIT_TIMEOUT, self._expire_commit, args=(pending,))
+        timer.daemon = True
+        timer.start()
+
+    def _expire_commit(self, pending):
+        with self.pending_lock:
+            if pending not in self.pending_commits:
+                return
+            self.pending_commits.remove(pending)
+            if pending["item_id"]:
+                self.expired_items.append(pending["item_id"])
+        print("commit 等待转录结果超时！")
+
+    def _on_committed(self, item_id):
+        with self.pending_lock:
+            for pending in self.pending_commits:
+                if pending["item_id"] is None:
+                    pending["item_id"] = item_id
+                    break
+
+    def _take_pending(self, item_id):
+        """取出转录结果对应的请求；已超时的 item 返回 None"""
+        with self.pending_lock:
+            if item_id in self.expired_items:
+                self.expired_items.remove(item_id)
+                return None
+            pending = next((p for p in self.pending_commits if item_id and p["item_id"] == item_id), None)
+            if pending is None:
+                # 兜底：没收到 committed 事件（或结果不带 item_id）时，交给最早一条未绑定的请求
+                pending = next((p for p in self.pending_commits if p["item_id"] is None), None)
+            if pending is not None:
+                self.pending_commits.remove(pending)
+            return pending
+
+    def _on_completed(self, transcript, item_id=None):
+        pending = self._take_pending(item_id)
+        if pending is None:
+            print(f"\n  丢弃不属于任何等待中 commit 的转录结果（item_id={item_id}）")
+            return
+        on_transcript = pending["on_transcript"]
+        self.last_commit_latency = time.perf_counter() - pending["released_at"]
+        if self.tracer:
+            self.tracer.mark("asr_final")
+        print(f"\n  ⏱ 松开按键到转录完成: {self.last_commit_latency * 1000:.0f}ms")
+        if on_transcript:
+            on_transcript(transcript)
+
     def stop(self):
         print("\n正在停止...")
-        stop_event.set()
+        self.stop_event.set()
         
         if self.stream:
             self.stream.stop_stream()
@@ -0,0 +1,88 @@
+import threading
+
+from PyQt6.QtCore import QTimer, pyqtSignal
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import QTextEdit
+
+
+# =========================================
+# 流式字幕控件
+# =========================================
+# 流式回复每秒可达上百个 token。逐 token 发信号、插入文本、滚动会让 GUI 线程一直忙于排版，
+# 长时间会话里 QTextEdit 也会无限增长。这里：
+#   1. append_stream 可在任意线程调用，只把文本放进缓冲区；缓冲区由空变非空时才发一次信号唤醒 GUI 线程
+#   2. GUI 线程用单次 QTimer 按 fps 合并刷新：一次 insertText + 一次滚动到底部
+#   3. 文档超过 max_chars 时从头部整块删除（当前正在输出的块过长时只删其开头），不重设全文；
+#      关闭撤销栈，否则每次插入都会留下撤销记录，内存照样增长
+
+class StreamTextView(QTextEdit):
+
+    wake_signal = pyqtSignal()
+
+    def __init__(self, parent=None, fps=40, max_chars=1200):
+        super().__init__(parent)
+        self.max_chars = max_chars
+        self.document().setUndoRedoEnabled(False)
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._scheduled = False
+        self.flushes = 0        # 刷新次数，供基准测试统计
+        self.trimmed_chars = 0  # 从头部删除的字符数
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(1, 1000 // fps))
+        self._timer.timeout.connect(self.flush)
+        self.wake_signal.connect(self._schedule)
+
+    def append_stream(self, text):
+        """追加流式文本，线程安全"""
+        if not text:
+            return
+        with self._lock:
+            self._pending.append(text)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        # 跨线程时信号自动排队到 GUI 线程
+        self.wake_signal.emit()
+
+    def _schedule(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """把缓冲区文本一次性写入文档（GUI 线程）"""
+        with self._lock:
+            text = "".join(self._pending)
+            self._pending.clear()
+            self._scheduled = False
+        if not text:
+            return
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        self._trim()
+        self.flushes += 1
+
+        # 自动滚动到底部
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def _trim(self):
+        document = self.document()
+        excess = document.characterCount() - self.max_chars
+        if excess <= 0:
+            return
+        block = document.findBlock(excess)
+        if block.next().isValid():
+            # 删到 excess 所在块的末尾（含换行），保证头部删掉的是完整的块
+            end = block.position() + block.length()
+        else:
+            end = excess
+        cursor = QTextCursor(document)
+        cursor.setPosition(0)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.trimmed_chars += end
@@ -0,0 +1,92 @@
+"""
+Benchmark the microphone upload policy of speechToText.RealtimeSTT: capture
+chunk size (chunk_frames) and how many chunks are coalesced per append
+(upload_batch).
+
+Each configuration records SPEECH_SECONDS of push-to-talk audio from a NullAudio
+microphone, uploads it to a local FakeAsrServer and commits on release.
+Reports append messages per second and bytes on the wire per second of audio
+(the throughput cost), the callback-to-send latency from RealtimeSTT.upload_stats
+(p50 / p95), the median age of the oldest sample when it is sent (latency plus
+one chunk, which the device holds before the callback), and the time from key release to the final transcript (the latency the user
+feels).
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\asr_upload_bench.py
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeAsrServer, NullAudio  # noqa: E402
+from speechToText import SAMPLE_RATE, RealtimeSTT  # noqa: E402
+
+SPEECH_SECONDS = 3.0
+UTTERANCES = 3
+# (chunk_frames, upload_batch)
+CONFIGS = [(320, 1), (640, 1), (1600, 1), (320, 5), (1600, 3)]
+
+
+def run(server: FakeAsrServer, chunk_frames: int, upload_batch: int) -> str:
+    stt = RealtimeSTT(url=server.url, audio=NullAudio(), chunk_frames=chunk_frames, upload_batch=upload_batch)
+    stt.start()
+    stt.pause()
+    time.sleep(0.2)
+
+    appends_before = len(server.appends)
+    release_ms = []
+    for _ in range(UTTERANCES):
+        done = threading.Event()
+        stt.resume_async()
+        time.sleep(SPEECH_SECONDS)
+        released_at = time.perf_counter()
+        stt.commit_async(on_transcript=lambda text: done.set())
+        done.wait(10)
+        release_ms.append((time.perf_counter() - released_at) * 1000 - server.transcribe_latency * 1000)
+    stt.stop()
+
+    appends = server.appends[appends_before:]
+    audio_seconds = SPEECH_SECONDS * UTTERANCES
+    latencies = sorted(stat["latency_ms"] for stat in stt.upload_stats)
+    chunk_ms = chunk_frames * 1000 / SAMPLE_RATE
+    return (
+        f"{chunk_ms:>6.0f}ms x{upload_batch:<4}"
+        f"{len(appends) / audio_seconds:>9.1f}"
+        f"{sum(size for _, size in appends) / audio_seconds / 1024:>10.1f}"
+        f"{statistics.median(latencies):>10.1f}"
+        f"{latencies[int(len(latencies) * 0.95)]:>10.1f}"
+        f"{statistics.median(latencies) + chunk_ms:>10.1f}"
+        f"{statistics.median(release_ms):>14.1f}"
+    )
+
+
+def main() -> int:
+    server = FakeAsrServer(port=8781).start()
+    rows = [run(server, chunk_frames, upload_batch) for chunk_frames, upload_batch in CONFIGS]
+    print()
+    print(f"[info] {UTTERANCES} x {SPEECH_SECONDS:.0f}s utterances per config; release->commit excludes the "
+          f"{server.transcribe_latency * 1000:.0f}ms fake transcription time")
+    print(f"{'policy':<14}{'msgs/s':>9}{'KB/s wire':>10}{'p50 ms':>10}{'p95 ms':>10}{'age ms':>10}{'release ms':>14}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
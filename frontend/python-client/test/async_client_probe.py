@@ -0,0 +1,159 @@
+"""
+Check that a slow action batch no longer stalls LLM stream chunks, using a local
+stand-in for the Spring WebSocket server.
+
+The stand-in server sends one action batch whose command sleeps for
+ACTION_SECONDS, then immediately streams STREAM_CHUNKS text chunks. For both the
+threaded WebSocketClient and AsyncWebSocketClient the script reports how long
+chunks waited between being sent and reaching text_callback, and whether the
+action result still arrived. text_callback also sends one message back through
+client.ws when the last chunk arrives. In the asyncio client that callback runs on
+the event loop thread, so that send must not block waiting for the loop. TTS and screen capture are replaced by in-process
+stand-ins so no DashScope connection is needed. pyautogui is still imported, so
+a desktop session is required.
+
+Install dependencies before running:
+    pip install websocket-client websockets
+
+Run from the repository root:
+    python frontend\\python-client\\test\\async_client_probe.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import websockets
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from async_web_client import AsyncWebSocketClient  # noqa: E402
+from new_web_client import WebSocketClient  # noqa: E402
+
+HOST = "127.0.0.1"
+PORT = 8766
+ACTION_SECONDS = 2.0
+STREAM_CHUNKS = 40
+CHUNK_INTERVAL = 0.02
+
+
+class StandInTTS:
+    def __init__(self) -> None:
+        self.chunks: list[str] = []
+
+    def process_llm_chunk(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+
+    def flush_pending(self) -> None:
+        pass
+
+
+class StandInCapture:
+    width = 1920
+    height = 1080
+
+
+def slow_action(self, wait=1.5):
+    time.sleep(ACTION_SECONDS)
+    return "slow action done"
+
+
+class ProbeClient(WebSocketClient):
+    slow_action = slow_action
+
+
+class AsyncProbeClient(AsyncWebSocketClient):
+    slow_action = slow_action
+
+
+async def stand_in_server(connection, results: dict) -> None:
+    await connection.send(json.dumps({
+        "type": "action", "code": 200, "content": "", "callId": "call_1",
+        "actions": [{"command": "slow_action", "params": {}}],
+    }))
+    for index in range(STREAM_CHUNKS):
+        await connection.send(json.dumps({
+            "type": "stream", "code": 200, "content": f"{time.perf_counter():.6f}|", "end": index == STREAM_CHUNKS - 1,
+        }))
+        await asyncio.sleep(CHUNK_INTERVAL)
+    async def collect() -> None:
+        async for message in connection:
+            request = json.loads(message)
+            if request.get("type") == "stream ack":
+                results["ack"] = True
+            if request.get("callId") == "call_1":
+                results["action_result"] = request.get("data")
+            if "ack" in results and "action_result" in results:
+                break
+
+    # 线程版客户端在动作结果之后才处理完流式消息，ack 会晚到；等不到 ack 时超时关闭
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(collect(), ACTION_SECONDS + 3.0)
+    await connection.close()
+
+
+def start_server(results: dict) -> threading.Event:
+    ready = threading.Event()
+
+    async def serve() -> None:
+        async with websockets.serve(lambda c: stand_in_server(c, results), HOST, PORT):
+            ready.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    return ready
+
+
+def run(name: str, client_class, results: dict) -> None:
+    delays: list[float] = []
+
+    def text_callback(text: str) -> None:
+        delays.append((time.perf_counter() - float(text.rstrip("|"))) * 1000)
+        if len(delays) == STREAM_CHUNKS:
+            client.ws.send(json.dumps({"type": "stream ack"}))
+
+    results.clear()
+    client = client_class(f"ws://{HOST}:{PORT}", text_callback=text_callback,
+                          tts=StandInTTS(), capture=StandInCapture())
+    client.input_loop = lambda: None  # 不读取 stdin
+    client.connect()
+
+    delays.sort()
+    print(
+        f"{name:<8}"
+        f"{len(delays):>8}"
+        f"{statistics.median(delays):>12.1f}"
+        f"{delays[int(len(delays) * 0.95)]:>12.1f}"
+        f"{delays[-1]:>12.1f}"
+        f"{'yes' if results.get('ack') else 'no':>6}"
+        f"   {results.get('action_result')}"
+    )
+
+
+def main() -> int:
+    results: dict = {}
+    if not start_server(results).wait(5):
+        print("[error] Stand-in server did not start.")
+        return 1
+    print(f"[info] action batch sleeps {ACTION_SECONDS}s, {STREAM_CHUNKS} chunks every {CHUNK_INTERVAL * 1000:.0f}ms")
+    print()
+    print(f"{'client':<8}{'chunks':>8}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}{'ack':>6}   action result")
+    run("thread", ProbeClient, results)
+    run("asyncio", AsyncProbeClient, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
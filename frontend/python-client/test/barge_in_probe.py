@@ -0,0 +1,110 @@
+"""
+Measure barge-in: how long after the push-to-talk key goes down the speaker is
+silent, how long the calling (GUI / keyboard) thread is held, and how quickly
+the TTS service stops synthesizing the abandoned reply.
+
+A long multi-sentence reply is synthesized by a local FakeTtsServer and played
+into a NullAudio device in callback mode, as ui.AssistantWindow does. Mid-reply
+the script calls StreamingTTS.interrupt(), which is what
+AssistantWindow.barge_in runs for a Space press. The "no cancel" row replaces
+the service-side cancel with a no-op to show what the cancel buys. The
+"stalled send" row makes the next commit's send hang for STALL_SECONDS (a
+stalled TTS socket) and interrupts while it hangs: the call must still return
+at once, because sends happen outside the scheduler lock.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\barge_in_probe.py
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+LONG_REPLY = (
+    "我先把设置面板打开。再切换到显示选项卡。然后把缩放比例调到百分之一百。"
+    "接着检查一下字体平滑有没有打开。最后重启一下浏览器让设置生效。"
+)
+RUNS = 10
+STALL_SECONDS = 1.0
+
+
+def probe(server: FakeTtsServer, mode: str) -> tuple[float, float, float, float, float]:
+    """返回 (调用耗时, 按键到静音, 按键到服务端收到取消, 按键后仍被合成的音频秒数, 按键到可开始下一轮) """
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback")
+    if mode == "no cancel":
+        tts.tts.cancel_response = lambda: None
+    tts.start()
+    tts.process_llm_chunk(LONG_REPLY)
+    tts.flush_pending()
+    while audio.first_sound is None:
+        time.sleep(0.005)
+    if mode == "stalled send":
+        # 下一句的发送卡住 STALL_SECONDS，在卡住期间打断
+        stalling = threading.Event()
+        append_text = tts.tts.append_text
+
+        def stalled_append(text: str) -> None:
+            stalling.set()
+            time.sleep(STALL_SECONDS)
+            append_text(text)
+
+        tts.tts.append_text = stalled_append
+        stalling.wait(10)
+        time.sleep(0.05)
+    else:
+        time.sleep(0.6 + random.uniform(0, 0.02))
+
+    server.cancels.clear()
+    pressed_at = time.perf_counter()
+    tts.interrupt()
+    call_ms = (time.perf_counter() - pressed_at) * 1000
+
+    deadline = pressed_at + 15
+    while tts.scheduler.in_flight and time.perf_counter() < deadline:
+        time.sleep(0.002)
+    ready_ms = (time.perf_counter() - pressed_at) * 1000
+    time.sleep(0.1)
+
+    silence_ms = (max(end for _, end in audio.sounds) - pressed_at) * 1000
+    cancel_ms = (server.cancels[0] - pressed_at) * 1000 if server.cancels else float("nan")
+    wasted_s = sum(1 for moment in server.deltas if moment > pressed_at) * server.delta_seconds
+    tts.callback._stream.close()
+    tts.tts.close()
+    return call_ms, silence_ms, cancel_ms, wasted_s, ready_ms
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8773, speed=1.5).start()
+    print(f"[info] {RUNS} runs per mode, medians reported; TTS first packet "
+          f"{server.first_packet_latency * 1000:.0f}ms, synthesis {server.speed:.1f}x realtime")
+    print(f"{'mode':<14}{'call ms':>9}{'silent ms':>11}{'cancel ms':>11}{'wasted s':>10}{'ready ms':>10}")
+    for name in ("no cancel", "barge-in", "stalled send"):
+        server.deltas.clear()
+        results = [probe(server, name) for _ in range(RUNS)]
+        call_ms, silence_ms, cancel_ms, wasted_s, ready_ms = (statistics.median(column) for column in zip(*results))
+        print(f"{name:<14}{call_ms:>9.2f}{silence_ms:>11.1f}{cancel_ms:>11.1f}{wasted_s:>10.1f}{ready_ms:>10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Compare base64-in-JSON and binary WebSocket frames for screenshot uploads
+against a local echo server.
+
+The server mimics what the Spring handler has to do per frame (parse JSON and
+base64-decode, or parse the binary header) and replies with a short ack, so the
+measured round trip includes both the client-side encode and the server-side
+decode. CPU time covers client and server together, since both run in this
+process.
+
+Install dependencies before running:
+    pip install websocket-client websockets
+
+Run from the repository root:
+    python frontend\\python-client\\test\\binary_frames_bench.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import websocket
+import websockets
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+import binary_frames  # noqa: E402
+
+HOST = "127.0.0.1"
+PORT = 8765
+FRAMES = 200
+PAYLOAD_BYTES = 100 * 1024  # 约等于 1024px JPEG 85 截图
+
+
+async def handle(connection) -> None:
+    async for message in connection:
+        if isinstance(message, bytes):
+            frame = binary_frames.decode_frame(message)
+            size = len(frame["data"])
+        else:
+            request = json.loads(message)
+            size = len(base64.b64decode(request["data"]))
+        await connection.send(str(size))
+
+
+def start_server() -> threading.Event:
+    ready = threading.Event()
+
+    async def serve() -> None:
+        async with websockets.serve(handle, HOST, PORT, max_size=None):
+            ready.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    return ready
+
+
+def send_json(ws: websocket.WebSocket, payload: bytes, call_id: str) -> int:
+    message = json.dumps({
+        "type": "screen shot",
+        "data": base64.b64encode(payload).decode("utf-8"),
+        "code": 200,
+        "callId": call_id,
+    })
+    ws.send(message)
+    return len(message)
+
+
+def send_binary(ws: websocket.WebSocket, payload: bytes, call_id: str) -> int:
+    frame = binary_frames.encode_frame("screen shot", payload, 200, call_id)
+    ws.send(frame, opcode=websocket.ABNF.OPCODE_BINARY)
+    return len(frame)
+
+
+def run(name: str, sender, payload: bytes) -> None:
+    ws = websocket.create_connection(f"ws://{HOST}:{PORT}")
+    wire_bytes = sender(ws, payload, "warm-up")
+    ws.recv()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for index in range(FRAMES):
+        sender(ws, payload, f"call_{index}")
+        assert int(ws.recv()) == len(payload)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    ws.close()
+
+    print(
+        f"{name:<8}"
+        f"{wire_bytes / 1024:>12.1f}"
+        f"{FRAMES / wall:>12.1f}"
+        f"{FRAMES * len(payload) / wall / 1024 / 1024:>12.1f}"
+        f"{cpu * 1000 / FRAMES:>14.3f}"
+        f"{wall * 1000 / FRAMES:>12.3f}"
+    )
+
+
+def main() -> int:
+    if not start_server().wait(5):
+        print("[error] Echo server did not start.")
+        return 1
+    payload = os.urandom(PAYLOAD_BYTES)
+    print(f"[info] {FRAMES} frames of {PAYLOAD_BYTES // 1024} KiB each")
+    print()
+    print(f"{'mode':<8}{'wire KiB':>12}{'frames/s':>12}{'MiB/s':>12}{'cpu ms/frame':>14}{'rtt ms':>12}")
+    run("json", send_json, payload)
+    run("binary", send_binary, payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
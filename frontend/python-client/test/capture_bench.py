@@ -0,0 +1,95 @@
+"""
+Micro-benchmark screen capture: a fresh mss() per call versus the persistent
+ScreenCaptureWorker ring buffer. Reports per-call latency and the memory
+allocated per call (tracemalloc, which also sees NumPy buffers).
+
+Needs a real desktop session. Run from the repository root:
+    python frontend\\python-client\\test\\capture_bench.py
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+from mss import mss
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from screen_capture import ScreenCaptureWorker  # noqa: E402
+
+CALLS = 50
+
+
+def capture_per_call() -> np.ndarray:
+    # 旧实现：每次截图都新建 mss 句柄并分配新的数组
+    with mss() as sct:
+        screenshot = sct.grab(sct.monitors[1])
+    img = np.array(screenshot)
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+
+def measure(name: str, capture: Callable[[], np.ndarray]) -> None:
+    capture()  # warm-up
+    latencies = []
+    tracemalloc.start()
+    for _ in range(CALLS):
+        start = time.perf_counter()
+        capture()
+        latencies.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size for stat in snapshot.statistics("filename"))
+
+    latencies.sort()
+    print(
+        f"{name:<10}"
+        f"{statistics.mean(latencies):>10.2f}"
+        f"{latencies[len(latencies) // 2]:>10.2f}"
+        f"{latencies[int(len(latencies) * 0.95)]:>10.2f}"
+        f"{peak / 1024 / 1024:>14.1f}"
+        f"{allocated / 1024:>14.1f}"
+    )
+
+
+def main() -> int:
+    worker = ScreenCaptureWorker()
+    try:
+        worker.start()
+    except RuntimeError as exc:
+        print(f"[error] {exc}")
+        return 1
+    print(f"[info] monitor {worker.width}x{worker.height}, {CALLS} calls each")
+    print()
+    print(f"{'mode':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'peak MiB':>14}{'retained KiB':>14}")
+
+    measure("per-call", capture_per_call)
+
+    def capture_latest() -> np.ndarray:
+        frame, _, _ = worker.latest()
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+    def capture_fresh() -> np.ndarray:
+        frame, _, _ = worker.latest(newer_than=time.monotonic())
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+    measure("latest", capture_latest)
+    measure("fresh", capture_fresh)
+    worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Benchmark speechToText.CaptureQueue under a network stall.
+
+A stand-in microphone thread puts a 20ms chunk every 20ms for RUN_SECONDS. A
+stand-in sender takes chunks and spends SEND_SECONDS on each, but stops
+completely between STALL_START and STALL_END, as a stuck WebSocket send would.
+For an effectively unbounded queue and for each bounded policy the script
+reports peak backlog, dropped and late chunks, the oldest queued audio that was
+still sent once the stall ended, how long after the stall the sender was back
+to live audio, and the longest time the microphone callback was held by put().
+
+Run from the repository root:
+    python frontend\\python-client\\test\\capture_queue_bench.py
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from speechToText import CaptureQueue  # noqa: E402
+
+CHUNK_SECONDS = 0.02
+CHUNK_BYTES = 640
+RUN_SECONDS = 5.0
+STALL_START = 1.0
+STALL_END = 3.5
+SEND_SECONDS = 0.002
+MAX_BACKLOG_SECONDS = 1.0
+LIVE_AGE = 0.1  # 发出时音频年龄低于该值视为已追上实时
+
+
+def run(name: str, capture: CaptureQueue) -> str:
+    started = time.perf_counter()
+    finished = threading.Event()
+    put_costs: list[float] = []
+    sent: list[tuple[float, float]] = []  # (发出时刻, 音频年龄)
+
+    def microphone() -> None:
+        deadline = started
+        while deadline - started < RUN_SECONDS:
+            deadline += CHUNK_SECONDS
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            begin = time.perf_counter()
+            capture.put((begin, bytes(CHUNK_BYTES)))
+            put_costs.append(time.perf_counter() - begin)
+        finished.set()
+
+    def sender() -> None:
+        while not (finished.is_set() and capture.empty()):
+            try:
+                captured_at, _ = capture.get(timeout=0.1)
+            except Exception:
+                continue
+            now = time.perf_counter()
+            if STALL_START <= now - started < STALL_END:
+                time.sleep(STALL_END - (now - started))
+            time.sleep(SEND_SECONDS)
+            done = time.perf_counter()
+            sent.append((done - started, done - captured_at))
+
+    threads = [threading.Thread(target=microphone), threading.Thread(target=sender)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = capture.stats()
+    # 卡顿结束后第一块是卡顿开始时已取在手里的，跳过它，看队列里积压音频的年龄
+    after_stall = [age for moment, age in sent if moment > STALL_END][1:]
+    catch_up = next((moment - STALL_END for moment, age in sent if moment > STALL_END and age < LIVE_AGE),
+                    float("nan"))
+    return (
+        f"{name:<14}"
+        f"{stats['peak'] * CHUNK_BYTES / 1024:>9.1f}"
+        f"{stats['dropped']:>9}"
+        f"{stats['late']:>7}"
+        f"{max(after_stall) * 1000:>16.0f}"
+        f"{catch_up * 1000:>12.0f}"
+        f"{max(put_costs) * 1000:>11.1f}"
+    )
+
+
+def main() -> int:
+    maxsize = int(MAX_BACKLOG_SECONDS / CHUNK_SECONDS)
+    rows = [run("unbounded", CaptureQueue(maxsize=10 ** 9))]
+    for policy in CaptureQueue.POLICIES:
+        rows.append(run(policy, CaptureQueue(maxsize=maxsize, policy=policy)))
+    print(f"[info] {RUN_SECONDS:.0f}s of {CHUNK_SECONDS * 1000:.0f}ms chunks, sender stalled "
+          f"{STALL_START:.1f}s-{STALL_END:.1f}s, bound {MAX_BACKLOG_SECONDS * 1000:.0f}ms ({maxsize} chunks)")
+    print(f"{'queue':<14}{'peak KB':>9}{'dropped':>9}{'late':>7}{'backlog age ms':>16}{'catch-up ms':>12}{'max put ms':>11}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Offline performance suite for the Python client hot paths.
+
+Everything runs against the local stand-ins in fake_services.py, so no network
+access, API key or Spring server is needed:
+
+    on_message          WebSocketClient.on_message on the recorded BaseResponse stream
+    process_llm_chunk   StreamingTTS.process_llm_chunk on the recorded reply text, committing to FakeTtsServer
+    handle_screenshot   capture -> resize -> JPEG -> send, from a static 1920x1080 desktop frame
+    audio.ring          PcmRingBuffer: one 100ms TTS delta written, five 20ms frames read
+    audio.callback      StreamingTTS.audio_callback, one 20ms frame
+    audio.mixer         AudioMixer.audio_callback mixing four voices, one 20ms frame
+    audio.vad           EnergyVad.feed, one 100ms microphone chunk
+    audio.upload        RealtimeSTT batching and base64 encoding of one 100ms microphone chunk
+    session.replay      the recorded session (recordings/chat_session.jsonl) replayed by FakeChatServer to a
+                        connected WebSocketClient: stream, screenshot request, action batch with captureAfter
+
+Each case reports operations per second and the p50 / p95 time per operation,
+taken from the fastest of ROUNDS rounds to keep other processes out of the numbers.
+session.replay reports the action round trips as seen by the server.
+
+--save FILE writes the results as JSON. --compare FILE compares p50 with a saved
+run and exits with status 1 when a case is slower than the tolerance allows
+(and by more than --min-us, so scheduler noise on microsecond cases does not
+fail the run), so a regression can be caught before it ships. The GUI actions of the recording
+are replaced by no-ops, but new_web_client still imports pyautogui, so a desktop
+session is required.
+
+Install dependencies before running:
+    pip install websocket-client websockets dashscope pyaudio opencv-python numpy
+
+Run from the repository root:
+    python frontend\\python-client\\test\\client_perf_suite.py [--save FILE] [--compare FILE] [--tolerance 0.25] [--min-us 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import cv2
+import numpy as np
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from audio_buffer import PcmRingBuffer, ms_to_bytes  # noqa: E402
+from fake_services import FakeChatServer, FakeTtsServer, NullAudio, load_recording  # noqa: E402
+from new_web_client import WebSocketClient  # noqa: E402
+from speechToText import RealtimeSTT  # noqa: E402
+from voice_activity import EnergyVad  # noqa: E402
+from voiceConverter import AudioMixer, StreamingTTS  # noqa: E402
+
+RECORDING = Path(__file__).resolve().parent / "recordings" / "chat_session.jsonl"
+CHAT_PORT = 8601
+TTS_PORT = 8778
+ROUNDS = 5
+
+
+class StandInTTS:
+    def process_llm_chunk(self, chunk: str) -> None:
+        pass
+
+    def flush_pending(self) -> None:
+        pass
+
+
+class StandInCapture:
+    width = 1920
+    height = 1080
+
+    def __init__(self) -> None:
+        # 类似桌面的画面：标题栏、任务栏和几行文字，JPEG 体积接近真实截图
+        frame = np.full((1080, 1920, 4), 235, dtype=np.uint8)
+        cv2.rectangle(frame, (0, 0), (1920, 60), (60, 60, 60, 255), -1)
+        cv2.rectangle(frame, (0, 1020), (1920, 1080), (40, 40, 40, 255), -1)
+        for line in range(24):
+            cv2.putText(frame, f"document line {line} " + "lorem ipsum " * 8, (60, 120 + line * 36),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (30, 30, 30, 255), 1)
+        self.frame = frame
+
+    def latest(self, newer_than=None, timeout=1.0, copy=False):
+        return (self.frame.copy() if copy else self.frame), 0, time.monotonic()
+
+
+class CountingSocket:
+    """代替 WebSocketApp：只统计发出的字节数"""
+
+    def __init__(self) -> None:
+        self.sent_bytes = 0
+
+    def send(self, data, opcode=None) -> None:
+        self.sent_bytes += len(data)
+
+
+class StandInConversation:
+    def append_audio(self, audio_b64: str) -> None:
+        pass
+
+
+class ReplayClient(WebSocketClient):
+    """回放用客户端：GUI 动作不操作鼠标键盘，动作后不等待界面稳定"""
+
+    def settle(self, wait, action):
+        pass
+
+    def click_position(self, x, y, wait=1.5):
+        return f"Clicked at ({x}, {y})"
+
+    def type_text(self, text, press_enter=False, wait=1.5):
+        return f"Typed: {text}"
+
+    def input_loop(self):
+        self.send_message("帮我把浏览器缩放调到百分之一百")
+
+
+def summarize(name: str, unit: str, timings: list[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "case": name,
+        "unit": unit,
+        "ops_per_s": len(timings) / sum(timings),
+        "p50_us": statistics.median(timings) * 1e6,
+        "p95_us": timings[int(len(timings) * 0.95)] * 1e6,
+    }
+
+
+def measure(name: str, unit: str, operation: Callable[[], None], repeat: int, warmup: int = 5) -> dict:
+    # 分 ROUNDS 轮测量，取 p50 最低的一轮，减少其他进程抢占 CPU 带来的抖动
+    rounds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            operation()
+        for _ in range(ROUNDS):
+            timings = []
+            for _ in range(max(1, repeat // ROUNDS)):
+                begin = time.perf_counter()
+                operation()
+                timings.append(time.perf_counter() - begin)
+            rounds.append(summarize(name, unit, timings))
+    return min(rounds, key=lambda row: row["p50_us"])
+
+
+def recorded_messages() -> list[str]:
+    return [json.dumps(step["send"], ensure_ascii=False) for step in load_recording(RECORDING)
+            if "send" in step and step["send"]["type"] == "stream"]
+
+
+def case_on_message() -> dict:
+    client = ReplayClient("ws://unused", tts=StandInTTS(), capture=StandInCapture())
+    messages = recorded_messages()
+    state = {"index": 0}
+
+    def operation() -> None:
+        client.on_message(None, messages[state["index"] % len(messages)])
+        state["index"] += 1
+
+    return measure("on_message", "message", operation, repeat=20000)
+
+
+def case_process_llm_chunk(server: FakeTtsServer) -> dict:
+    tts = StreamingTTS(url=server.url, audio=NullAudio(), output_mode="callback")
+    with contextlib.redirect_stdout(io.StringIO()):
+        tts.start()
+    chunks = [json.loads(message)["content"] for message in recorded_messages()]
+    state = {"index": 0}
+
+    def operation() -> None:
+        tts.process_llm_chunk(chunks[state["index"] % len(chunks)])
+        state["index"] += 1
+
+    result = measure("process_llm_chunk", "chunk", operation, repeat=3000)
+    tts.interrupt()
+    tts.tts.close()
+    return result
+
+
+def case_handle_screenshot() -> dict:
+    client = ReplayClient("ws://unused", tts=StandInTTS(), capture=StandInCapture())
+    client.ws = CountingSocket()
+    return measure("handle_screenshot", "screenshot", lambda: client.handle_screenshot("call_bench"), repeat=100)
+
+
+def case_ring() -> dict:
+    ring = PcmRingBuffer()
+    delta = bytes(ms_to_bytes(100))
+    frame = bytearray(ring.frame_bytes)
+
+    def operation() -> None:
+        ring.write(delta)
+        for _ in range(5):
+            ring.read_into(frame)
+
+    return measure("audio.ring", "100ms", operation, repeat=20000)
+
+
+def case_callback() -> dict:
+    tts = StreamingTTS(audio=NullAudio(), output_mode="callback")
+    frames = tts.pcm_buffer.frame_bytes // 2
+    delta = bytes(ms_to_bytes(100))
+
+    def operation() -> None:
+        if tts.pcm_buffer.available() < tts.pcm_buffer.frame_bytes:
+            tts.pcm_buffer.write(delta)
+        tts.audio_callback(None, frames, None, 0)
+
+    return measure("audio.callback", "20ms frame", operation, repeat=20000)
+
+
+def case_mixer() -> dict:
+    mixer = AudioMixer(audio=NullAudio())
+    rings = [PcmRingBuffer() for _ in range(4)]
+    for index, ring in enumerate(rings):
+        mixer.add_source(f"voice{index}", ring.read_into, gain=1.0 if index else 0.8)
+    delta = b"\x10\x01" * (ms_to_bytes(100) // 2)
+    frames = mixer.frame_bytes // 2
+
+    def operation() -> None:
+        for ring in rings:
+            if ring.available() < ring.frame_bytes:
+                ring.write(delta)
+        mixer.audio_callback(None, frames, None, 0)
+
+    return measure("audio.mixer", "20ms frame", operation, repeat=20000)
+
+
+def case_vad() -> dict:
+    vad = EnergyVad()
+    rng = np.random.default_rng(0)
+    chunks = [(rng.normal(0, 800 if index % 3 else 30, 1600)).astype(np.int16).tobytes() for index in range(30)]
+    state = {"index": 0}
+
+    def operation() -> None:
+        vad.feed(chunks[state["index"] % len(chunks)])
+        state["index"] += 1
+
+    return measure("audio.vad", "100ms chunk", operation, repeat=5000)
+
+
+def case_upload() -> dict:
+    stt = RealtimeSTT(audio=NullAudio())
+    stt.conversation = StandInConversation()
+    chunk = bytes(3200)
+
+    def operation() -> None:
+        stt._queue_upload(time.perf_counter(), chunk)
+
+    return measure("audio.upload", "100ms chunk", operation, repeat=20000)
+
+
+def case_session_replay() -> tuple[dict, list[float]]:
+    recording = load_recording(RECORDING)
+    server = FakeChatServer(recording, port=CHAT_PORT, time_scale=0.0).start()
+    timings = []
+    round_trips: list[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(10):
+            before = len(server.round_trips)
+            client = ReplayClient(server.url, tts=StandInTTS(), capture=StandInCapture())
+            begin = time.perf_counter()
+            client.connect()
+            timings.append(time.perf_counter() - begin)
+            round_trips.extend(seconds for _, seconds in server.round_trips[before:])
+    return summarize("session.replay", "session", timings), round_trips
+
+
+def compare(results: list[dict], baseline_path: str, tolerance: float, min_us: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {row["case"]: row for row in json.load(f)}
+    regressions = 0
+    print()
+    print(f"{'case':<20}{'baseline us':>13}{'now us':>12}{'change':>9}")
+    for row in results:
+        before = baseline.get(row["case"])
+        if before is None:
+            continue
+        change = row["p50_us"] / before["p50_us"] - 1
+        flag = ""
+        # 微秒级的用例容易受调度抖动影响，绝对差值也要超过 min_us 才算退化
+        if change > tolerance and row["p50_us"] - before["p50_us"] > min_us:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{row['case']:<20}{before['p50_us']:>13.1f}{row['p50_us']:>12.1f}{change:>+9.0%}{flag}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare p50 with a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown before failing")
+    parser.add_argument("--min-us", type=float, default=5.0, help="ignore p50 slowdowns smaller than this")
+    args = parser.parse_args()
+
+    tts_server = FakeTtsServer(port=TTS_PORT, first_packet_latency=0.0, speed=50.0).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [
+            case_on_message(),
+            case_process_llm_chunk(tts_server),
+            case_handle_screenshot(),
+            case_ring(),
+            case_callback(),
+            case_mixer(),
+            case_vad(),
+            case_upload(),
+        ]
+        replay, round_trips = case_session_replay()
+    results.append(replay)
+
+    print()
+    print(f"{'case':<20}{'unit':<13}{'ops/s':>12}{'p50 us':>12}{'p95 us':>12}")
+    for row in results:
+        print(f"{row['case']:<20}{row['unit']:<13}{row['ops_per_s']:>12.0f}{row['p50_us']:>12.1f}{row['p95_us']:>12.1f}")
+    round_trips.sort()
+    print(f"[info] session.replay action round trips: {len(round_trips)}, "
+          f"p50 {statistics.median(round_trips) * 1000:.1f}ms, max {round_trips[-1] * 1000:.1f}ms")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[info] results saved to {args.save}")
+    if args.compare:
+        return compare(results, args.compare, args.tolerance, args.min_us)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
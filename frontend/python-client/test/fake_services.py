@@ -0,0 +1,411 @@
+"""
+Local stand-ins for the realtime services the Python client talks to, so that
+benchmarks and probes can run without network access or API keys.
+
+FakeTtsServer speaks the subset of the QwenTtsRealtime protocol used by
+voiceConverter.StreamingTTS (session.update, input_text_buffer.append/commit,
+response.cancel) and answers each commit with committed -> audio deltas ->
+response.done. Commits are synthesized one after another; the first-packet
+latency is counted from the commit, so a commit that waited in the queue starts
+streaming sooner. The first-packet latency and the synthesis speed can be tuned
+to match what is observed against DashScope. Commits whose text is listed in
+reject_texts are answered with an error event instead, like a rejected commit,
+and with silent_cancel a cancelled response ends without response.done. With
+stray_errors every committed event is followed by an error that belongs to no
+commit, like the "no active response" reply to a late response.cancel.
+
+FakeAsrServer speaks the manual-commit subset of the OmniRealtime protocol used
+by speechToText.RealtimeSTT and answers each commit with a final transcript,
+either a synthetic one or the next of a list of recorded transcripts.
+
+FakeChatServer stands in for the Spring BaseResponse WebSocket server on :8600.
+It replays a recorded session (see recordings/) to new_web_client.WebSocketClient:
+it waits for the client's chat message, streams the recorded reply, sends the
+recorded action and screenshot requests, waits for each result and records the
+round-trip time. Delays can be scaled and a one-way network latency added.
+
+NullAudio mimics the part of pyaudio.PyAudio that MyCallback and RealtimeSTT
+use. Input streams feed non-silent PCM to the callback in real time. Blocking
+writes are paced in real time and callback streams are pulled on a fixed
+period, like a sound card does. It records when each non-silent piece of audio
+plays and every underrun (the speaker went silent between two pieces of audio,
+whether because no write arrived or because silent frames were written).
+
+Install dependencies before use:
+    pip install websockets
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+
+import websockets
+
+TTS_SAMPLE_RATE = 24000
+TTS_BYTES_PER_SECOND = TTS_SAMPLE_RATE * 2
+UNDERRUN_TOLERANCE = 0.03  # 两段声音间隔超过该值视为断流（大于一帧）
+
+
+class FakeTtsServer:
+    """Realtime TTS stand-in: one response at a time, like the real service."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8770, first_packet_latency: float = 0.25,
+                 seconds_per_char: float = 0.12, speed: float = 4.0, delta_seconds: float = 0.1,
+                 reject_texts: Iterable[str] = (), silent_cancel: bool = False, stray_errors: bool = False) -> None:
+        self.host = host
+        self.port = port
+        self.first_packet_latency = first_packet_latency  # commit 到首个 delta 的时延
+        self.seconds_per_char = seconds_per_char          # 每个字符合成的音频时长
+        self.speed = speed                                # 合成速度，相对实时的倍数
+        self.delta_seconds = delta_seconds                # 每个 delta 携带的音频时长
+        self.reject_texts = set(reject_texts)             # 这些文本的 commit 以 error 事件拒绝
+        self.silent_cancel = silent_cancel                # 被取消的回复不发 response.done
+        self.stray_errors = stray_errors                  # 每个 committed 之后附带一个与 commit 无关的 error
+        self.commits: list[tuple[float, str]] = []        # (提交时刻, 文本)，便于基准脚本统计
+        self.cancels: list[float] = []                    # 收到 response.cancel 的时刻
+        self.deltas: list[float] = []                     # 每个音频 delta 发出的时刻
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "FakeTtsServer":
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        if not self._ready.wait(5):
+            raise RuntimeError("Fake TTS server did not start.")
+        return self
+
+    async def _serve(self) -> None:
+        async with websockets.serve(self._handle, self.host, self.port, max_size=None):
+            self._ready.set()
+            await asyncio.Future()
+
+    async def _handle(self, connection) -> None:
+        pending_text: list[str] = []
+        responses: asyncio.Queue = asyncio.Queue()
+        cancelled: set[str] = set()
+        current: dict[str, Optional[str]] = {"item_id": None}
+
+        async def send(event: dict) -> None:
+            event.setdefault("event_id", "event_" + uuid.uuid4().hex)
+            await connection.send(json.dumps(event))
+
+        async def synthesize() -> None:
+            # 服务端按提交顺序逐个生成回复
+            while True:
+                item_id, text, committed_at = await responses.get()
+                current["item_id"] = item_id
+                response_id = "resp_" + uuid.uuid4().hex
+                await send({"type": "response.created", "response": {"id": response_id}})
+                # 首包时延从 commit 时刻算起：排队期间已经完成的准备工作不再重复计时
+                await asyncio.sleep(max(0.0, committed_at + self.first_packet_latency - time.perf_counter()))
+                total = int(len(text) * self.seconds_per_char * TTS_BYTES_PER_SECOND) // 2 * 2
+                step = int(self.delta_seconds * TTS_BYTES_PER_SECOND) // 2 * 2
+                sent = 0
+                while sent < total and item_id not in cancelled:
+                    size = min(step, total - sent)
+                    # 非零 PCM，便于 NullAudio 区分真实音频与静音
+                    await send({"type": "response.audio.delta", "response_id": response_id, "item_id": item_id,
+                                "delta": base64.b64encode(b"\x01\x01" * (size // 2)).decode("ascii")})
+                    self.deltas.append(time.perf_counter())
+                    sent += size
+                    await asyncio.sleep(self.delta_seconds / self.speed)
+                current["item_id"] = None
+                if item_id in cancelled and self.silent_cancel:
+                    continue
+                await send({"type": "response.done", "response": {"id": response_id, "output": [{"id": item_id}]}})
+
+        worker = asyncio.create_task(synthesize())
+        await send({"type": "session.created", "session": {"id": "sess_" + uuid.uuid4().hex}})
+        try:
+            async for message in connection:
+                event = json.loads(message)
+                event_type = event.get("type")
+                if event_type == "session.update":
+                    await send({"type": "session.updated", "session": event.get("session", {})})
+                elif event_type == "input_text_buffer.append":
+                    pending_text.append(event.get("text", ""))
+                elif event_type == "input_text_buffer.commit":
+                    text = "".join(pending_text)
+                    pending_text.clear()
+                    item_id = "item_" + uuid.uuid4().hex
+                    committed_at = time.perf_counter()
+                    self.commits.append((committed_at, text))
+                    if text in self.reject_texts:
+                        await send({"type": "error", "error": {"type": "invalid_request_error", "code": "InvalidParameter",
+                                                               "message": "text rejected", "event_id": event.get("event_id")}})
+                        continue
+                    await send({"type": "input_text_buffer.committed", "item_id": item_id})
+                    await responses.put((item_id, text, committed_at))
+                    if self.stray_errors:
+                        await send({"type": "error", "error": {"type": "invalid_request_error",
+                                                               "code": "InvalidParameter",
+                                                               "message": "Conversation has no active response",
+                                                               "event_id": "event_" + uuid.uuid4().hex}})
+                elif event_type == "input_text_buffer.clear":
+                    pending_text.clear()
+                elif event_type == "response.cancel":
+                    self.cancels.append(time.perf_counter())
+                    if current["item_id"]:
+                        cancelled.add(current["item_id"])
+                elif event_type == "session.finish":
+                    await send({"type": "session.finished"})
+                    break
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            worker.cancel()
+
+
+class FakeAsrServer:
+    """
+    Realtime ASR stand-in for speechToText.RealtimeSTT in manual commit mode: counts appended audio and answers
+    each input_audio_buffer.commit with committed -> transcription.completed after transcribe_latency.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8780, transcribe_latency: float = 0.3,
+                 transcripts: Optional[list[str]] = None) -> None:
+        self.host = host
+        self.port = port
+        self.transcribe_latency = transcribe_latency  # commit 到最终转录结果的时延
+        self.transcripts = transcripts                # 录制的转录文本，按 commit 顺序循环回放；None 时按音频时长生成
+        self.commits: list[tuple[float, int]] = []    # (收到 commit 的时刻, 本次 commit 包含的音频字节数)
+        self.appends: list[tuple[float, int]] = []    # (收到 append 的时刻, 消息字节数)
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "FakeAsrServer":
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        if not self._ready.wait(5):
+            raise RuntimeError("Fake ASR server did not start.")
+        return self
+
+    async def _serve(self) -> None:
+        async with websockets.serve(self._handle, self.host, self.port, max_size=None):
+            self._ready.set()
+            await asyncio.Future()
+
+    async def _handle(self, connection) -> None:
+        buffered = 0
+
+        async def send(event: dict) -> None:
+            event.setdefault("event_id", "event_" + uuid.uuid4().hex)
+            await connection.send(json.dumps(event))
+
+        async def transcribe(item_id: str, size: int, index: int) -> None:
+            await asyncio.sleep(self.transcribe_latency)
+            if self.transcripts:
+                transcript = self.transcripts[index % len(self.transcripts)]
+            else:
+                transcript = f"{size / (16000 * 2):.2f}s of speech"
+            await send({"type": "conversation.item.input_audio_transcription.completed", "item_id": item_id,
+                        "transcript": transcript})
+
+        await send({"type": "session.created", "session": {"id": "sess_" + uuid.uuid4().hex}})
+        try:
+            async for message in connection:
+                event = json.loads(message)
+                event_type = event.get("type")
+                if event_type == "session.update":
+                    await send({"type": "session.updated", "session": event.get("session", {})})
+                elif event_type == "input_audio_buffer.append":
+                    self.appends.append((time.perf_counter(), len(message)))
+                    buffered += len(base64.b64decode(event.get("audio", "")))
+                elif event_type == "input_audio_buffer.commit":
+                    item_id = "item_" + uuid.uuid4().hex
+                    self.commits.append((time.perf_counter(), buffered))
+                    await send({"type": "input_audio_buffer.committed", "item_id": item_id})
+                    asyncio.create_task(transcribe(item_id, buffered, len(self.commits) - 1))
+                    buffered = 0
+                elif event_type == "session.finish":
+                    await send({"type": "session.finished"})
+                    break
+        except websockets.ConnectionClosed:
+            pass
+
+
+def load_recording(path) -> list[dict]:
+    """读取录制的会话（JSONL，每行一步）"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeChatServer:
+    """
+    BaseResponse server stand-in that replays a recorded session to every connection. Recording steps:
+        {"wait": "chat"}                    wait for the client's next chat message
+        {"after": 0.05, "send": {...}}      send a BaseResponse after the recorded gap
+        {"wait": "result"}                  wait for the client's reply to the last request with a callId
+    The connection is closed when the recording ends, so WebSocketClient.connect() returns.
+    """
+
+    def __init__(self, recording: list[dict], host: str = "127.0.0.1", port: int = 8600,
+                 one_way_latency: float = 0.0, time_scale: float = 1.0) -> None:
+        self.recording = recording
+        self.host = host
+        self.port = port
+        self.one_way_latency = one_way_latency  # 每条消息单向的网络时延
+        self.time_scale = time_scale            # 录制间隔的缩放，0 表示尽快回放
+        self.sent: list[tuple[float, dict]] = []            # (发出时刻, BaseResponse)
+        self.received: list[tuple[float, str, int]] = []    # (收到时刻, 类型, 消息字节数)
+        self.round_trips: list[tuple[str, float]] = []      # (callId, 请求发出到收到回复的秒数)
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def start(self) -> "FakeChatServer":
+        threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True).start()
+        if not self._ready.wait(5):
+            raise RuntimeError("Fake chat server did not start.")
+        return self
+
+    async def _serve(self) -> None:
+        async with websockets.serve(self._handle, self.host, self.port, max_size=None):
+            self._ready.set()
+            await asyncio.Future()
+
+    async def _receive(self, connection) -> dict:
+        message = await connection.recv()
+        await asyncio.sleep(self.one_way_latency)
+        if isinstance(message, bytes):
+            # 二进制帧只用于截图回复，这里只关心类型与大小
+            self.received.append((time.perf_counter(), "binary", len(message)))
+            return {"type": "binary"}
+        reply = json.loads(message)
+        self.received.append((time.perf_counter(), reply.get("type"), len(message)))
+        return reply
+
+    async def _handle(self, connection) -> None:
+        last_request = None  # (callId, 发出时刻)
+        try:
+            for step in self.recording:
+                if step.get("wait") == "chat":
+                    while (await self._receive(connection)).get("type") != "chat":
+                        pass
+                elif step.get("wait") == "result":
+                    await self._receive(connection)
+                    if last_request is not None:
+                        self.round_trips.append((last_request[0], time.perf_counter() - last_request[1]))
+                else:
+                    await asyncio.sleep(step.get("after", 0.0) * self.time_scale + self.one_way_latency)
+                    message = step["send"]
+                    sent_at = time.perf_counter()
+                    await connection.send(json.dumps(message, ensure_ascii=False))
+                    self.sent.append((sent_at, message))
+                    if message.get("callId"):
+                        last_request = (message["callId"], sent_at - self.one_way_latency)
+            await connection.close()
+        except websockets.ConnectionClosed:
+            pass
+
+
+class NullStream:
+    """Output stream stand-in: blocking write() paced in real time, or callback mode driven by a timer thread."""
+
+    def __init__(self, audio: "NullAudio", rate: int, channels: int, stream_callback=None,
+                 frames_per_buffer: Optional[int] = None, start: bool = True, input: bool = False) -> None:
+        self.audio = audio
+        self.bytes_per_second = rate * channels * 2
+        self.rate = rate
+        self.stream_callback = stream_callback
+        self.frames_per_buffer = frames_per_buffer or 1024
+        self.input = input
+        self._running = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if stream_callback is not None and start:
+            self.start_stream()
+
+    def _play(self, data: bytes) -> None:
+        # 记录一次输出：在 start 时刻开始发声，持续 len(data) 对应的时长
+        now = time.perf_counter()
+        duration = len(data) / self.bytes_per_second
+        sound = bool(data.strip(b"\x00"))
+        if sound:
+            if self.audio.first_sound is None:
+                self.audio.first_sound = now
+            elif now - self.audio.sound_until > UNDERRUN_TOLERANCE:
+                self.audio.gaps.append(now - self.audio.sound_until)
+            self.audio.sound_bytes += len(data)
+            self.audio.sounds.append((now, now + duration))
+            self.audio.sound_until = now + duration
+        self.audio.written += len(data)
+
+    def write(self, data, *args, **kwargs) -> None:
+        data = bytes(data)
+        self._play(data)
+        time.sleep(len(data) / self.bytes_per_second)
+
+    def _callback_loop(self) -> None:
+        # 像声卡一样按固定节拍索取 frames_per_buffer 个采样
+        period = self.frames_per_buffer / self.rate
+        deadline = time.perf_counter()
+        while self._running.is_set():
+            if self.input:
+                # 麦克风：按节拍把一块采集数据交给回调
+                deadline += period
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+                if not self._running.is_set():
+                    break
+                self.stream_callback(self.audio.capture(self.frames_per_buffer * 2), self.frames_per_buffer, None, 0)
+                continue
+            data, flag = self.stream_callback(None, self.frames_per_buffer, None, 0)
+            self._play(bytes(data))
+            if flag != 0:  # 非 paContinue
+                break
+            deadline += period
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def start_stream(self) -> None:
+        if self.stream_callback is not None and not self._running.is_set():
+            self._running.set()
+            self._thread = threading.Thread(target=self._callback_loop, daemon=True)
+            self._thread.start()
+
+    def stop_stream(self) -> None:
+        # 与 PortAudio 一致：返回时正在执行的回调已经结束
+        self._running.clear()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    def is_active(self) -> bool:
+        return self.stream_callback is None or self._running.is_set()
+
+    def close(self) -> None:
+        self._running.clear()
+
+
+class NullAudio:
+    """pyaudio.PyAudio stand-in for output streams (blocking or callback mode) and callback input streams."""
+
+    def __init__(self) -> None:
+        self.first_sound: Optional[float] = None
+        self.written = 0
+        self.sound_bytes = 0                     # 非静音输出的字节数
+        self.sound_until = 0.0                   # 上一段非静音输出播放完毕的时刻
+        self.sounds: list[tuple[float, float]] = []  # 每次非静音输出的 (开始, 结束) 时刻
+        self.gaps: list[float] = []              # 两段声音之间每次静音的时长（秒）
+        self.captured = 0                        # 输入流交给回调的字节数
+
+    def capture(self, size: int) -> bytes:
+        # 非零 PCM 代表“有人在说话”
+        self.captured += size
+        return b"\x01\x01" * (size // 2)
+
+    def open(self, format=None, channels=1, rate=TTS_SAMPLE_RATE, output=False, input=False, stream_callback=None,
+             frames_per_buffer=None, start=True, **kwargs) -> NullStream:
+        return NullStream(self, rate, channels, stream_callback, frames_per_buffer, start, input)
+
+    def terminate(self) -> None:
+        pass
@@ -0,0 +1,143 @@
+"""
+Benchmark the observe-act loop with and without the fused "captureAfter" response.
+
+A mock server replays a TASK_STEPS-step GUI task. In "separate" mode every step
+sends an action batch, waits for its result, then sends a SCREENSHOT request and
+waits for the image (two round trips). In "fused" mode the batch carries
+captureAfter=true and the result and the screenshot come back together (one
+round trip). Each server send is delayed by ONE_WAY_LATENCY to emulate a real
+network. Screen capture is a static in-process frame and the replayed action
+does nothing, so the numbers isolate protocol cost. pyautogui is still
+imported, so a desktop session is required.
+
+Install dependencies before running:
+    pip install websocket-client websockets
+
+Run from the repository root:
+    python frontend\\python-client\\test\\fused_step_bench.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import websockets
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from new_web_client import WebSocketClient  # noqa: E402
+
+HOST = "127.0.0.1"
+PORT = 8767
+TASK_STEPS = 20
+ONE_WAY_LATENCY = 0.03
+
+
+class StandInTTS:
+    def process_llm_chunk(self, chunk: str) -> None:
+        pass
+
+    def flush_pending(self) -> None:
+        pass
+
+
+class StandInCapture:
+    width = 1920
+    height = 1080
+
+    def __init__(self) -> None:
+        rng = np.random.default_rng(0)
+        self.frame = rng.integers(0, 255, size=(1080, 1920, 4), dtype=np.uint8)
+
+    def latest(self, newer_than=None, timeout=1.0, copy=False):
+        return (self.frame.copy() if copy else self.frame), 0, time.monotonic()
+
+
+class ReplayClient(WebSocketClient):
+    def noop_action(self, wait=1.5):
+        return "ok"
+
+
+async def mock_server(connection, mode: str, timings: list[float]) -> None:
+    async def request(actions: list[dict], call_id: str, capture_after: bool = False) -> dict:
+        await asyncio.sleep(ONE_WAY_LATENCY)
+        message = {"type": "action", "code": 200, "content": "", "callId": call_id, "actions": actions}
+        if capture_after:
+            message["captureAfter"] = True
+        await connection.send(json.dumps(message))
+        reply = json.loads(await connection.recv())
+        await asyncio.sleep(ONE_WAY_LATENCY)
+        return reply
+
+    step_action = [{"command": "noop_action", "params": {}}]
+    for step in range(TASK_STEPS):
+        start = time.perf_counter()
+        if mode == "fused":
+            reply = await request(step_action, f"step_{step}", capture_after=True)
+            assert json.loads(reply["data"])["screenshot"]
+        else:
+            await request(step_action, f"step_{step}_act")
+            reply = await request([{"command": "SCREENSHOT", "params": {}}], f"step_{step}_shot")
+            assert reply["data"]
+        timings.append(time.perf_counter() - start)
+    await connection.close()
+
+
+def start_server(state: dict) -> threading.Event:
+    ready = threading.Event()
+
+    async def serve() -> None:
+        async with websockets.serve(lambda c: mock_server(c, state["mode"], state["timings"]), HOST, PORT,
+                                    max_size=None):
+            ready.set()
+            await asyncio.Future()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    return ready
+
+
+def run(mode: str, state: dict) -> str:
+    state["mode"] = mode
+    state["timings"] = []
+    client = ReplayClient(f"ws://{HOST}:{PORT}", tts=StandInTTS(), capture=StandInCapture())
+    client.input_loop = lambda: None  # 不读取 stdin
+    client.connect()
+
+    timings = sorted(state["timings"])
+    return (
+        f"{mode:<10}"
+        f"{len(timings):>7}"
+        f"{sum(timings) * 1000 / len(timings):>14.1f}"
+        f"{timings[len(timings) // 2] * 1000:>12.1f}"
+        f"{sum(timings):>12.2f}"
+    )
+
+
+def main() -> int:
+    state: dict = {}
+    if not start_server(state).wait(5):
+        print("[error] Mock server did not start.")
+        return 1
+    rows = [run(mode, state) for mode in ("separate", "fused")]
+
+    print()
+    print(f"[info] {TASK_STEPS} steps, one-way latency {ONE_WAY_LATENCY * 1000:.0f}ms")
+    print(f"{'mode':<10}{'steps':>7}{'mean ms/step':>14}{'p50 ms':>12}{'total s':>12}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Benchmark WebSocketClient.on_message on a recorded high-rate token stream.
+
+The stream replies of recordings/chat_session.jsonl are cycled into a stream of
+MESSAGES BaseResponse messages (one to four characters each, as the LLM sends
+them) and fed to on_message back to back, as if they arrived faster than the
+client can handle them. TTS is a no-op stand-in and text_callback a no-op, so
+what is measured is parsing, dispatch and the console echo.
+
+Each JSON backend available in json_codec is combined with three console echo
+settings: one write and flush per token (what print(..., flush=True) did),
+batched StreamEcho output and no echo. Echo goes to os.devnull, so a real
+terminal makes the per-token rows slower still. Also prints the cost of
+json_codec.loads on one stream message and json_codec.dumps on one screenshot
+result payload per backend.
+
+new_web_client imports pyautogui, so a desktop session is required.
+
+Install dependencies before running:
+    pip install websocket-client opencv-python numpy orjson
+
+Run from the repository root:
+    python frontend\\python-client\\test\\json_dispatch_bench.py
+"""
+
+from __future__ import annotations
+
+import base64
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import json_codec  # noqa: E402
+from fake_services import load_recording  # noqa: E402
+from new_web_client import StreamEcho, WebSocketClient  # noqa: E402
+
+RECORDING = Path(__file__).resolve().parent / "recordings" / "chat_session.jsonl"
+MESSAGES = 20000
+ROUNDS = 5
+ECHO_MODES = [
+    ("per token", {"max_chars": 1}),
+    ("batched", {}),
+    ("off", {"enabled": False}),
+]
+
+
+class StandInTTS:
+    def process_llm_chunk(self, chunk: str) -> None:
+        pass
+
+    def flush_pending(self) -> None:
+        pass
+
+
+class StandInCapture:
+    width = 1920
+    height = 1080
+
+
+def recorded_stream() -> list[str]:
+    replies = [step["send"] for step in load_recording(RECORDING)
+               if "send" in step and step["send"]["type"] == "stream"]
+    return [json.dumps(replies[index % len(replies)], ensure_ascii=False) for index in range(MESSAGES)]
+
+
+def messages_per_second(messages: list[str], echo: StreamEcho) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):
+        client = WebSocketClient("ws://unused", text_callback=lambda text: None, tts=StandInTTS(),
+                                 capture=StandInCapture(), echo=echo)
+    best = 0.0
+    for _ in range(ROUNDS):
+        begin = time.perf_counter()
+        for message in messages:
+            client.on_message(None, message)
+        best = max(best, len(messages) / (time.perf_counter() - begin))
+    return best
+
+
+def codec_cost_us(operation, repeat: int = 2000) -> float:
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - begin)
+    return statistics.median(timings) * 1e6
+
+
+def main() -> int:
+    messages = recorded_stream()
+    screenshot = {"result": "0:click_position:Clicked at (960, 540)", "screenshotType": "screen shot",
+                  "screenshot": base64.b64encode(os.urandom(150_000)).decode("utf-8")}
+    rows = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for backend in json_codec.available_backends():
+            json_codec.set_backend(backend)
+            for name, options in ECHO_MODES:
+                rate = messages_per_second(messages, StreamEcho(stream=devnull, **options))
+                rows.append(f"{backend:<9}{name:<12}{rate:>12.0f}{1e6 / rate:>12.2f}")
+            loads_us = codec_cost_us(lambda: json_codec.loads(messages[1]))
+            dumps_us = codec_cost_us(lambda: json_codec.dumps(screenshot), repeat=200)
+            rows.append(f"{backend:<9}{'loads / dumps':<12}{loads_us:>12.2f}{dumps_us:>12.1f}  (us)")
+    json_codec.set_backend()
+
+    print()
+    print(f"[info] {len(messages)} recorded stream messages per round, best of {ROUNDS} rounds; "
+          f"dumps payload is a {len(screenshot['screenshot']) // 1024}KB base64 screenshot")
+    print(f"{'backend':<9}{'echo':<12}{'messages/s':>12}{'us/message':>12}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
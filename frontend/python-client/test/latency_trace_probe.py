@@ -0,0 +1,123 @@
+"""
+Exercise latency_trace.TurnTracer across a whole voice turn and measure what
+tracing costs.
+
+Each turn is a push-to-talk utterance recorded by RealtimeSTT from a NullAudio
+microphone and transcribed by a local FakeAsrServer. The transcript is then
+"sent" to a stand-in LLM that answers after LLM_FIRST_TOKEN seconds and streams
+its reply in small chunks into StreamingTTS, which synthesizes against a local
+FakeTtsServer and plays into a NullAudio device in callback mode. RealtimeSTT
+and StreamingTTS mark their stages themselves. The chat_send and first_token
+marks that WebSocketClient makes are made by the stand-in LLM here, because
+new_web_client needs a desktop session (pyautogui) to import.
+
+The traces are written to a temporary JSONL file, read back and summarized per
+stage, exactly as `python latency_trace.py <file>` does. The script also prints
+the cost of one mark() call on the hot path (stage already recorded, as for
+every audio frame after the first) and of a complete turn of marks.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\latency_trace_probe.py
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeAsrServer, FakeTtsServer, NullAudio  # noqa: E402
+from latency_trace import STAGES, TurnTracer, format_summary, load, summarize  # noqa: E402
+from speechToText import RealtimeSTT  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+TURNS = 12
+SPEECH_SECONDS = 1.0
+LLM_FIRST_TOKEN = (0.3, 0.9)  # 首个 token 时延范围（秒）
+REPLY = "好的，我这就打开设置页面。稍等一下。"
+
+
+def stand_in_llm(tracer: TurnTracer, tts: StreamingTTS, rng: random.Random) -> None:
+    tracer.mark("chat_send")
+    time.sleep(rng.uniform(*LLM_FIRST_TOKEN))
+    for index in range(0, len(REPLY), 2):
+        tracer.mark("first_token")
+        tts.process_llm_chunk(REPLY[index:index + 2])
+        time.sleep(0.04)
+    tts.flush_pending()
+
+
+def overhead() -> tuple[float, float]:
+    tracer = TurnTracer()
+    calls = 200000
+    begin = time.perf_counter()
+    for _ in range(calls):
+        tracer.mark("first_audio")
+    hot_ns = (time.perf_counter() - begin) / calls * 1e9
+    turns = 20000
+    begin = time.perf_counter()
+    for _ in range(turns):
+        for stage in STAGES:
+            tracer.mark(stage)
+    turn_us = (time.perf_counter() - begin) / turns * 1e6
+    return hot_ns, turn_us
+
+
+def main() -> int:
+    asr = FakeAsrServer(port=8783).start()
+    tts_server = FakeTtsServer(port=8777).start()
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "latency_trace.jsonl")
+        tracer = TurnTracer(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stt = RealtimeSTT(url=asr.url, audio=NullAudio(), tracer=tracer)
+            stt.start()
+            stt.pause()
+            tts = StreamingTTS(url=tts_server.url, audio=NullAudio(), output_mode="callback", tracer=tracer)
+            tts.start()
+            time.sleep(0.3)
+            for _ in range(TURNS):
+                done = threading.Event()
+                stt.resume_async()
+                time.sleep(SPEECH_SECONDS)
+                stt.commit_async(on_transcript=lambda text: done.set())
+                done.wait(10)
+                stand_in_llm(tracer, tts, rng)
+                while tts.scheduler.in_flight or tts.pcm_buffer.available():
+                    time.sleep(0.01)
+                time.sleep(0.2)
+            stt.stop()
+        tracer.flush()
+        records = load(path)
+    hot_ns, turn_us = overhead()
+
+    print()
+    print(f"[info] {len(records)} traced turns read back from JSONL; fake ASR transcribes in "
+          f"{asr.transcribe_latency * 1000:.0f}ms, stand-in LLM first token "
+          f"{LLM_FIRST_TOKEN[0] * 1000:.0f}-{LLM_FIRST_TOKEN[1] * 1000:.0f}ms, TTS first packet "
+          f"{tts_server.first_packet_latency * 1000:.0f}ms")
+    print(format_summary(summarize(records)))
+    print(f"[info] mark() hot path {hot_ns:.0f}ns per call, full turn of {len(STAGES)} marks {turn_us:.1f}us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
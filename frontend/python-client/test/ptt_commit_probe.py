@@ -0,0 +1,99 @@
+"""
+Compare the old push-to-talk release handler with the event-driven one.
+
+RealtimeSTT runs against a local FakeAsrServer with a NullAudio microphone that
+delivers non-silent PCM in real time. Each run holds the key for
+SPEECH_SECONDS, then releases it. The "legacy" row replays the previous
+KeyboardController._on_release (pause, poll the audio queue, commit, wait for
+the completed event); the "async" row calls RealtimeSTT.commit_async. The
+script reports how long the key listener thread was held, the time from key
+release to the final transcript, and how much captured audio did not make it
+into the commit.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\ptt_commit_probe.py
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeAsrServer, NullAudio  # noqa: E402
+from speechToText import RealtimeSTT  # noqa: E402
+
+SPEECH_SECONDS = 1.0
+RUNS = 8
+
+
+def legacy_release(stt: RealtimeSTT) -> None:
+    """改造前 KeyboardController._on_release 的做法"""
+    stt.pause()
+    while not stt.audio_queue.empty():
+        time.sleep(0.1)
+    stt.completed_event.clear()
+    stt.conversation.commit()
+    stt.completed_event.wait(timeout=10)
+
+
+def utterance(stt: RealtimeSTT, audio: NullAudio, server: FakeAsrServer, mode: str) -> tuple[float, float, int]:
+    """返回 (键盘线程占用 ms, 松开到转录结果 ms, 未进入 commit 的采集字节数)"""
+    done = threading.Event()
+    captured_before = audio.captured
+    commits_before = len(server.commits)
+    if mode == "legacy":
+        stt.resume()
+    else:
+        stt.resume_async()
+    time.sleep(SPEECH_SECONDS)
+
+    released_at = time.perf_counter()
+    if mode == "legacy":
+        legacy_release(stt)
+        done.set()
+    else:
+        stt.commit_async(on_transcript=lambda text: done.set())
+    held_ms = (time.perf_counter() - released_at) * 1000
+    done.wait(10)
+    transcript_ms = (time.perf_counter() - released_at) * 1000
+
+    while len(server.commits) == commits_before:
+        time.sleep(0.01)
+    lost = (audio.captured - captured_before) - server.commits[-1][1]
+    time.sleep(0.3)  # 让本轮残留的音频（若有）在下一轮开始前发完
+    return held_ms, transcript_ms, lost
+
+
+def main() -> int:
+    server = FakeAsrServer().start()
+    audio = NullAudio()
+    stt = RealtimeSTT(url=server.url, audio=audio)
+    stt.start()
+    stt.pause()
+
+    print(f"[info] {RUNS} utterances of {SPEECH_SECONDS:.1f}s per mode, ASR transcribes "
+          f"{server.transcribe_latency * 1000:.0f}ms after commit, medians reported")
+    print(f"{'mode':<8}{'listener held ms':>18}{'release->text ms':>18}{'lost bytes':>12}")
+    for mode in ("legacy", "async"):
+        results = [utterance(stt, audio, server, mode) for _ in range(RUNS)]
+        held_ms, transcript_ms, lost = (statistics.median(column) for column in zip(*results))
+        print(f"{mode:<8}{held_ms:>18.1f}{transcript_ms:>18.1f}{lost:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Benchmark the screenshot pipeline offline by replaying recorded frame sequences.
+
+Frames are read in name order from a directory of PNG/JPEG files, e.g. a folder of
+screenshots saved by the server's ImageSaveUtil during a GUI agent run. Without a
+directory a synthetic desktop-like sequence (typing, cursor moves, idle steps, one
+window switch) is generated so the script runs anywhere.
+
+Run from the repository root:
+    python frontend\\python-client\\test\\screenshot_bench.py [frames_dir]
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from screen_codec import (  # noqa: E402
+    MIXED_FORMAT_CANDIDATES,
+    DeltaFrameDecoder,
+    DeltaFrameEncoder,
+    EncoderAutoTuner,
+    FrameCache,
+    JpegEncoder,
+    measure_encode,
+)
+
+MAX_SIZE = 1024
+JPEG_QUALITY = 85
+SYNTHETIC_FRAMES = 40
+
+
+def resize_frame(img: np.ndarray) -> np.ndarray:
+    h, w = img.shape[:2]
+    if max(h, w) > MAX_SIZE:
+        scale = MAX_SIZE / max(h, w)
+        img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return img
+
+
+def load_frames(frames_dir: Path) -> list[np.ndarray]:
+    paths = sorted(p for p in frames_dir.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg"))
+    frames = []
+    for path in paths:
+        img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if img is not None:
+            frames.append(resize_frame(img))
+    return frames
+
+
+def synthetic_frames(count: int = SYNTHETIC_FRAMES) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    base = np.full((576, 1024, 3), 235, dtype=np.uint8)
+    cv2.rectangle(base, (0, 0), (1024, 40), (60, 60, 60), -1)
+    cv2.rectangle(base, (0, 536), (1024, 576), (40, 40, 40), -1)
+    for line in range(12):
+        cv2.putText(base, f"document line {line} " + "lorem ipsum " * 4, (40, 90 + line * 32),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (30, 30, 30), 1)
+
+    frames = []
+    current = base.copy()
+    for index in range(count):
+        frame = current.copy()
+        step = index % 4
+        if step == 1:
+            # 打字：在编辑区追加一小段文字
+            cv2.putText(current, "x" * (index % 20 + 1), (40, 500), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+            frame = current.copy()
+        elif step == 2:
+            # 鼠标移动：光标只改动很小一块
+            x, y = (int(v) for v in rng.integers(50, 500, size=2))
+            cv2.circle(frame, (x, y), 6, (0, 0, 255), -1)
+        if index == count // 2:
+            # 切换窗口：整屏变化
+            current = cv2.bitwise_not(base)
+            frame = current.copy()
+        frames.append(frame)
+    return frames
+
+
+def bench_full(frames: list[np.ndarray]) -> tuple[int, float]:
+    total_bytes = 0
+    start = time.perf_counter()
+    for img in frames:
+        _, buffer = cv2.imencode(".jpeg", img, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
+        total_bytes += len(base64.b64encode(buffer))
+    return total_bytes, time.perf_counter() - start
+
+
+def bench_delta(frames: list[np.ndarray]) -> tuple[int, float, dict[str, int], float]:
+    encoder = DeltaFrameEncoder(encoder=JpegEncoder(JPEG_QUALITY))
+    decoder = DeltaFrameDecoder()
+    modes: dict[str, int] = {}
+    total_bytes = 0
+    encode_seconds = 0.0
+    worst_error = 0.0
+    for img in frames:
+        start = time.perf_counter()
+        payload = json.dumps(encoder.encode(img))
+        encode_seconds += time.perf_counter() - start
+        total_bytes += len(payload)
+
+        mode = json.loads(payload)["mode"]
+        modes[mode] = modes.get(mode, 0) + 1
+        restored = decoder.decode(payload)
+        worst_error = max(worst_error, float(np.abs(restored.astype(np.int16) - img).mean()))
+    return total_bytes, encode_seconds, modes, worst_error
+
+
+def bench_encoders(frames: list[np.ndarray]) -> None:
+    print(f"{'encoder':<12}{'scale':>7}{'bytes/frame':>14}{'encode ms/frame':>18}")
+    for encoder, scale in MIXED_FORMAT_CANDIDATES:
+        results = [measure_encode(encoder, img, scale)[1] for img in frames]
+        mean_bytes = sum(r["bytes"] for r in results) / len(results)
+        mean_ms = sum(r["encode_ms"] for r in results) / len(results)
+        print(f"{encoder.name:<12}{scale:>7.2f}{mean_bytes:>14.0f}{mean_ms:>18.2f}")
+
+
+def bench_auto_tuner(frames: list[np.ndarray], target_bytes: Optional[int], budget_ms: Optional[float]) -> None:
+    tuner = EncoderAutoTuner(target_bytes=target_bytes, encode_budget_ms=budget_ms, candidates=MIXED_FORMAT_CANDIDATES)
+    picks: dict[str, int] = {}
+    over_target = 0
+    for img in frames:
+        _, stats = tuner.encode(img)
+        key = f"{stats['encoder']}@{stats['scale']:.2f}"
+        picks[key] = picks.get(key, 0) + 1
+        if (target_bytes and stats["bytes"] > target_bytes) or (budget_ms and stats["encode_ms"] > budget_ms):
+            over_target += 1
+    print(f"[tuner] target_bytes={target_bytes} budget_ms={budget_ms}: picks={picks}, frames over target={over_target}")
+
+
+def bench_frame_cache(frames: list[np.ndarray]) -> None:
+    cache = FrameCache()
+    encoder = JpegEncoder(JPEG_QUALITY)
+    sent_bytes = 0
+    lookup_seconds = 0.0
+    for index, img in enumerate(frames):
+        start = time.perf_counter()
+        ref, signature = cache.lookup(img)
+        lookup_seconds += time.perf_counter() - start
+        if ref is None:
+            sent_bytes += len(base64.b64encode(encoder.encode(img)))
+            cache.add(f"call_{index}", signature)
+        else:
+            sent_bytes += len(ref)
+    print(f"[cache] {cache.stats()}, bytes/frame={sent_bytes / len(frames):.0f}, "
+          f"lookup ms/frame={lookup_seconds * 1000 / len(frames):.2f}")
+
+
+def main() -> int:
+    frames_dir: Optional[Path] = Path(sys.argv[1]) if len(sys.argv) > 1 else None
+    if frames_dir is not None:
+        frames = load_frames(frames_dir)
+        print(f"[load] {len(frames)} frames from {frames_dir}")
+    else:
+        frames = synthetic_frames()
+        print(f"[load] {len(frames)} synthetic frames")
+    if not frames:
+        print("[error] No frames to replay.")
+        return 1
+
+    full_bytes, full_seconds = bench_full(frames)
+    delta_bytes, delta_seconds, modes, worst_error = bench_delta(frames)
+
+    print()
+    print(f"{'mode':<8}{'bytes/frame':>14}{'encode ms/frame':>18}")
+    print(f"{'full':<8}{full_bytes / len(frames):>14.0f}{full_seconds * 1000 / len(frames):>18.2f}")
+    print(f"{'delta':<8}{delta_bytes / len(frames):>14.0f}{delta_seconds * 1000 / len(frames):>18.2f}")
+    print()
+    print(f"[delta] frame modes: {modes}")
+    print(f"[delta] bandwidth ratio: {full_bytes / max(delta_bytes, 1):.1f}x smaller")
+    print(f"[delta] encode time: {delta_seconds / full_seconds:.0%} of a full JPEG encode")
+    print(f"[delta] worst mean abs error after decode: {worst_error:.2f}")
+    bench_frame_cache(frames)
+    print()
+    bench_encoders(frames)
+    print()
+    bench_auto_tuner(frames, target_bytes=60_000, budget_ms=None)
+    bench_auto_tuner(frames, target_bytes=None, budget_ms=3.0)
+    bench_auto_tuner(frames, target_bytes=30_000, budget_ms=5.0)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
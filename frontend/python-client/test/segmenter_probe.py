@@ -0,0 +1,95 @@
+"""
+Check how voiceConverter.SentenceSegmenter splits streamed LLM text.
+
+Every case is fed both as one chunk and one character at a time (as a token
+stream would arrive), then flushed, and the segments are compared with the
+expected split. Covers decimals and thousands separators that must not split,
+CJK and ASCII closing quotes and brackets, the ASCII quotes that may open the
+next sentence, min_length / max_length and the idle flush.
+
+Prints one line per case and exits with status 1 if any case fails.
+
+Install dependencies before running:
+    pip install dashscope pyaudio numpy
+
+Run from the repository root:
+    python frontend\\python-client\\test\\segmenter_probe.py
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from voiceConverter import SentenceSegmenter  # noqa: E402
+
+# (名称, 输入文本, 期望片段, SentenceSegmenter 参数)
+CASES = [
+    ("decimal", "Pi is 3.14 roughly. Next", ["Pi is 3.14 roughly.", "Next"], {}),
+    ("decimal cjk", "圆周率约等于3.14。好的", ["圆周率约等于3.14。", "好的"], {}),
+    ("thousands", "It costs 1,000 dollars, more or less.", ["It costs 1,000 dollars,", "more or less."], {}),
+    ("abbreviation", "Use e.g. this one. Ok", ["Use e.g. this one.", "Ok"], {}),
+    ("initialism", "See i.e. the docs, ok? Sure", ["See i.e. the docs,", "ok?", "Sure"], {}),
+    ("cjk end", "好的。", ["好的。"], {}),
+    ("ellipsis", "Wait... what? Ok", ["Wait...", "what?", "Ok"], {}),
+    ("cjk quotes", "他说：“好的。”然后走了。", ["他说：“好的。”", "然后走了。"], {}),
+    ("cjk brackets", "（已保存。）下一步。", ["（已保存。）", "下一步。"], {}),
+    ("ascii single", "He said 'hi.' 'Bye.' Done.", ["He said 'hi.'", "'Bye.'", "Done."], {}),
+    ("ascii double", 'She said "Go." "Now!" Ok.', ['She said "Go."', '"Now!"', "Ok."], {}),
+    ("opening quote", '然后走了。"嗯。"', ["然后走了。", '"嗯。"'], {}),
+    ("apostrophe", "I don't know. It's fine.", ["I don't know.", "It's fine."], {}),
+    ("min length", "好，我们走吧，现在就出发。", ["好，我们走吧，", "现在就出发。"], {"min_length": 4}),
+    ("below min", "好，走，出发。", ["好，走，出发。"], {"min_length": 5}),
+    ("max length", "a" * 25, ["a" * 10, "a" * 10, "a" * 5], {"max_length": 10}),
+]
+
+
+def split(text: str, options: dict, by_char: bool) -> list[str]:
+    segmenter = SentenceSegmenter(**options)
+    segments = []
+    for chunk in (text if by_char else [text]):
+        segments.extend(segmenter.feed(chunk))
+    tail = segmenter.flush()
+    return segments + ([tail] if tail else [])
+
+
+def check_idle_flush() -> tuple[bool, str]:
+    segmenter = SentenceSegmenter(idle_timeout=0.8)
+    segmenter.feed("还没说完")
+    early = segmenter.flush_if_idle(now=segmenter.last_feed + 0.5)
+    late = segmenter.flush_if_idle(now=segmenter.last_feed + 0.8)
+    again = segmenter.flush_if_idle(now=segmenter.last_feed + 5.0)
+    got = [early, late, again]
+    return got == ["", "还没说完", ""], f"{got}"
+
+
+def main() -> int:
+    failures = 0
+    for name, text, expected, options in CASES:
+        for by_char in (False, True):
+            got = split(text, options, by_char)
+            ok = got == expected
+            failures += not ok
+            mode = "chars" if by_char else "whole"
+            print(f"[{'ok' if ok else 'FAIL'}] {name:<14}{mode:<7}{got}" + ("" if ok else f"  expected {expected}"))
+    ok, got = check_idle_flush()
+    failures += not ok
+    print(f"[{'ok' if ok else 'FAIL'}] {'idle flush':<21}{got}")
+
+    print()
+    if failures:
+        print(f"[error] {failures} case(s) failed")
+        return 1
+    print(f"[info] all {len(CASES) * 2 + 1} cases passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
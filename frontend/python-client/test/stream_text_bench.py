@@ -0,0 +1,196 @@
+"""
+Headless benchmark for the assistant's streaming subtitle box under a flood of
+tokens (Qt offscreen platform, no display needed).
+
+A producer thread sends the stream replies of recordings/chat_session.jsonl
+token by token, as the WebSocket thread does, at several rates for DURATION
+seconds each. Each rate is run against two widgets of the size used in
+ui.AssistantWindow (400x180):
+
+    per token   the previous AssistantWindow path: one queued signal per token,
+                then insertText + setTextCursor + ensureCursorVisible, with no
+                size limit
+    coalesced   stream_text.StreamTextView: buffered, flushed at 40Hz, trimmed
+                to 1200 characters from the head
+
+A 60Hz heartbeat QTimer runs on the GUI thread. The spread of its intervals is
+the frame time the user sees: when the GUI thread is busy laying out text, the
+heartbeat (and every repaint and click) is late. Also reports the GUI thread
+time spent on text updates per second of streaming, how long the widget lags
+behind the producer once it stops, and the final document size.
+
+Install dependencies before running:
+    pip install PyQt6
+
+Run from the repository root:
+    python frontend\\python-client\\test\\stream_text_bench.py
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from PyQt6.QtCore import QEventLoop, QObject, QTimer, pyqtSignal  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+from fake_services import load_recording  # noqa: E402
+from stream_text import StreamTextView  # noqa: E402
+
+RECORDING = Path(__file__).resolve().parent / "recordings" / "chat_session.jsonl"
+DURATION = 3.0
+RATES = [100, 1000, 10000]  # 每秒 token 数
+HEARTBEAT_MS = 16
+
+
+class TokenSignal(QObject):
+    text_signal = pyqtSignal(str)
+
+
+class PerTokenView(QTextEdit):
+    """改动前 AssistantWindow 的做法：每个 token 一次信号、一次插入和滚动"""
+
+    label = "per token"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.signal = TokenSignal()
+        self.signal.text_signal.connect(self.update_dynamic_text)
+        self.busy = 0.0
+        self.sent = 0
+        self.shown = 0
+
+    def drained(self) -> bool:
+        return self.shown == self.sent
+
+    def append_stream(self, text: str) -> None:
+        self.sent += 1
+        self.signal.text_signal.emit(text)
+
+    def update_dynamic_text(self, text: str) -> None:
+        begin = time.perf_counter()
+        cursor = self.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        cursor.insertText(text)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+        self.shown += 1
+        self.busy += time.perf_counter() - begin
+
+
+class CoalescedView(StreamTextView):
+    label = "coalesced"
+
+    def __init__(self) -> None:
+        super().__init__(fps=40, max_chars=1200)
+        self.busy = 0.0
+
+    def drained(self) -> bool:
+        with self._lock:
+            return not self._pending
+
+    def flush(self) -> None:
+        begin = time.perf_counter()
+        super().flush()
+        self.busy += time.perf_counter() - begin
+
+
+def recorded_tokens() -> list[str]:
+    tokens = []
+    for step in load_recording(RECORDING):
+        message = step.get("send")
+        if message and message["type"] == "stream":
+            tokens.append(message["content"])
+            if message.get("end"):
+                tokens.append("\n\n")
+    return [token for token in tokens if token]
+
+
+def produce(view, tokens: list[str], rate: int, finished: dict) -> None:
+    """按 rate 每 10ms 发一批 token，模拟 WebSocket 线程"""
+    per_tick = max(1, rate // 100)
+    sent = 0
+    begin = time.perf_counter()
+    while time.perf_counter() - begin < DURATION:
+        for _ in range(per_tick):
+            view.append_stream(tokens[sent % len(tokens)])
+            sent += 1
+        next_tick = begin + sent / rate
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    finished["at"] = time.perf_counter()
+
+
+def run(app: QApplication, view, tokens: list[str], rate: int) -> str:
+    view.setFixedSize(400, 180)
+    view.setReadOnly(True)
+    view.show()
+    app.processEvents()
+
+    ticks = []
+    heartbeat = QTimer()
+    heartbeat.setInterval(HEARTBEAT_MS)
+    heartbeat.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    heartbeat.start()
+
+    finished: dict = {}
+    producer = threading.Thread(target=produce, args=(view, tokens, rate, finished), daemon=True)
+    producer.start()
+    loop = QEventLoop()
+    QTimer.singleShot(int(DURATION * 1000), loop.quit)
+    loop.exec()
+
+    # 生产者停止后，等控件显示完全部文本
+    producer.join()
+    while not view.drained():
+        app.processEvents()
+    lag_ms = (time.perf_counter() - finished["at"]) * 1000
+    heartbeat.stop()
+
+    intervals = sorted((b - a) * 1000 for a, b in zip(ticks, ticks[1:]))
+    document = view.document()
+    row = (
+        f"{rate:>7}{view.label:>12}"
+        f"{statistics.median(intervals):>9.1f}{intervals[int(len(intervals) * 0.99)]:>9.1f}{intervals[-1]:>9.1f}"
+        f"{view.busy / DURATION * 1000:>12.0f}{lag_ms:>10.0f}"
+        f"{document.characterCount():>11}{document.blockCount():>8}"
+    )
+    view.close()
+    view.deleteLater()
+    app.processEvents()
+    return row
+
+
+def main() -> int:
+    app = QApplication(sys.argv)
+    tokens = recorded_tokens()
+    rows = []
+    for rate in RATES:
+        for view_class in (PerTokenView, CoalescedView):
+            rows.append(run(app, view_class(), tokens, rate))
+
+    print()
+    print(f"[info] {len(tokens)} recorded tokens cycled for {DURATION:.0f}s per run; "
+          f"heartbeat every {HEARTBEAT_MS}ms; Qt platform {app.platformName()}")
+    print(f"{'tok/s':>7}{'view':>12}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'busy ms/s':>12}{'lag ms':>10}{'doc chars':>11}{'blocks':>8}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
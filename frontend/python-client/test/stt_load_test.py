@@ -0,0 +1,120 @@
+"""
+Load test: many RealtimeSTT sessions in one process against a local FakeAsrServer.
+
+Every session has its own NullAudio microphone producing synthetic PCM, its own
+capture queue, sender and control threads, and its own stop signal. All sessions
+record UTTERANCES push-to-talk utterances of SPEECH_SECONDS at the same time.
+Halfway through, session 0 is stopped, which closes its connection; the other
+sessions must carry on. For each session count the script reports how many
+transcripts came back, whether every transcript matched the audio of its own
+session, and the release-to-transcript latency.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\stt_load_test.py
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeAsrServer, NullAudio  # noqa: E402
+from speechToText import RealtimeSTT  # noqa: E402
+
+SESSION_COUNTS = (1, 4, 16, 32)
+UTTERANCES = 3
+# 每个会话的说话时长略有不同，便于核对转录结果是否串到了别的会话
+SPEECH_SECONDS = 0.6
+SPEECH_STEP = 0.1
+
+
+def session(server: FakeAsrServer, index: int, results: dict, start_gate: threading.Barrier,
+            stop_gate: threading.Event) -> None:
+    expected = round(SPEECH_SECONDS + SPEECH_STEP * (index % 8), 1)
+    stt = RealtimeSTT(url=server.url, audio=NullAudio())
+    stt.start()
+    stt.pause()
+    start_gate.wait()
+    for utterance in range(UTTERANCES):
+        if index == 0 and utterance == 1:
+            stt.stop()  # 关闭一个会话，其余会话不应受影响
+            stop_gate.set()
+            return
+        done = threading.Event()
+        transcript: list[str] = []
+
+        def on_transcript(text: str) -> None:
+            transcript.append(text)
+            done.set()
+
+        stt.resume_async()
+        time.sleep(expected)
+        released_at = time.perf_counter()
+        stt.commit_async(on_transcript=on_transcript)
+        if done.wait(10):
+            results["latency"].append((time.perf_counter() - released_at) * 1000)
+            # 采集按 100ms 一块交付，实际时长允许相差一块
+            spoken = float(transcript[0].split("s")[0])
+            results["matched" if abs(spoken - expected) <= 0.15 else "mismatched"] += 1
+        else:
+            results["missing"] += 1
+    stt.stop()
+
+
+def run(server: FakeAsrServer, sessions: int) -> str:
+    results = {"latency": [], "matched": 0, "mismatched": 0, "missing": 0}
+    start_gate = threading.Barrier(sessions)
+    stop_gate = threading.Event()
+    threads = [threading.Thread(target=session, args=(server, index, results, start_gate, stop_gate))
+               for index in range(sessions)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    # 会话 0 只完成第一轮就被关闭
+    expected = sessions * UTTERANCES - (UTTERANCES - 1)
+    latencies = sorted(results["latency"])
+    return (
+        f"{sessions:<10}"
+        f"{len(latencies):>6}/{expected:<6}"
+        f"{results['matched']:>9}"
+        f"{results['mismatched']:>12}"
+        f"{statistics.median(latencies):>10.0f}"
+        f"{latencies[int(len(latencies) * 0.95)]:>10.0f}"
+        f"{elapsed:>10.1f}"
+    )
+
+
+def main() -> int:
+    server = FakeAsrServer(port=8782).start()
+    rows = [run(server, sessions) for sessions in SESSION_COUNTS]
+    print(f"[info] {UTTERANCES} utterances per session, session 0 stopped after the first; "
+          f"ASR transcribes {server.transcribe_latency * 1000:.0f}ms after commit")
+    print(f"{'sessions':<10}{'transcripts':>13}{'matched':>9}{'mismatched':>12}{'p50 ms':>10}{'p95 ms':>10}{'wall s':>10}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
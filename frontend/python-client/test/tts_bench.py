@@ -0,0 +1,131 @@
+"""
+Benchmark the TTS path offline: a recorded LLM stream is replayed into
+voiceConverter.StreamingTTS, which talks to a local FakeTtsServer and plays
+into a NullAudio device. Reports time from the first LLM token to the first
+PCM byte reaching the speaker, and the silence at sentence boundaries when one
+versus several commits are kept in flight against a server whose first-packet
+latency and synthesis speed are close to the real service.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_bench.py
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import StreamingTTS, is_sentence_end  # noqa: E402
+
+# 录制的 LLM 流式回复：长从句、句中标点，按 token 切块
+RECORDED_STREAMS = [
+    "好的，我先帮你打开浏览器，然后在地址栏输入你要访问的网址，等页面加载完成之后再告诉你结果。",
+    "这个问题其实可以分成三个部分来看：首先是网络连接是否正常，其次是代理设置有没有生效，最后是浏览器缓存是否需要清理。",
+    "Sure, I will open the settings panel first, then switch to the display tab and lower the scaling to 100 percent.",
+    "已经完成啦！",
+]
+TOKEN_CHARS = 3
+TOKEN_INTERVAL = 0.04
+RUNS_PER_STREAM = 3
+
+# 句间断流测试：一段多句回复一次性到达，服务端合成速度接近实时
+MULTI_SENTENCE_REPLY = (
+    "好的。我先打开浏览器。然后进入设置页面。找到显示选项。把缩放调到百分之百。"
+    "最后重启一下浏览器。这样字体就不会发虚了。"
+)
+PIPELINE_SERVER = {"port": 8771, "first_packet_latency": 0.4, "speed": 1.5}
+IN_FLIGHT_OPTIONS = (1, 2, 3)
+
+
+class LegacyStreamingTTS(StreamingTTS):
+    """断句改造前的 process_llm_chunk：累积文本以句末标点结尾时才提交"""
+
+    legacy_text = ""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_in_flight", 1)
+        super().__init__(*args, **kwargs)
+
+    def process_llm_chunk(self, chunk):
+        self.legacy_text += chunk
+        if is_sentence_end(self.legacy_text):
+            sentence = self.legacy_text.strip()
+            self.legacy_text = ""
+            self.commit_sentence(sentence)
+
+
+def time_to_first_audio(tts_class, server: FakeTtsServer, text: str) -> float:
+    audio = NullAudio()
+    tts = tts_class(url=server.url, audio=audio)
+    tts.start()
+    first_token = time.perf_counter()
+    for index in range(0, len(text), TOKEN_CHARS):
+        tts.process_llm_chunk(text[index:index + TOKEN_CHARS])
+        time.sleep(TOKEN_INTERVAL)
+    deadline = time.perf_counter() + 10
+    while audio.first_sound is None and time.perf_counter() < deadline:
+        time.sleep(0.005)
+    tts.tts.close()
+    return (audio.first_sound - first_token) * 1000 if audio.first_sound else float("nan")
+
+
+def sentence_gaps(server: FakeTtsServer, max_in_flight: int) -> tuple[float, int, float, dict]:
+    """返回 (首包后断流总时长 ms, 断流次数, 播完用时 s, 环形缓冲统计)"""
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, max_in_flight=max_in_flight)
+    tts.start()
+    start = time.perf_counter()
+    tts.process_llm_chunk(MULTI_SENTENCE_REPLY)
+    tts.flush_pending()
+    expected = int(len(MULTI_SENTENCE_REPLY) * server.seconds_per_char * 48000) * 0.95
+    deadline = start + 60
+    while audio.sound_bytes < expected and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    tts.tts.close()
+    seconds = time.perf_counter() - start
+    return sum(audio.gaps) * 1000, len(audio.gaps), seconds, tts.pcm_buffer.stats()
+
+
+def main() -> int:
+    server = FakeTtsServer().start()
+    print(f"[info] {TOKEN_CHARS} chars/token every {TOKEN_INTERVAL * 1000:.0f}ms, "
+          f"TTS first packet {server.first_packet_latency * 1000:.0f}ms")
+    rows = []
+    for text in RECORDED_STREAMS:
+        legacy = statistics.median(time_to_first_audio(LegacyStreamingTTS, server, text) for _ in range(RUNS_PER_STREAM))
+        segmented = statistics.median(time_to_first_audio(StreamingTTS, server, text) for _ in range(RUNS_PER_STREAM))
+        rows.append((text[:18], legacy, segmented))
+
+    print()
+    print(f"{'stream':<22}{'legacy ms':>12}{'segmenter ms':>14}")
+    for name, legacy, segmented in rows:
+        print(f"{name:<22}{legacy:>12.0f}{segmented:>14.0f}")
+
+    pipeline_server = FakeTtsServer(**PIPELINE_SERVER).start()
+    print()
+    print(f"[info] {MULTI_SENTENCE_REPLY.count('。')} sentences, TTS first packet "
+          f"{pipeline_server.first_packet_latency * 1000:.0f}ms, synthesis {pipeline_server.speed:.1f}x realtime")
+    print(f"{'in flight':<12}{'gap ms':>10}{'gaps':>8}{'underruns':>11}{'peak KB':>10}{'playback s':>12}")
+    for max_in_flight in IN_FLIGHT_OPTIONS:
+        gap_ms, gaps, seconds, stats = sentence_gaps(pipeline_server, max_in_flight)
+        print(f"{max_in_flight:<12}{gap_ms:>10.0f}{gaps:>8}{stats['underruns']:>11}"
+              f"{stats['peak_fill'] / 1024:>10.0f}{seconds:>12.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Benchmark the local TTS PCM cache (tts_cache.PcmCache) on a conversation where
+the assistant keeps repeating a few stock phrases.
+
+The same sequence of UTTERANCES replies (mostly stock phrases such as greetings
+and confirmations, the rest one-off sentences) is spoken through StreamingTTS
+against a local FakeTtsServer, played into a NullAudio device in callback mode.
+It runs once without a cache, once with a fresh cache, once more with the cache
+filled by the previous run (as after a restart), and once with a cache capped
+below the working set.
+
+Reports the hit rate, the median and p95 time from handing a reply to
+StreamingTTS to the first audible sample, the characters sent for synthesis
+(what the API bills), and evictions. Also prints what one mmap lookup costs.
+
+Finally checks that cache hits queued behind a sentence still being synthesized
+release their mmap, both when they play and when a barge-in drops them, and
+exits with status 1 if a mapping is left open.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_cache_bench.py
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import TTS_BYTES_PER_SECOND, FakeTtsServer, NullAudio  # noqa: E402
+from tts_cache import PcmCache  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+STOCK_PHRASES = [
+    ("好的。", 6),
+    ("收到，马上处理。", 5),
+    ("你好呀，今天想做点什么？", 3),
+    ("抱歉，我没听清，可以再说一遍吗？", 2),
+    ("网络好像有点问题，请稍后再试。", 2),
+]
+ONE_OFF_SHARE = 0.3
+UTTERANCES = 30
+
+
+def conversation() -> list[str]:
+    rng = random.Random(0)
+    phrases, weights = zip(*STOCK_PHRASES)
+    replies = []
+    for index in range(UTTERANCES):
+        if rng.random() < ONE_OFF_SHARE:
+            replies.append(f"第{index}个问题的答案是{index * 7}。")
+        else:
+            replies.append(rng.choices(phrases, weights)[0])
+    return replies
+
+
+def run(server: FakeTtsServer, replies: list[str], label: str, cache: PcmCache | None) -> str:
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback", cache=cache)
+    tts.start()
+    time.sleep(0.3)
+
+    commits_before = len(server.commits)
+    first_audio_ms = []
+    for reply in replies:
+        heard = len(audio.sounds)
+        handed_at = time.perf_counter()
+        tts.process_llm_chunk(reply)
+        tts.flush_pending()
+        while len(audio.sounds) == heard:
+            time.sleep(0.001)
+        first_audio_ms.append((audio.sounds[heard][0] - handed_at) * 1000)
+        while tts.scheduler.in_flight or tts.pcm_buffer.available():
+            time.sleep(0.005)
+        time.sleep(0.05)
+    if cache is not None:
+        cache.flush()
+    tts.callback._stream.close()
+    tts.tts.close()
+
+    stats = cache.stats() if cache is not None else {"hit_rate": 0.0, "evictions": 0}
+    synthesized = sum(len(text) for _, text in server.commits[commits_before:])
+    first_audio_ms.sort()
+    return (
+        f"{label:<14}"
+        f"{stats['hit_rate']:>9.0%}"
+        f"{statistics.median(first_audio_ms):>10.0f}"
+        f"{first_audio_ms[int(len(first_audio_ms) * 0.95)]:>10.0f}"
+        f"{synthesized:>12}"
+        f"{stats['evictions']:>11}"
+    )
+
+
+def lookup_cost(directory: str) -> float:
+    cache = PcmCache(directory)
+    key = next(reversed(cache.entries))
+    costs = []
+    for _ in range(200):
+        begin = time.perf_counter()
+        data = cache.get(key)
+        costs.append(time.perf_counter() - begin)
+        data.close()
+    return statistics.median(costs) * 1e6
+
+
+def queued_hits_closed(server: FakeTtsServer, directory: str, lead: str, interrupt: bool) -> tuple[int, int]:
+    """
+    缓存命中的句子排在合成中的 lead 之后，播完或被打断后返回 (命中数, 已关闭的 mmap 数)。
+    两个在途名额：只有一个名额时命中的句子要等 lead 结束才出队，不会排队。
+    """
+    cache = PcmCache(directory)
+    served = []
+    get = cache.get
+
+    def tracking_get(key):
+        data = get(key)
+        if data is not None:
+            served.append(data)
+        return data
+
+    cache.get = tracking_get
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback", cache=cache, max_in_flight=2)
+    tts.start()
+    time.sleep(0.3)
+    tts.process_llm_chunk(lead + "好的。")
+    tts.flush_pending()
+    while audio.first_sound is None:
+        time.sleep(0.005)
+    if interrupt:
+        tts.interrupt()
+    else:
+        while tts.scheduler.in_flight or tts.pcm_buffer.available():
+            time.sleep(0.005)
+    time.sleep(0.1)
+    tts.callback._stream.close()
+    tts.tts.close()
+    return len(served), sum(data.closed for data in served)
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8775).start()
+    replies = conversation()
+    phrase_bytes = int(len("你好呀，今天想做点什么？") * server.seconds_per_char * TTS_BYTES_PER_SECOND)
+    with tempfile.TemporaryDirectory() as warm, tempfile.TemporaryDirectory() as small:
+        rows = [
+            run(server, replies, "no cache", None),
+            run(server, replies, "cold cache", PcmCache(warm)),
+            run(server, replies, "after restart", PcmCache(warm)),
+            run(server, replies, "capped", PcmCache(small, max_bytes=phrase_bytes * 2)),
+        ]
+        cost_us = lookup_cost(warm)
+        released = [(name, *queued_hits_closed(server, warm, lead, interrupt)) for name, lead, interrupt in
+                    (("played", "这一句要现场合成，", False), ("barge-in", "另一句也要现场合成，", True))]
+    print()
+    print(f"[info] {UTTERANCES} replies, {1 - ONE_OFF_SHARE:.0%} stock phrases; TTS first packet "
+          f"{server.first_packet_latency * 1000:.0f}ms; capped cache holds ~2 phrases")
+    print(f"{'cache':<14}{'hit rate':>9}{'p50 ms':>10}{'p95 ms':>10}{'chars sent':>12}{'evictions':>11}")
+    for row in rows:
+        print(row)
+    print(f"[info] cache hit lookup (open + mmap): {cost_us:.0f}us")
+    failures = 0
+    for name, hits, closed in released:
+        ok = hits > 0 and closed == hits
+        failures += not ok
+        print(f"[{'ok' if ok else 'FAIL'}] queued cache hit, {name}: {closed}/{hits} mmap closed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Play a multi-character scene through voiceConverter.AudioMixer.
+
+Each character has its own StreamingTTS (own connection, scheduler and PCM
+buffer) attached to one shared AudioMixer, which owns the only output stream (a
+NullAudio device here). All characters start speaking at the same moment. The
+"one voice" row is the old way: a single StreamingTTS reads every character's
+line in turn.
+
+Reports the most voices heard in one frame, the time until every mixer channel
+is producing audio, the time until the scene is over, whether every character's
+audio arrived intact in its own channel (bytes taken by the mixer equal the
+bytes synthesized for that character's own sentences), and clipped samples.
+Also checks that a single loud voice with gain above 1 is clipped instead of
+wrapping around to the opposite sign when converted back to int16.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio numpy
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_mixer_probe.py
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import TTS_BYTES_PER_SECOND, FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import AudioMixer, StreamingTTS  # noqa: E402
+
+# 每个角色的台词长度不同，串音时字节数对不上
+LINES = [
+    "前面就是城门了。大家小心。",
+    "收到，我去左边看看。",
+    "补给还够撑三天，不用着急。",
+    "等一下，我好像听到了什么声音。",
+]
+VOICE_COUNTS = (2, 4)
+
+
+def expected_bytes(server: FakeTtsServer, line: str) -> int:
+    # 与 FakeTtsServer 一致：按字数合成，每字音频为整数个采样，与断句位置无关
+    return int(len(line) * server.seconds_per_char * TTS_BYTES_PER_SECOND) // 2 * 2
+
+
+def scene(server: FakeTtsServer, lines: list[str], together: bool) -> str:
+    audio = NullAudio()
+    mixer = AudioMixer(audio=audio)
+    mixer.start()
+    if together:
+        voices = [StreamingTTS(url=server.url, mixer=mixer, name=f"voice{index}") for index in range(len(lines))]
+        scripts = [[line] for line in lines]
+    else:
+        voices = [StreamingTTS(url=server.url, mixer=mixer, name="voice0")]
+        scripts = [lines]
+    for tts in voices:
+        tts.start()
+    time.sleep(0.3)
+
+    started = time.perf_counter()
+    for tts, script in zip(voices, scripts):
+        for line in script:
+            tts.process_llm_chunk(line)
+        tts.flush_pending()
+
+    first_audio: dict[str, float] = {}
+    deadline = started + 30
+    while time.perf_counter() < deadline:
+        for name, pulled in mixer.pulled.items():
+            if pulled and name not in first_audio:
+                first_audio[name] = time.perf_counter() - started
+        busy = any(tts.scheduler.in_flight or not tts.sentence_queue.empty() or tts.pcm_buffer.available()
+                   for tts in voices)
+        if not busy and len(first_audio) == len(voices):
+            break
+        time.sleep(0.002)
+    time.sleep(0.1)
+    scene_s = max(end for _, end in audio.sounds) - started
+
+    stats = mixer.stats()
+    intact = sum(stats["pulled_bytes"][tts.name] == sum(expected_bytes(server, line) for line in script)
+                 for tts, script in zip(voices, scripts))
+    mixer.stop()
+    for tts in voices:
+        tts.tts.close()
+    label = f"{len(lines)} voices" if together else "one voice"
+    return (
+        f"{label:<12}"
+        f"{stats['peak_voices']:>7}"
+        f"{max(first_audio.values()) * 1000:>14.0f}"
+        f"{scene_s:>10.2f}"
+        f"{intact:>6}/{len(voices):<5}"
+        f"{stats['clipped_samples']:>9}"
+    )
+
+
+def loud_single_voice() -> tuple[bool, int, int]:
+    """单路 30000 的采样、增益 1.5：返回 (是否限幅正确, 输出的最小采样, 计数的限幅采样数)"""
+    mixer = AudioMixer(audio=NullAudio())
+    loud = np.full(mixer.frame_bytes // 2, 30000, dtype=np.int16).tobytes()
+
+    def pull(frame: bytearray) -> int:
+        frame[:] = loud
+        return len(frame)
+
+    mixer.add_source("loud", pull, gain=1.5)
+    out, _ = mixer.audio_callback(None, mixer.frame_bytes // 2, None, 0)
+    samples = np.frombuffer(out, dtype=np.int16)
+    clipped = mixer.stats()["clipped_samples"]
+    return bool((samples == 32767).all()) and clipped == len(samples), int(samples.min()), clipped
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8774).start()
+    rows = []
+    for count in VOICE_COUNTS:
+        rows.append(scene(server, LINES[:count], together=False))
+        rows.append(scene(server, LINES[:count], together=True))
+    print()
+    print(f"[info] TTS first packet {server.first_packet_latency * 1000:.0f}ms, "
+          f"synthesis {server.speed:.1f}x realtime")
+    print(f"{'mode':<12}{'peak':>7}{'all on ms':>14}{'scene s':>10}{'intact':>12}{'clipped':>9}")
+    for row in rows:
+        print(row)
+    ok, lowest, clipped = loud_single_voice()
+    print(f"[{'ok' if ok else 'FAIL'}] single voice, gain 1.5 on 30000: lowest output {lowest}, clipped {clipped}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
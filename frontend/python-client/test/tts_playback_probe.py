@@ -0,0 +1,100 @@
+"""
+Measure how quickly pause, resume and clear reach the speaker for the blocking
+and the callback output modes of voiceConverter.StreamingTTS.
+
+A long reply is synthesized by a local FakeTtsServer and played into a
+NullAudio device, which records when every non-silent frame plays. While the
+reply is playing the script pauses, resumes and finally clears, the same way
+ui.AssistantWindow does, and reports the time from each action until the
+speaker actually stopped or restarted.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_playback_probe.py
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+LONG_REPLY = "我先把设置面板打开，再切换到显示选项卡，然后把缩放比例调到百分之一百，最后重启一下浏览器让设置生效。"
+SETTLE_SECONDS = 0.3
+RUNS = 20
+
+
+def settle() -> None:
+    # 加一点随机偏移，避免每次操作都恰好落在同一帧相位上
+    time.sleep(SETTLE_SECONDS + random.uniform(0, 0.02))
+
+
+def last_sound_end(audio: NullAudio) -> float:
+    return max(end for _, end in audio.sounds)
+
+
+def first_sound_after(audio: NullAudio, moment: float) -> float:
+    return min(start for start, _ in audio.sounds if start >= moment)
+
+
+def probe(server: FakeTtsServer, output_mode: str) -> tuple[float, float, float]:
+    """返回 (暂停, 恢复, 清空) 各自到扬声器生效的毫秒数"""
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode=output_mode)
+    tts.start()
+    tts.process_llm_chunk(LONG_REPLY)
+    tts.flush_pending()
+    while audio.first_sound is None:
+        time.sleep(0.005)
+    settle()
+
+    paused_at = time.perf_counter()
+    tts.pause()
+    settle()
+    pause_ms = (last_sound_end(audio) - paused_at) * 1000
+
+    resumed_at = time.perf_counter()
+    tts.resume()
+    settle()
+    resume_ms = (first_sound_after(audio, resumed_at) - resumed_at) * 1000
+
+    cleared_at = time.perf_counter()
+    tts.pause()
+    tts.clear()
+    tts.resume()
+    settle()
+    clear_ms = (last_sound_end(audio) - cleared_at) * 1000
+
+    tts.callback._stream.close()
+    tts.tts.close()
+    return pause_ms, resume_ms, clear_ms
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8772).start()
+    print(f"[info] {RUNS} runs per mode, p50 / max in ms")
+    print(f"{'mode':<10}{'pause':>14}{'resume':>14}{'clear':>14}")
+    for output_mode in ("blocking", "callback"):
+        results = [probe(server, output_mode) for _ in range(RUNS)]
+        cells = "".join(f"{f'{statistics.median(column):.1f} / {max(column):.1f}':>14}" for column in zip(*results))
+        print(f"{output_mode:<10}{cells}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
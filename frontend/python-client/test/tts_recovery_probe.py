@@ -0,0 +1,137 @@
+"""
+Check that StreamingTTS keeps speaking when the TTS service fails a commit,
+reports an error that belongs to no commit, or never finishes a cancelled one.
+
+rejected commit: a local FakeTtsServer rejects one sentence of a reply with an
+error event, the way the realtime service answers an invalid commit: no
+committed event and no response.done follow. The reply is spoken with one and
+with two commits in flight into a NullAudio device in callback mode. The script
+checks that every sentence was still committed, that the scheduler drained
+(nothing left in flight) and that the other sentences played in full.
+
+unrelated error: the server follows every commit with an error event that
+belongs to no commit (the "no active response" answer to a late
+response.cancel). It must be logged and ignored: every sentence plays in full.
+
+silent cancel: a reply is interrupted while it plays and the server never sends
+response.done for the cancelled response. The next reply must still be spoken
+once the abandoned commit times out (CommitScheduler.abandon_timeout).
+
+Prints one line per case and exits with status 1 if playback stalled.
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_recovery_probe.py
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+SENTENCES = ["第一句先说这个。", "这一句会被服务端拒绝。", "最后一句照常播放。"]
+REJECTED = SENTENCES[1]
+DRAIN_TIMEOUT = 5.0
+ABANDON_TIMEOUT = 1.0
+
+
+def speak(server: FakeTtsServer, max_in_flight: int) -> tuple[bool, int, float]:
+    """返回 (是否排空, 提交的句数, 播放的秒数)"""
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback", max_in_flight=max_in_flight)
+    tts.start()
+    time.sleep(0.3)
+    commits_before = len(server.commits)
+    tts.process_llm_chunk("".join(SENTENCES))
+    tts.flush_pending()
+
+    deadline = time.perf_counter() + DRAIN_TIMEOUT
+    while time.perf_counter() < deadline and (tts.scheduler.in_flight or not tts.sentence_queue.empty()
+                                              or tts.pcm_buffer.available()):
+        time.sleep(0.01)
+    time.sleep(0.1)
+    drained = not tts.scheduler.in_flight and tts.sentence_queue.empty()
+    played = sum(end - start for start, end in audio.sounds)
+    tts.callback._stream.close()
+    tts.tts.close()
+    return drained, len(server.commits) - commits_before, played
+
+
+def after_silent_cancel(server: FakeTtsServer) -> tuple[bool, float]:
+    """返回 (下一句是否播放, 打断到下一句出声的秒数)"""
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback", abandon_timeout=ABANDON_TIMEOUT)
+    tts.start()
+    time.sleep(0.3)
+    tts.process_llm_chunk(SENTENCES[0])
+    tts.flush_pending()
+    while audio.first_sound is None:
+        time.sleep(0.005)
+    interrupted_at = time.perf_counter()
+    tts.interrupt()
+    time.sleep(0.05)
+    tts.process_llm_chunk(SENTENCES[2])
+    tts.flush_pending()
+    deadline = time.perf_counter() + ABANDON_TIMEOUT + DRAIN_TIMEOUT
+    while time.perf_counter() < deadline and not any(start > interrupted_at + 0.1 for start, _ in audio.sounds):
+        time.sleep(0.01)
+    resumed = [start for start, _ in audio.sounds if start > interrupted_at + 0.1]
+    tts.callback._stream.close()
+    tts.tts.close()
+    return bool(resumed), (resumed[0] - interrupted_at) if resumed else float("nan")
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8779, reject_texts=[REJECTED]).start()
+    expected = sum(len(sentence) for sentence in SENTENCES if sentence != REJECTED) * server.seconds_per_char
+    failures = 0
+    for max_in_flight in (1, 2):
+        with contextlib.redirect_stdout(io.StringIO()):
+            drained, commits, played = speak(server, max_in_flight)
+        ok = drained and commits == len(SENTENCES) and played >= expected * 0.9
+        failures += not ok
+        print(f"[{'ok' if ok else 'FAIL'}] rejected commit, in flight {max_in_flight}: drained={drained} "
+              f"commits={commits}/{len(SENTENCES)} played {played:.2f}s of {expected:.2f}s expected")
+
+    stray = FakeTtsServer(port=8768, stray_errors=True).start()
+    expected_all = sum(len(sentence) for sentence in SENTENCES) * stray.seconds_per_char
+    with contextlib.redirect_stdout(io.StringIO()):
+        drained, commits, played = speak(stray, 1)
+    ok = drained and commits == len(SENTENCES) and played >= expected_all * 0.9
+    failures += not ok
+    print(f"[{'ok' if ok else 'FAIL'}] unrelated error: drained={drained} commits={commits}/{len(SENTENCES)} "
+          f"played {played:.2f}s of {expected_all:.2f}s expected")
+
+    silent = FakeTtsServer(port=8769, silent_cancel=True).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        resumed, seconds = after_silent_cancel(silent)
+    failures += not resumed
+    print(f"[{'ok' if resumed else 'FAIL'}] silent cancel: next reply played {seconds:.2f}s after the interrupt "
+          f"(abandon timeout {ABANDON_TIMEOUT:.1f}s)")
+
+    print()
+    if failures:
+        print(f"[error] {failures} case(s) stalled")
+        return 1
+    print("[info] playback recovered in every case")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Replay benchmark for speculative TTS synthesis (StreamingTTS speculate_after).
+
+LLM replies are replayed chunk by chunk with the timing of a streaming model:
+one to three characters every 30-60ms, with occasional stalls of 250-600ms at
+random points (a slow token, a tool call, the network). The end-of-stream
+message arrives DONE_DELAY after the last chunk, and only then is
+flush_pending() called, as in new_web_client. Every stream is spoken through
+StreamingTTS against a local FakeTtsServer into a NullAudio device in callback
+mode, with speculation off and with two stability thresholds.
+
+Reports the time from the first LLM chunk to the first audible sample, the
+time until the reply has finished playing, the total silence inside the reply,
+how many speculative clauses were kept out of those submitted, and the
+characters of discarded speculative clauses (synthesis paid for and thrown
+away; cancelled responses stop early, so this is an upper bound).
+
+Install dependencies before running:
+    pip install websockets dashscope pyaudio
+
+Run from the repository root:
+    python frontend\\python-client\\test\\tts_speculation_bench.py
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeTtsServer, NullAudio  # noqa: E402
+from voiceConverter import StreamingTTS  # noqa: E402
+
+REPLIES = [
+    "好的，我来看一下。设置页面已经打开了",
+    "这个按钮在右上角。点一下就能保存",
+    "Sure, give me a second. The file is saved now.",
+    "我找到了三个结果。第一个看起来最相关",
+    "OK. I will open the browser and search for it.",
+    "页面还在加载，请稍等。加载完成后我再继续",
+]
+STREAMS_PER_REPLY = 2
+STALL_CHANCE = 0.12
+DONE_DELAY = 0.4
+MODES = [("off", None), ("spec 150ms", 0.15), ("spec 300ms", 0.3)]
+
+
+def record_stream(text: str, rng: random.Random) -> list[tuple[float, str]]:
+    """生成一条“录制”的 LLM 流：[(距上一块的秒数, 文本块)]"""
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 3)
+        gap = rng.uniform(0.03, 0.06)
+        if position and rng.random() < STALL_CHANCE:
+            gap = rng.uniform(0.25, 0.6)
+        chunks.append((gap, text[position:position + size]))
+        position += size
+    return chunks
+
+
+def replay(server: FakeTtsServer, stream: list[tuple[float, str]], speculate_after: float | None) -> dict:
+    audio = NullAudio()
+    tts = StreamingTTS(url=server.url, audio=audio, output_mode="callback", speculate_after=speculate_after)
+    tts.start()
+    time.sleep(0.3)
+
+    started = time.perf_counter()
+    for index, (gap, chunk) in enumerate(stream):
+        if index:
+            time.sleep(gap)
+        tts.process_llm_chunk(chunk)
+    time.sleep(DONE_DELAY)
+    tts.flush_pending()
+    while tts.scheduler.in_flight or tts.pcm_buffer.available():
+        time.sleep(0.005)
+    time.sleep(0.1)
+
+    result = {
+        "first_ms": (audio.first_sound - started) * 1000,
+        "finish_s": max(end for _, end in audio.sounds) - started,
+        "silence_ms": sum(audio.gaps) * 1000,
+        "speculated": tts.scheduler.speculated,
+        "confirmed": tts.scheduler.confirmed,
+        "discarded_chars": tts.scheduler.discarded_chars,
+    }
+    tts.callback._stream.close()
+    tts.tts.close()
+    return result
+
+
+def main() -> int:
+    server = FakeTtsServer(port=8776, seconds_per_char=0.06).start()
+    rng = random.Random(7)
+    streams = [record_stream(reply, rng) for reply in REPLIES for _ in range(STREAMS_PER_REPLY)]
+    rows = []
+    for name, speculate_after in MODES:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [replay(server, stream, speculate_after) for stream in streams]
+        speculated = sum(r["speculated"] for r in results)
+        confirmed = sum(r["confirmed"] for r in results)
+        rows.append(
+            f"{name:<12}"
+            f"{statistics.median(r['first_ms'] for r in results):>10.0f}"
+            f"{statistics.mean(r['finish_s'] for r in results):>11.2f}"
+            f"{statistics.mean(r['silence_ms'] for r in results):>12.0f}"
+            f"{confirmed:>7}/{speculated:<6}"
+            f"{sum(r['discarded_chars'] for r in results):>16}"
+        )
+    print()
+    print(f"[info] {len(streams)} replayed streams, stall chance {STALL_CHANCE:.0%} per chunk, "
+          f"end-of-stream {DONE_DELAY * 1000:.0f}ms after the last chunk; TTS first packet "
+          f"{server.first_packet_latency * 1000:.0f}ms")
+    print(f"{'mode':<12}{'first ms':>10}{'finish s':>11}{'silence ms':>12}{'kept':>13}{'discarded chars':>16}")
+    for row in rows:
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
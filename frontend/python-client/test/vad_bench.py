@@ -0,0 +1,132 @@
+"""
+Benchmark the local VAD stage (voice_activity.EnergyVad) on a synthetic
+microphone recording: three utterances separated by pauses over a constant
+noise floor, fed in the same 100ms chunks RealtimeSTT receives from PyAudio.
+
+Reports the upstream bytes saved by not sending silence, the detected speech
+segments, the time from the real end of each utterance to the local
+end-of-speech event (compared with the 1200ms server VAD threshold), and the
+processing cost per chunk, for several hangover settings.
+
+Also checks a background noise step (a fan switching on: the floor rises from
+-55dBFS to NOISE_STEP_DB with nobody speaking). The noise floor also follows
+voiced frames slowly. Without that, every frame after the step would count as
+speech and the segment would never end.
+
+Run from the repository root:
+    python frontend\\python-client\\test\\vad_bench.py
+"""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def repo_python_client_dir() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+sys.path.insert(0, str(repo_python_client_dir()))
+
+from voice_activity import EnergyVad  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1600
+SERVER_SILENCE_MS = 1200
+# (是否语音, 秒)
+SCRIPT = [(False, 1.5), (True, 2.0), (False, 2.0), (True, 1.2), (False, 1.5), (True, 2.5), (False, 1.5)]
+HANGOVERS_MS = (200, 400, 800)
+NOISE_STEP_DB = -30
+NOISE_STEP_SECONDS = 20.0
+
+
+def synthesize() -> tuple[bytes, list[tuple[float, float]]]:
+    """生成录音与真实语音区间 [(开始秒, 结束秒)]"""
+    rng = np.random.default_rng(0)
+    pieces = []
+    spans = []
+    position = 0.0
+    for voiced, seconds in SCRIPT:
+        count = int(seconds * SAMPLE_RATE)
+        t = np.arange(count) / SAMPLE_RATE
+        noise = rng.normal(0, 32768 * 10 ** (-55 / 20), count)
+        if voiced:
+            # 基频 + 泛音，按 4Hz 音节包络起伏，包络谷底模拟字间停顿
+            envelope = 0.35 + 0.65 * np.abs(np.sin(np.pi * 4 * t))
+            tone = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 5))
+            signal = noise + 32768 * 10 ** (-20 / 20) * envelope * tone / 2
+            spans.append((position, position + seconds))
+        else:
+            signal = noise
+        pieces.append(np.clip(signal, -32768, 32767).astype(np.int16))
+        position += seconds
+    return np.concatenate(pieces).tobytes(), spans
+
+
+def run(pcm: bytes, spans: list[tuple[float, float]], hangover_ms: int) -> dict:
+    vad = EnergyVad(sample_rate=SAMPLE_RATE, hangover_ms=hangover_ms)
+    chunk_bytes = CHUNK_FRAMES * 2
+    ends: list[float] = []
+    costs: list[float] = []
+    for offset in range(0, len(pcm), chunk_bytes):
+        start = time.perf_counter()
+        events = vad.feed(pcm[offset:offset + chunk_bytes])
+        costs.append(time.perf_counter() - start)
+        # 一块 100ms 音频在其结束时刻才交给回调，事件时间按块结束时刻计
+        chunk_end = (offset + chunk_bytes) / 2 / SAMPLE_RATE
+        ends.extend(chunk_end for kind, _ in events if kind == "end")
+    turn_end = [(detected - real_end) * 1000 for (_, real_end), detected in zip(spans, ends)]
+    stats = vad.stats()
+    return {
+        "hangover": hangover_ms,
+        "segments": stats["segments"],
+        "sent": stats["sent_bytes"] / len(pcm),
+        "speech_ratio": stats["speech_ratio"],
+        "turn_end": statistics.mean(turn_end) if turn_end else float("nan"),
+        "cost_us": statistics.median(costs) * 1e6,
+    }
+
+
+def noise_step() -> float | None:
+    """背景噪声突然变大后，多少秒才给出 end 事件；None 表示一直没有结束"""
+    rng = np.random.default_rng(1)
+    quiet = rng.normal(0, 32768 * 10 ** (-55 / 20), int(1.5 * SAMPLE_RATE))
+    loud = rng.normal(0, 32768 * 10 ** (NOISE_STEP_DB / 20), int(NOISE_STEP_SECONDS * SAMPLE_RATE))
+    pcm = np.clip(np.concatenate([quiet, loud]), -32768, 32767).astype(np.int16).tobytes()
+    vad = EnergyVad(sample_rate=SAMPLE_RATE)
+    chunk_bytes = CHUNK_FRAMES * 2
+    for offset in range(0, len(pcm), chunk_bytes):
+        if any(kind == "end" for kind, _ in vad.feed(pcm[offset:offset + chunk_bytes])):
+            return (offset + chunk_bytes) / 2 / SAMPLE_RATE - 1.5
+    return None
+
+
+def main() -> int:
+    pcm, spans = synthesize()
+    total = len(pcm) / 2 / SAMPLE_RATE
+    speech = sum(end - start for start, end in spans)
+    print(f"[info] {total:.1f}s recording, {len(spans)} utterances, {speech / total:.0%} speech")
+    print(f"[info] server VAD ends a turn {SERVER_SILENCE_MS}ms after speech and receives every byte")
+    print()
+    print(f"{'hangover ms':<13}{'segments':>9}{'uploaded':>10}{'speech ratio':>14}{'turn end ms':>13}{'us/chunk':>10}")
+    for hangover_ms in HANGOVERS_MS:
+        row = run(pcm, spans, hangover_ms)
+        print(f"{row['hangover']:<13}{row['segments']:>9}{row['sent']:>10.0%}{row['speech_ratio']:>14.0%}"
+              f"{row['turn_end']:>13.0f}{row['cost_us']:>10.0f}")
+
+    print()
+    ended = noise_step()
+    if ended is None:
+        print(f"[error] noise step to {NOISE_STEP_DB}dBFS: segment still open after {NOISE_STEP_SECONDS:.0f}s")
+        return 1
+    print(f"[info] noise step to {NOISE_STEP_DB}dBFS: floor caught up, segment ended after {ended:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
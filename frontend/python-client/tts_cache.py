@@ -0,0 +1,168 @@
+import hashlib
+import mmap
+import os
+import queue
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+# =========================================
+# TTS 音频本地缓存
+# =========================================
+# 问候、确认、报错等短句反复出现，每次都走一遍实时合成既慢又花钱。
+# 以 (voice_id, model, speech_rate, 规范化后的句子) 的哈希为键把 PCM 存到磁盘：
+# 命中时直接 mmap 文件交给播放缓冲，未命中时照常合成，合成完成后由后台线程写入。
+# 总大小超过 max_bytes 时按最近使用顺序淘汰。
+
+def normalize_sentence(text):
+    """全半角统一、折叠空白，读音相同的句子共用一个缓存项"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class PcmCache:
+    """
+    内容寻址的 PCM 磁盘缓存，可被多个 StreamingTTS 共享。
+    get() 在调用线程完成（只做 mmap），put() 只入队，由后台线程落盘与淘汰。
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, max_chars=40):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars      # 只缓存短句，长句几乎不会重复
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # key -> 字节数，按最近使用排序（末尾最新）
+        self.total_bytes = 0
+        self._pending = queue.Queue()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.stores = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        threading.Thread(target=self._fill_loop, daemon=True).start()
+
+    def key(self, voice_id, model, speech_rate, sentence):
+        """缓存键；句子过长或为空时返回 None，表示不参与缓存"""
+        text = normalize_sentence(sentence)
+        if not text or len(text) > self.max_chars:
+            return None
+        raw = "\x1f".join((str(voice_id), str(model), repr(float(speech_rate)), text))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pcm")
+
+    def _load_index(self):
+        # 启动时扫描目录重建索引，按修改时间近似最近使用顺序
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pcm"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        """命中返回只读 mmap（调用方用完 close），未命中返回 None"""
+        if key is None:
+            return None
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self.path(key), "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(self.path(key))
+        except (OSError, ValueError):
+            # 文件被外部删除或损坏：当作未命中并移出索引
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            self.bytes_served += len(data)
+        return data
+
+    def put(self, key, pcm_bytes):
+        """异步写入，不阻塞 TTS 回调线程"""
+        if key is None or not pcm_bytes:
+            return
+        self._pending.put((key, bytes(pcm_bytes)))
+
+    def _fill_loop(self):
+        while True:
+            key, pcm_bytes = self._pending.get()
+            if key is None:  # flush() 的标记
+                pcm_bytes.set()
+                continue
+            try:
+                self._store(key, pcm_bytes)
+            except OSError as e:
+                print(f"[TtsCache error] {e}")
+
+    def _store(self, key, pcm_bytes):
+        with self.lock:
+            if key in self.entries:
+                return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，读者不会看到写了一半的文件
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(pcm_bytes)
+        os.replace(tmp, path)
+        with self.lock:
+            self.entries[key] = len(pcm_bytes)
+            self.total_bytes += len(pcm_bytes)
+            self.stores += 1
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass  # Windows 下仍被 mmap 的文件删不掉，只移出索引
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def flush(self, timeout=5.0):
+        """等待后台写入完成（测试与退出时用）"""
+        done = threading.Event()
+        self._pending.put((None, done))
+        done.wait(timeout)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "total_bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
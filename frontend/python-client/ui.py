@@ -1,7 +1,7 @@
+import os
 import sys
 import threading
 import time
-import queue
 import logging
 
 # 简单配置日志（可根据需要调整级别、格式）
@@ -20,14 +20,11 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
-    QSizePolicy,
-    QTextEdit
+    QSizePolicy
 )
 
 from PyQt6.QtCore import (
-    Qt,
-    QObject,
-    pyqtSignal
+    Qt
 )
 
 from PyQt6.QtGui import QPixmap
@@ -35,6 +32,10 @@ from PyQt6.QtGui import QPixmap
 from pynput import keyboard
 
 from new_web_client import WebSocketClient
+from voiceConverter import StreamingTTS
+from tts_cache import PcmCache
+from latency_trace import TurnTracer
+from stream_text import StreamTextView
 
 from speechToText import RealtimeSTT
 
@@ -52,31 +53,15 @@ IMAGE_PATH = os.path.join(
 stop_event  = threading.Event()
 
 
-def clear_queue_safely(q):
-        while not q.empty():
-            try:
-                # 使用非阻塞 get，避免在队列为空时永久阻塞
-                q.get_nowait()
-            except queue.Empty:
-                break
-
-# --------------------
-# GUI线程安全信号
-# --------------------
-
-class GuiSignal(QObject):
-
-    update_text_signal = pyqtSignal(str)
-
-
-
 # ─── 键盘控制器 ────────────────────────────────────────────────────────────────
 class KeyboardController:
     """监听 Space（PTT 录音）和 Esc（退出），回调保持轻量不阻塞。"""
 
-    def __init__(self, stt, stop_event: threading.Event):
+    def __init__(self, stt, stop_event: threading.Event, tts=None, on_barge_in=None):
         self._stt        = stt
         self._stop_event = stop_event
+        self._tts        = tts
+        self._on_barge_in = on_barge_in  # 按下 Space 时先打断正在播放的语音，None 表示不打断
         self._recording  = False
         self._listener   = keyboard.Listener(
             on_press=self._on_press,
@@ -94,9 +79,11 @@ class KeyboardController:
             if self._recording:
                 return
             self._recording = True
-            if self._stt.is_paused:
-                print("\n[键盘线程] 恢复 STT 采集")
-                self._stt.resume()
+            if self._on_barge_in:
+                self._on_barge_in()
+            # 上一次松开的暂停可能还在控制线程排队，这里不看 is_paused，总是按顺序排一个恢复请求
+            print("\n[键盘线程] 恢复 STT 采集")
+            self._stt.resume_async()
         elif key == keyboard.Key.esc:
             print("\n[键盘线程] 收到退出指令")
             self._stop_event.set()
@@ -108,30 +95,15 @@ class KeyboardController:
             print("\n[键盘线程] 恢复扬声器流写入")
             self._tts.callback.ifCanWrite = True
 
-    # 设置暂停标识后，调用stt.pause停止音频采集，之后等待语音队列中的数据被全部发送至云端，然后commit
+    # 松开 Space：请求 STT 停止采集并在音频发送完毕后 commit，立即返回，转录结果由 _on_transcript 异步接收
     def _on_release(self, key):
         if key == keyboard.Key.space:
             self._recording = False
             print("\n[键盘线程] 暂停 STT 采集")
-            # 1. stt 音频采集关闭
-            self._stt.pause()
-            # 2.等待语音队列发送完毕
-            while not self._stt.audio_queue.empty():
-                try:
-                    time.sleep(0.1)
-                except queue.Empty:
-                    break
-            # 3.手动 commit
-            self._stt.completed_event.clear() # 复用event
-            self._stt.conversation.commit()
-            # 4.等待这次commit的complete事件，拿到最终转录结果
-            completed = self._stt.completed_event.wait(timeout=10)  # 阻塞等待最多10秒
-            if completed:
-                print("keyboard listener detected commit completed event!")
-                text = self._stt.transcript_queue.get_nowait()
-                print(f"\n[键盘线程] 文本入队: {text}")
-            else:
-                print("keyboard listener wait for completed event but timed out!")
+            self._stt.commit_async(on_transcript=self._on_transcript)
+
+    def _on_transcript(self, text):
+        print(f"\n[ASR 回调线程] 转录完成: {text}")
 
 
 
@@ -154,14 +126,6 @@ class AssistantWindow(QWidget):
             650
         )
 
-        # ---------- 信号 ----------
-
-        self.signal = GuiSignal()
-
-        self.signal.update_text_signal.connect(
-            self.update_dynamic_text
-        )
-
         # ---------- Layout ----------
 
         main_layout = QVBoxLayout()
@@ -191,7 +155,11 @@ class AssistantWindow(QWidget):
 
         # ---------- AI字幕 ----------
 
-        self.dynamic_text = QTextEdit()
+        # 流式 token 先进缓冲区，按 ~40Hz 合并刷新；超过 1200 字从头部整块删除
+        self.dynamic_text = StreamTextView(
+            fps=40,
+            max_chars=1200
+        )
 
         # 用户不能编辑
         self.dynamic_text.setReadOnly(True)
@@ -257,9 +225,19 @@ class AssistantWindow(QWidget):
 
         # ---------- 初始化 WebSocket ----------
 
+        # 每轮对话各阶段时延追加写入 latency_trace.jsonl，可用 python latency_trace.py latency_trace.jsonl 查看分位数
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.tracer = TurnTracer(os.path.join(base_dir, "latency_trace.jsonl"))
+
+        # 回调模式播放：暂停 / 恢复 / 清空在一个音频帧内生效；常用短句从本地缓存直接播放
+        cache = PcmCache(os.path.join(base_dir, "tts_pcm_cache"))
+        tts = StreamingTTS(output_mode="callback", cache=cache, tracer=self.tracer)
+        tts.start()
         self.client = WebSocketClient(
             "ws://localhost:8600/ws",
-            text_callback=self.receive_ws_text
+            text_callback=self.receive_ws_text,
+            tts=tts,
+            tracer=self.tracer
         )
 
         threading.Thread(
@@ -269,73 +247,47 @@ class AssistantWindow(QWidget):
 
 
         # ---------- 初始化 STT ----------
+        # 麦克风只在按住 PTT 时打开，按下即已打断播放；commit 模式关闭了服务端 VAD，不会收到 speech_started，
+        # 因此不再注册 speech_callback（需要“开口即打断”时给 RealtimeSTT 传入 vad=EnergyVad()）
         self.stt = RealtimeSTT(
+            tracer=self.tracer,
             text_callback=self.receive_stt_text
         )
         self.stt.start()
         self.stt.pause()
 
         # ---------- 初始化键盘监听 ----------
-        keyboard_ctrl = KeyboardController(self.stt, stop_event)
+        keyboard_ctrl = KeyboardController(
+            self.stt, stop_event, tts=self.client.tts,
+            on_barge_in=lambda: self.barge_in("push-to-talk")
+        )
         keyboard_ctrl.start()
 
 
     # 清空缓冲区语音以及本轮对话还未播放的语音
     def toggle_clear(self):
-        # 1. 首先禁止扬声器播放
-        self.client.tts.callback.ifCanWrite = False
-
-        # 2.本轮对话还未返回的文本取消语音转化，下次发消息时恢复
-        self.client.should_tts = False  
-        logger.info("self.client.should_tts set to False")
-
-        # 2.5 currentSentence清空，为确保清空，下轮对话发送时再次清空
-        with self.client.tts.currentSentenceCondition:
-            self.client.tts.currentSentence = ""
-            logger.info("currentSentence cleared")
- 
-        with self.client.tts.callback.condition:
-            # 3. 清空语音缓冲区
-            clear_queue_safely(self.client.tts.sentence_queue)
-
-            # 4. 清空语音缓冲区后，有至多一条 commit 的消息尚未响应，等待其第一个delta事件响应
-        
-            # 4.1 首先判断第一个delta事件是否已经触发，如果触发了，说明当前commit的语音已经开始生成了，直接将其标记为abandonedItemId
-            if self.client.tts.callback.isAck:
-                self.client.tts.callback.abandonedItemId = self.client.tts.callback.currentItemId
-                logger.info(f'清空语音后，标记abandonedItemId: {self.client.tts.callback.abandonedItemId}')
-            else:
-                # 4.2 如果第一个delta事件还未触发，说明当前commit的语音还未生成，等待其第一个delta事件触发后再标记abandonedItemId
-                logger.info('清空语音后，等待首个delta事件触发以标记abandonedItemId')
-                # 防止虚假唤醒
-                while not self.client.tts.callback.isAck:
-                    self.client.tts.callback.condition.wait()  # 阻塞等待首个delta事件触发(释放锁)
-                logger.info(f'首个delta事件触发后，标记abandonedItemId: {self.client.tts.callback.currentItemId}')
-                self.client.tts.callback.abandonedItemId = self.client.tts.callback.currentItemId
-
-        # 5.清空云端返回语音缓冲区
-        clear_queue_safely(self.client.tts.pcm_buffer)
-
-        # 6. 清空语音后，恢复扬声器播放
-        self.client.tts.callback.ifCanWrite = True
-        logger.info("语音清空成功")
-        return
-    
-    
-
-    
+        self.barge_in("button")
 
+    # 打断（barge-in）：按下 PTT、检测到用户说话或点击清空按钮时调用，可在任意线程执行，不阻塞
+    def barge_in(self, source="button"):
+        start = time.perf_counter()
+        # 1.本轮对话还未返回的文本取消语音转化，下次发消息时恢复
+        self.client.should_tts = False
 
+        # 2. 丢弃未断句文本、待提交句子与待播放语音，扬声器在下一帧静音；
+        #    在途 commit 标记为放弃，服务端正在合成的回复由 TTS 回调线程发送 response.cancel 取消
+        self.client.tts.interrupt()
+        logger.info(f"barge-in ({source}) 完成，调用耗时 {(time.perf_counter() - start) * 1000:.2f}ms")
 
     def toggle_pause(self):
         """切换 TTS 播放暂停/恢复，并更新按钮图标"""
         if self.client.tts.callback.ifCanWrite:
             # 当前允许写入 → 暂停播放
-            self.client.tts.callback.ifCanWrite = False
+            self.client.tts.pause()
             self.pause_btn.setText("▶️")   # 变为“播放”图标
         else:
             # 当前暂停 → 恢复播放
-            self.client.tts.callback.ifCanWrite = True
+            self.client.tts.resume()
             self.pause_btn.setText("⏸️")   # 变为“暂停”图标
 
     # --------------------
@@ -344,7 +296,8 @@ class AssistantWindow(QWidget):
 
     def receive_ws_text(self, text):
 
-        self.signal.update_text_signal.emit(
+        # WebSocket 线程调用；append_stream 线程安全，每帧最多唤醒一次 GUI 线程
+        self.update_dynamic_text(
             text
         )
 
@@ -362,60 +315,10 @@ class AssistantWindow(QWidget):
     # UI更新
     # --------------------
 
-    # def update_dynamic_text(self, text):
-
-    #     cursor = self.dynamic_text.textCursor()
-
-    #     cursor.movePosition(
-    #         cursor.MoveOperation.End
-    #     )
-
-    #     cursor.insertText(text)
-
-    #     self.dynamic_text.setTextCursor(
-    #         cursor
-    #     )
-
-    #     # 自动滚到底部
-    #     self.dynamic_text.ensureCursorVisible()
-
-    #     # 限制最大字符数
-    #     MAX_CHARS = 1200
-
-    #     content = self.dynamic_text.toPlainText()
-
-    #     if len(content) > MAX_CHARS:
-
-    #         self.dynamic_text.setPlainText(
-    #             content[-MAX_CHARS:]
-    #         )
-
-    #         cursor = self.dynamic_text.textCursor()
-
-    #         cursor.movePosition(
-    #             cursor.MoveOperation.End
-    #         )
-
-    #         self.dynamic_text.setTextCursor(
-    #             cursor
-    #         )
-
     def update_dynamic_text(self, text):
 
-        cursor = self.dynamic_text.textCursor()
-
-        cursor.movePosition(
-            cursor.MoveOperation.End
-        )
-
-        cursor.insertText(text)
-
-        self.dynamic_text.setTextCursor(
-            cursor
-        )
-
-        # 自动滚动到底部
-        self.dynamic_text.ensureCursorVisible()
+        # 合并刷新、滚动与长度限制都由 StreamTextView 处理
+        self.dynamic_text.append_stream(text)
 
     # --------------------
     # 发消息
@@ -432,7 +335,7 @@ class AssistantWindow(QWidget):
 
         self.client.should_tts = True  # 发送消息时恢复 TTS
         print("self.client.should_tts set to True")
-        self.client.tts.currentSentence = ""
+        self.client.tts.reset_text()
 
         self.client.send_message(
             text
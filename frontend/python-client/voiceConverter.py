@@ -1,7 +1,10 @@
 import base64
+import mmap
 import os
 import threading
 import uuid
+from collections import deque
+from audio_buffer import BYTES_PER_SAMPLE, SAMPLE_RATE, PcmRingBuffer, ms_to_bytes
 import dashscope
 from dashscope.audio.qwen_tts_realtime import *
 import json
@@ -9,6 +12,7 @@ import queue
 import threading
 import time
 import base64
+import numpy as np
 import pyaudio
 from dashscope.audio.qwen_tts_realtime import *
 import logging
@@ -26,7 +30,6 @@ logger = logging.getLogger(__name__)
 # 全局状态
 # =========================================
 DEFAULT_TARGET_MODEL = "qwen3-tts-vc-realtime-2026-01-15" 
-tts_busy = False
 BASE_DIR= os.path.dirname(os.path.abspath(__file__))
 VOICE_NAME = "Arknights_shu"
 
@@ -38,6 +41,120 @@ def is_sentence_end(text: str):
     return text[-1] in ['。', '！', '？', '.', '!', '?']
 
 
+# =========================================
+# 增量断句
+# =========================================
+# 中文标点直接断句；英文标点需后跟空白才断（避免 3.14、1,000、e.g. 被切开）。标点位于缓冲末尾时等下一个字符再判断。
+# 英文标点与空白之间可以夹着收尾引号、括号（He said 'hi.' Bye.）。
+CJK_STRONG_PUNCTUATION = set('。！？…\n')
+CJK_WEAK_PUNCTUATION = set('，；：、')
+ASCII_STRONG_PUNCTUATION = set('.!?')
+ASCII_WEAK_PUNCTUATION = set(',;:')
+TERMINATORS = CJK_STRONG_PUNCTUATION | CJK_WEAK_PUNCTUATION | ASCII_STRONG_PUNCTUATION | ASCII_WEAK_PUNCTUATION
+CLOSING_QUOTES = set('”’」』）)》')
+CLOSING_CHARS = CLOSING_QUOTES | CJK_STRONG_PUNCTUATION | ASCII_STRONG_PUNCTUATION
+# 英文引号开合同形，只有紧跟在标点（或另一个这样的引号）之后才算收尾引号；
+# 双引号另外要求当前片段里有未配对的 "（单引号兼作撇号 don't，无法配对）
+AMBIGUOUS_QUOTES = set('"\'')
+
+
+class SentenceSegmenter:
+    """
+    增量断句器：每次只扫描新到达的字符。
+    句末标点随时断句；逗号、分号等在片段达到 min_length 后断句；片段超过 max_length 时强制断句；
+    超过 idle_timeout 秒没有新文本时由调用方通过 flush_if_idle 取走剩余文本。
+    """
+
+    def __init__(self, min_length=8, max_length=60, idle_timeout=0.8):
+        self.min_length = min_length
+        self.max_length = max_length
+        self.idle_timeout = idle_timeout
+        self.buffer = ""
+        self.scanned = 0            # buffer 中已扫描到的位置，新文本从这里继续
+        self.last_feed = time.monotonic()
+
+    def _cut_at(self, i, start):
+        """判断 buffer[i] 处能否断句，返回断句位置（不含）或 None"""
+        buffer = self.buffer
+        ch = buffer[i]
+        length = i + 1 - start
+        if ch in CJK_STRONG_PUNCTUATION or (ch in CJK_WEAK_PUNCTUATION and length >= self.min_length):
+            if self._closing_end(i + 1, start) >= len(buffer):
+                return -1           # 标点（及收尾引号、括号）在末尾，等待下一个字符，收尾符号不落到下一句开头
+            return i + 1
+        if ch in ASCII_STRONG_PUNCTUATION or (ch in ASCII_WEAK_PUNCTUATION and length >= self.min_length):
+            end = self._closing_end(i + 1, start)
+            if end >= len(buffer):
+                return -1
+            # 单字母缩写（e.g. / i.e.）的第二个点不断句
+            if buffer[end].isspace() and not (ch == "." and i >= 2 and buffer[i - 2] == "." and buffer[i - 1].isalpha()):
+                return i + 1
+        if length >= self.max_length:
+            return i + 1
+        return None
+
+    def _closing_end(self, cut, start):
+        """从 cut 开始跳过连续的句末标点与收尾引号、括号，返回第一个其他字符的位置；start 为当前片段起点"""
+        buffer = self.buffer
+        while cut < len(buffer):
+            ch = buffer[cut]
+            if ch in CLOSING_CHARS:
+                cut += 1
+            elif (ch in AMBIGUOUS_QUOTES and buffer[cut - 1] in TERMINATORS | AMBIGUOUS_QUOTES
+                  and (ch == "'" or buffer.count('"', start, cut) % 2 == 1)):
+                cut += 1
+            else:
+                break
+        return cut
+
+    def feed(self, chunk):
+        """追加文本，返回本次新产生的完整片段列表"""
+        self.buffer += chunk
+        self.last_feed = time.monotonic()
+        buffer = self.buffer
+        segments = []
+        start = 0
+        i = self.scanned
+        while i < len(buffer):
+            cut = self._cut_at(i, start)
+            if cut == -1:
+                break
+            if cut is not None:
+                # 连续标点和收尾引号、括号并入当前片段
+                cut = self._closing_end(cut, start)
+                segment = buffer[start:cut].strip()
+                if segment:
+                    segments.append(segment)
+                start = cut
+                i = cut
+                continue
+            i += 1
+        self.buffer = buffer[start:]
+        self.scanned = i - start
+        return segments
+
+    def flush(self):
+        """取走剩余文本（流结束或空闲超时时调用）"""
+        segment = self.buffer.strip()
+        self.buffer = ""
+        self.scanned = 0
+        return segment
+
+    def flush_if_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.buffer.strip() and now - self.last_feed >= self.idle_timeout:
+            return self.flush()
+        return ""
+
+
+def clause_core(text):
+    """去掉首尾空白与句尾的收尾引号、括号，用于比较投机文本与最终断出的片段
+
+    句尾标点不去掉：“好的”与“好的？”语调不同，投机合成的音频不能复用。
+    """
+    return text.strip().rstrip("".join(CLOSING_QUOTES | AMBIGUOUS_QUOTES)).rstrip()
+
+
 def init_dashscope_api_key():
     if 'DASHSCOPE_API_KEY' in os.environ:
         dashscope.api_key = os.environ[
@@ -46,50 +163,436 @@ def init_dashscope_api_key():
         dashscope.api_key = 'your-dashscope-api-key'  # set API-key manually
 
 
-# 提交下一句（核心）
-def try_commit_next(qwen_tts=None,sentence_queue=None,callbackObject=None):
-    global tts_busy
-    # 当前TTS还在生成
-    if tts_busy:
-        return
-    with callbackObject.condition:
-        # 没有待播句子
-        if sentence_queue.empty():
-            return
-        
-        sentence = sentence_queue.get()
-        # print(f'[TTS] commit sentence: {sentence}')
-        tts_busy = True
-        qwen_tts.append_text(sentence)
-        
-        event_id = "event_" + uuid.uuid4().hex
-        logger.info(f'手动提交了commit，eventId: {event_id}')
-    
-        callbackObject.isAck = False  # 重置标记，等待服务端的第一个delta事件
-        qwen_tts.send_raw(json.dumps({
-            "event_id": event_id,
-            "type": "input_text_buffer.commit",
-        }))
+def clear_queue_safely(q):
+    while not q.empty():
+        try:
+            # 使用非阻塞 get，避免在队列为空时永久阻塞
+            q.get_nowait()
+        except queue.Empty:
+            break
 
 
 # =========================================
-# TTS 回调
+# commit 调度：多句在途，按提交顺序播放
 # =========================================
 
-class MyCallback(QwenTtsRealtimeCallback):
-    def __init__(self, sentence_queue=None):
-        self._player = pyaudio.PyAudio()
+class CommitScheduler:
+    """
+    保持至多 max_in_flight 个 commit 同时在服务端合成，消除句与句之间的合成空档。
+    默认 1：多个 commit 重叠只在 FakeTtsServer 上验证过，真实服务确认支持前 2 需显式开启。
+    每个 commit 对应一条记录，按提交顺序排队：committed 事件按顺序绑定 item_id，
+    队首记录的音频直接输出，后面记录的音频先缓存，队首 response.done 后再依次放出，保证播放顺序。
+    所有状态都属于实例，多个 StreamingTTS 互不影响。
+    网络发送不在 lock 内进行：commit 先在锁内登记并排入 outbox，再由 send_pending 在锁外按顺序发出，
+    TTS 连接卡住时打断、清空等只需 lock 的操作不会被阻塞。
+    """
+
+    def __init__(self, sentence_queue, pcm_sink, max_in_flight=1, on_idle=None, abandon_timeout=3.0):
+        self.tts = None                 # QwenTtsRealtime，由 StreamingTTS 在创建后设置
+        self.sentence_queue = sentence_queue
+        self.pcm_sink = pcm_sink        # 接收按序输出的 PCM，如 PcmRingBuffer.write
+        self.on_idle = on_idle          # 所有 commit 都已完成且没有待提交句子时调用
+        self.max_in_flight = max_in_flight
+        # 被放弃的记录等 response.done 空出名额；服务端取消后不回 done、或回复还没出音频（没发过 cancel）时，
+        # 超过 abandon_timeout 秒直接视为结束，避免在途名额被永久占住
+        self.abandon_timeout = abandon_timeout
+        self.lock = threading.RLock()
+        self.send_lock = threading.Lock()  # 保证 append + commit 成对、按 outbox 顺序发送
+        self.outbox = deque()           # 已登记、尚未发送的 commit 记录
+        self.in_flight = deque()        # 按提交顺序的在途记录
+        self.by_item = {}               # item_id -> 记录
+        self.finished = deque(maxlen=32)  # 最近结束的 item_id，迟到的 delta 直接丢弃
+        self.cache = None               # PcmCache，命中的句子不再提交给服务端
+        self.cache_voice = None         # (voice_id, model, speech_rate)，由 StreamingTTS.start 设置
+        self.tracer = None              # latency_trace.TurnTracer，记录首个音频 delta
+
+        # 投机合成统计
+        self.speculated = 0
+        self.confirmed = 0
+        self.discarded = 0
+        self.discarded_chars = 0        # 被丢弃的投机文本字数（白白提交合成的部分）
+
+    def try_commit_next(self):
+        """在途数量未满且有待播句子时继续提交（核心）"""
+        served = False
+        with self.lock:
+            while self._server_in_flight() < self.max_in_flight and not self.sentence_queue.empty():
+                try:
+                    sentence = self.sentence_queue.get_nowait()
+                except queue.Empty:
+                    break
+                cache_key = self._cache_key(sentence)
+                if self._serve_cached(sentence, cache_key):
+                    served = True
+                    continue
+                self._commit(sentence, cache_key)
+            idle = served and not self.in_flight
+        self.send_pending()
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def _commit(self, sentence, cache_key, speculative=False):
+        """在 lock 内登记一个 commit，实际发送由 send_pending 在锁外完成"""
+        record = {
+            "sentence": sentence, "event_id": "event_" + uuid.uuid4().hex, "item_id": None,
+            "chunks": [], "done": False, "abandoned": False, "cancel_sent": False, "sent": False,
+            "cache_key": cache_key, "fill": bytearray() if cache_key else None,
+            "speculative": speculative,
+        }
+        self.in_flight.append(record)
+        self.outbox.append(record)
+        return record
+
+    def send_pending(self):
+        """
+        按登记顺序发送 outbox 中的 commit，不持有 lock。
+        已有线程在发送时直接返回，由它一并发完，调用方（包括打断路径）不会等在卡住的连接上。
+        """
+        while self.send_lock.acquire(blocking=False):
+            try:
+                while True:
+                    with self.lock:
+                        if not self.outbox:
+                            break
+                        record = self.outbox.popleft()
+                        record["sent"] = True
+                    # append 与 commit 在 send_lock 内成对发送，避免两句文本混进同一个 commit
+                    self.tts.append_text(record["sentence"])
+                    self.tts.send_raw(json.dumps({
+                        "event_id": record["event_id"],
+                        "type": "input_text_buffer.commit",
+                    }))
+                    logger.info(f'手动提交了commit，eventId: {record["event_id"]}，在途 {len(self.in_flight)}')
+            finally:
+                self.send_lock.release()
+            # 释放前另一线程登记的 commit 可能因抢锁失败而未发送，复查一次
+            with self.lock:
+                if not self.outbox:
+                    break
+
+    def speculate(self, sentence):
+        """
+        用空闲的在途名额投机合成尚未断句的文本，返回记录；没有空闲名额时返回 None。
+        投机记录的音频先扣住不播，confirm() 后按顺序放出，discard() 则整条丢弃。
+        只登记不发送，调用方释放自己的锁后调用 send_pending。
+        """
+        with self.lock:
+            if not self.sentence_queue.empty() or self._server_in_flight() >= self.max_in_flight:
+                return None
+            cache_key = self._cache_key(sentence)
+            if cache_key and cache_key in self.cache:
+                return None  # 命中缓存的句子确认后即可播放，无需投机
+            self.speculated += 1
+            return self._commit(sentence, cache_key, speculative=True)
+
+    def confirm(self, record):
+        """最终文本与投机文本一致：保留已合成的音频"""
+        with self.lock:
+            if record["abandoned"]:
+                return
+            record["speculative"] = False
+            self.confirmed += 1
+            if record is self.in_flight[0]:
+                self._release_chunks(record, play=True)
+            self._advance()
+        self._after_progress()
+
+    def discard(self, record):
+        """最终文本与投机文本不一致：按 item_id 丢弃该回复，服务端合成在下一个 delta 时取消"""
+        with self.lock:
+            if record["abandoned"]:
+                return
+            self._abandon(record)
+            self.discarded += 1
+            self.discarded_chars += len(record["sentence"])
+            self._advance()
+        self._after_progress()
+
+    def _server_in_flight(self):
+        return sum(1 for record in self.in_flight if not record.get("cached"))
+
+    def _cache_key(self, sentence):
+        if self.cache is None or self.cache_voice is None:
+            return None
+        return self.cache.key(*self.cache_voice, sentence)
+
+    def _serve_cached(self, sentence, cache_key):
+        """缓存命中：不经服务端，作为一条已完成的记录按顺序播放"""
+        pcm = self.cache.get(cache_key) if cache_key else None
+        if pcm is None:
+            return False
+        logger.info(f'TTS 缓存命中: {sentence}')
+        if not self.in_flight:
+            self.pcm_sink(pcm)
+            pcm.close()
+            return True
+        # 前面还有在途句子：先挂在队尾，轮到它时由 _advance 放出
+        self.in_flight.append({
+            "sentence": sentence, "event_id": None, "item_id": "cached_" + uuid.uuid4().hex,
+            "chunks": [pcm], "done": True, "abandoned": False, "cancel_sent": False, "sent": True,
+            "cached": True, "cache_key": None, "fill": None, "speculative": False,
+        })
+        return True
+
+    def _record_for(self, item_id):
+        record = self.by_item.get(item_id)
+        if record is None:
+            # 兜底：未收到 committed 事件时，按顺序绑定到第一条已发送、未绑定的记录
+            record = next((r for r in self.in_flight if r["item_id"] is None and r["sent"]), None)
+            if record is not None:
+                record["item_id"] = item_id
+                self.by_item[item_id] = record
+        return record
+
+    def on_committed(self, item_id):
+        with self.lock:
+            self._record_for(item_id)
+
+    def on_delta(self, item_id, pcm_bytes):
+        cancel = False
+        with self.lock:
+            if item_id in self.finished:
+                return
+            record = self._record_for(item_id)
+            if record is None or record["abandoned"]:
+                logger.info(f'丢弃被放弃的itemId的delta事件，itemId: {item_id}')
+                if record is not None and not record["cancel_sent"]:
+                    # 被放弃的回复开始出音频，说明它正是服务端当前在合成的回复，取消它以尽快空出在途名额
+                    record["cancel_sent"] = True
+                    cancel = True
+            else:
+                if self.tracer:
+                    self.tracer.mark("first_delta")
+                if record["fill"] is not None:
+                    record["fill"] += pcm_bytes
+                if record is self.in_flight[0] and not record["speculative"]:
+                    self.pcm_sink(pcm_bytes)
+                else:
+                    record["chunks"].append(pcm_bytes)
+        if cancel:
+            # 在锁外发送，连接卡住时不影响打断
+            with self.send_lock:
+                self.tts.cancel_response()
+
+    def on_done(self, item_id):
+        with self.lock:
+            if item_id and item_id in self.finished:
+                return  # 已超时释放的记录迟到的 done
+            record = self._record_for(item_id) if item_id else None
+            if record is None:
+                # 没有 item_id 时按服务端顺序生成的假设，结束的是最早未完成的记录
+                record = next((r for r in self.in_flight if not r["done"] and r["sent"]), None)
+            if record is not None:
+                record["done"] = True
+                if record["fill"] and not record["abandoned"]:
+                    # 完整合成的句子交给后台写入缓存，被打断的不写
+                    self.cache.put(record["cache_key"], record["fill"])
+                record["fill"] = None
+            self._advance()
+        logger.info('尝试提交下一句')
+        self._after_progress()
+
+    def on_error(self, error):
+        """
+        服务端 error 事件：只有确认是某个 commit 失败时才结束该记录并继续后面的句子，避免播放卡死。
+        按 error.event_id 匹配 commit 的 event_id；没有 event_id 但明确是 input_text_buffer 的错误时，
+        取最早尚未 committed 的记录（被拒绝的 commit 不会有 committed 事件）。
+        其他错误（如取消已结束的回复时的 no active response）只记录，不能误杀正常合成的句子。
+        """
+        if not isinstance(error, dict):
+            error = {"message": str(error)}
+        event_id = error.get("event_id")
+        with self.lock:
+            pending = [r for r in self.in_flight if not r["done"] and not r.get("cached")]
+            if event_id:
+                record = next((r for r in pending if r["event_id"] == event_id), None)
+            elif self._is_commit_rejection(error):
+                record = next((r for r in pending if r["item_id"] is None and r["sent"]), None)
+            else:
+                record = None
+            if record is None:
+                logger.warning(f'TTS 服务端错误（与在途 commit 无关，忽略）: {error}')
+                return
+            logger.warning(f'TTS 服务端错误，放弃句子「{record["sentence"]}」: {error}')
+            record["done"] = True
+            record["abandoned"] = True
+            record["speculative"] = False
+            self._release_chunks(record, play=False)
+            record["fill"] = None
+            record["cancel_sent"] = True  # 已失败的回复无需再取消，迟到的 delta 直接丢弃
+            self._advance()
+        self._after_progress()
+
+    @staticmethod
+    def _is_commit_rejection(error):
+        text = f'{error.get("param") or ""} {error.get("message") or ""}'
+        return "input_text_buffer" in text
+
+    def _advance(self):
+        """队首完成（且不是待确认的投机记录）后出队，并放出新队首已缓存的音频"""
+        while self.in_flight and self.in_flight[0]["done"] and not self.in_flight[0]["speculative"]:
+            finished = self.in_flight.popleft()
+            self.by_item.pop(finished["item_id"], None)
+            self.finished.append(finished["item_id"])
+            head = self.in_flight[0] if self.in_flight else None
+            if head is not None and not head["abandoned"] and not head["speculative"]:
+                self._release_chunks(head, play=True)
+
+    def _release_chunks(self, record, play):
+        """放出（play=True）或丢弃记录缓存的音频；缓存命中的 mmap 用完立即关闭，不留给 GC"""
+        for chunk in record["chunks"]:
+            if play:
+                self.pcm_sink(chunk)
+            if isinstance(chunk, mmap.mmap):
+                chunk.close()
+        record["chunks"].clear()
+
+    def _after_progress(self):
+        self.try_commit_next()
+        with self.lock:
+            idle = not self.in_flight
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def abandon_all(self):
+        """
+        放弃所有在途 commit：之后到达的音频一律丢弃，无需等待首个 delta 确认 item_id。
+        每个被放弃的回复在下一个 delta 到达时由回调线程发送 response.cancel，调用方不做任何网络操作。
+        """
+        with self.lock:
+            abandoned = [record["item_id"] for record in self.in_flight]
+            for record in self.in_flight:
+                if not record["abandoned"]:
+                    self._abandon(record)
+            self._advance()  # 尚未发出的记录已直接结束，立即出队
+            return abandoned
+
+    def _abandon(self, record):
+        record["abandoned"] = True
+        record["speculative"] = False
+        self._release_chunks(record, play=False)
+        record["fill"] = None
+        if not record["sent"]:
+            # 还在 outbox 里：不再发送，直接视为结束
+            self.outbox.remove(record)
+            record["done"] = True
+            record["cancel_sent"] = True
+        elif not record["done"]:
+            timer = threading.Timer(self.abandon_timeout, self._expire_abandoned, args=(record,))
+            timer.daemon = True
+            timer.start()
+
+    def _expire_abandoned(self, record):
+        with self.lock:
+            if record["done"] or record not in self.in_flight:
+                return
+            logger.info(f'被放弃的 commit 超时未结束，释放在途名额: {record["sentence"]}')
+            record["done"] = True
+            record["cancel_sent"] = True  # 迟到的 delta 直接丢弃，不再取消
+            self._advance()
+        self._after_progress()
+
+
+# =========================================
+# 多路混音
+# =========================================
+# 多个 StreamingTTS（多个角色 / 音色）共用一个输出设备：每路只提供取帧函数，
+# 混音器在唯一的 PortAudio 回调里逐路取帧、按增益相加并限幅，各路的调度与缓冲互不影响。
+
+class AudioMixer:
+    def __init__(self, audio=None, rate=SAMPLE_RATE, frame_ms=20):
+        self.frame_bytes = ms_to_bytes(frame_ms, rate)
+        self.sources = []       # [(name, pull, gain)]，增删时整体替换列表，回调线程无需加锁
+        self.pulled = {}        # name -> 取到的真实音频字节数
+        self.peak_voices = 0    # 同一帧内同时发声的最大路数
+        self.clipped_samples = 0
+        self._lock = threading.Lock()
+        self._frame = bytearray(self.frame_bytes)
+        self._mix = np.zeros(self.frame_bytes // BYTES_PER_SAMPLE, dtype=np.int32)
+        self._player = audio or pyaudio.PyAudio()
         self._stream = self._player.open(
-            format= pyaudio.paInt16, channels=1, rate=24000, output=True
+            format=pyaudio.paInt16, channels=1, rate=rate, output=True,
+            stream_callback=self.audio_callback,
+            frames_per_buffer=self.frame_bytes // BYTES_PER_SAMPLE, start=False
         )
+
+    def add_source(self, name, pull, gain=1.0):
+        """pull(frame) 把一帧写入 frame 并返回其中真实音频的字节数，须非阻塞"""
+        with self._lock:
+            self.sources = [s for s in self.sources if s[0] != name] + [(name, pull, gain)]
+            self.pulled.setdefault(name, 0)
+
+    def remove_source(self, name):
+        with self._lock:
+            self.sources = [s for s in self.sources if s[0] != name]
+
+    def start(self):
+        self._stream.start_stream()
+
+    def stop(self):
+        self._stream.stop_stream()
+
+    def audio_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio 回调：各路各取一帧，int32 累加后限幅回 int16"""
+        size = frame_count * BYTES_PER_SAMPLE
+        if len(self._frame) != size:
+            self._frame = bytearray(size)
+            self._mix = np.zeros(frame_count, dtype=np.int32)
+        self._mix[:] = 0
+        voices = 0
+        scaled = False
+        for name, pull, gain in self.sources:
+            got = pull(self._frame)
+            if not got:
+                continue
+            voices += 1
+            self.pulled[name] += got
+            samples = np.frombuffer(self._frame, dtype=np.int16)
+            if gain == 1.0:
+                self._mix += samples
+            else:
+                scaled = True
+                self._mix += (samples * gain).astype(np.int32)
+        # 单路且增益为 1 时不可能越界；多路相加或放大后必须限幅，否则转回 int16 会回绕成反相的爆音
+        if voices > 1 or scaled:
+            self.clipped_samples += int(np.count_nonzero((self._mix > 32767) | (self._mix < -32768)))
+            np.clip(self._mix, -32768, 32767, out=self._mix)
+        self.peak_voices = max(self.peak_voices, voices)
+        return self._mix.astype(np.int16).tobytes(), pyaudio.paContinue
+
+    def stats(self):
+        return {
+            "sources": [name for name, _, _ in self.sources],
+            "pulled_bytes": dict(self.pulled),
+            "peak_voices": self.peak_voices,
+            "clipped_samples": self.clipped_samples,
+        }
+
+
+# =========================================
+# TTS 回调
+# =========================================
+
+class MyCallback(QwenTtsRealtimeCallback):
+    def __init__(self, sentence_queue=None, audio=None, stream_callback=None, frames_per_buffer=None,
+                 open_stream=True):
+        # audio 为 PyAudio 或接口一致的替身（离线测试用）
+        self._player = None
+        self._stream = None
+        if open_stream:  # 混音模式下由 AudioMixer 持有输出设备
+            self._player = audio or pyaudio.PyAudio()
+            open_kwargs = {}
+            if stream_callback is not None:
+                # 回调模式：PortAudio 每需要一帧就调用 stream_callback 取数据，由 StreamingTTS.start 启动
+                open_kwargs = {"stream_callback": stream_callback, "frames_per_buffer": frames_per_buffer, "start": False}
+            self._stream = self._player.open(
+                format= pyaudio.paInt16, channels=1, rate=24000, output=True, **open_kwargs
+            )
         self.tts = None
         self.ifCanWrite = True
         self.pcm_buffer = None
         self.sentence_queue = sentence_queue
-        self.condition = threading.Condition()  # 保证串行
-        self.isAck = False  # 用于标记是否收到服务端的第一个delta事件
-        self.abandonedItemId = None  # 用于记录语音清空后，被放弃的itemId
-        self.currentItemId = None  # 用于记录已提交commit 的 对应回复的 itemId
+        self.scheduler = None  # CommitScheduler，由 StreamingTTS 设置
         
 
     def on_open(self):
@@ -99,48 +602,25 @@ class MyCallback(QwenTtsRealtimeCallback):
         print('[TTS] websocket closed')
 
     def on_event(self, response):
-        global tts_busy
         event_type = response['type']
-        # 音频chunk到达事件（一次commit的文本会触发多个delta事件）
-        if event_type == 'response.audio.delta':
-            audio_b64 = response['delta']
-            pcm_bytes = base64.b64decode(audio_b64)
-            with self.condition:
-                # 1.如果当前是第一个 delta 事件，则设置 currentItemId
-                if self.isAck == False:
-                    self.isAck = True
-                    self.currentItemId = response["item_id"]
-                    logger.info(f'首个delta事件触发，itemId: {response["item_id"]}')
-                    self.pcm_buffer.put(pcm_bytes)
-                    self.condition.notify_all()  # 唤醒等待的线程
-                else:
-                    # 2.如果当前不是第一个delta事件，需判断 abandonedItemId 是否设置并匹配
-                    # 如果匹配则不放入队列
-                    if self.abandonedItemId and response["item_id"] == self.abandonedItemId:
-                        logger.info(f'丢弃被放弃的itemId的delta事件，itemId: {response["item_id"]}')
-                    else:
-                        # 3.当前不是第一个delta事件，但itemId正常，则放入队列
-                        self.pcm_buffer.put(pcm_bytes)
+        # 服务端确认 commit，按提交顺序绑定 item_id
+        if event_type == 'input_text_buffer.committed':
+            self.scheduler.on_committed(response["item_id"])
 
-            
-            # print(f'[Audio] recv {len(pcm_bytes)} bytes')if self.ifCanWrite:self._stream.write(pcm_bytes)
+        # 音频chunk到达事件（一次commit的文本会触发多个delta事件）
+        elif event_type == 'response.audio.delta':
+            pcm_bytes = base64.b64decode(response['delta'])
+            self.scheduler.on_delta(response["item_id"], pcm_bytes)
         
-        # 某个commit的chunk流结束
+        # 某个commit的chunk流结束，空出在途名额后自动提交下一句
         elif event_type == 'response.done':
-            # print('[TTS] response done')
-            # 当前response结束
-
-            # 避免没有delta事件，做一个兜底
-            with self.condition:
-                if self.isAck == False:
-                    self.isAck = True
-                    logger.info(f'没有delta事件，直接触发done事件，response: {response}')
-                    self.condition.notify_all()  # 唤醒等待的线程
+            output_list = response.get('response', {}).get('output')
+            item_id = output_list[0].get('id') if output_list and isinstance(output_list, list) else None
+            self.scheduler.on_done(item_id)
 
-            tts_busy = False
-            logger.info('尝试提交下一句')
-            # 自动触发下一句
-            try_commit_next(self.tts, self.sentence_queue, self)
+        # commit 被拒绝等错误：不会再有 response.done，由调度器结束对应记录
+        elif event_type == 'error':
+            self.scheduler.on_error(response.get('error', response))
 
     def print_itemId_eventId(self, response, event_type):
         
@@ -165,20 +645,57 @@ class MyCallback(QwenTtsRealtimeCallback):
 
 class StreamingTTS():
     # 初始化环境
-    def __init__(self,model=DEFAULT_TARGET_MODEL, url='wss://dashscope.aliyuncs.com/api-ws/v1/realtime'):
+    def __init__(self,model=DEFAULT_TARGET_MODEL, url='wss://dashscope.aliyuncs.com/api-ws/v1/realtime', audio=None,
+                 segmenter=None, max_in_flight=1, pcm_buffer=None, output_mode="blocking", mixer=None, name=None,
+                 gain=1.0, cache=None, speech_rate=1, speculate_after=None, speculate_min_chars=4, tracer=None,
+                 abandon_timeout=3.0):
         init_dashscope_api_key()
         self.sentence_queue = queue.Queue()
-        self.callback = MyCallback(sentence_queue=self.sentence_queue)
+        # 定长 PCM 环形缓冲，jitter_ms 为开始播放前至少攒够的音频时长
+        self.pcm_buffer = pcm_buffer or PcmRingBuffer()
+        # blocking: 写线程逐帧阻塞写入；callback: PortAudio 回调里直接从环形缓冲取帧，暂停 / 清空在一帧内生效；
+        # mixer: 不单独打开设备，由共享的 AudioMixer 在它的回调里取帧，多个角色可同时发声
+        self.mixer = mixer
+        self.name = name or "tts_" + uuid.uuid4().hex[:8]
+        self.gain = gain
+        self.output_mode = "mixer" if mixer is not None else output_mode
+        if self.mixer is not None:
+            self.callback = MyCallback(sentence_queue=self.sentence_queue, open_stream=False)
+        elif output_mode == "callback":
+            self._callback_frame = bytearray(self.pcm_buffer.frame_bytes)
+            self.callback = MyCallback(sentence_queue=self.sentence_queue, audio=audio,
+                                       stream_callback=self.audio_callback,
+                                       frames_per_buffer=self.pcm_buffer.frame_bytes // BYTES_PER_SAMPLE)
+        else:
+            self.callback = MyCallback(sentence_queue=self.sentence_queue, audio=audio)
         self.tts = QwenTtsRealtime(
             model=model,
             callback=self.callback,
             url=url
         )
         self.callback.tts = self.tts
-        self.pcm_buffer = queue.Queue()
         self.callback.pcm_buffer = self.pcm_buffer
-        self.currentSentence = ""  # 用于缓存当前正在生成的句子
-        self.currentSentenceCondition = threading.Condition()  # 用于保护 currentSentence 的访问
+        # 同时在服务端合成的 commit 数，1 即改造前的逐句提交
+        self.scheduler = CommitScheduler(self.sentence_queue, self.pcm_buffer.write, max_in_flight,
+                                         on_idle=self.pcm_buffer.end_segment, abandon_timeout=abandon_timeout)
+        self.scheduler.tts = self.tts
+        # 本地 PCM 缓存（tts_cache.PcmCache），可在多个实例间共享；命中的句子不再走实时合成
+        self.model = model
+        self.speech_rate = speech_rate
+        self.scheduler.cache = cache
+        self.callback.scheduler = self.scheduler
+        self.segmenter = segmenter or SentenceSegmenter()  # 缓存尚未断句的文本
+        self.currentSentenceCondition = threading.Condition()  # 用于保护 segmenter、speculation 与 generation 的访问
+        # 每次清空语音加一：断句时记下当时的值，清空之后才提交的旧句子据此丢弃
+        self.generation = 0
+        # 投机合成：未断句的文本稳定 speculate_after 秒（远短于 idle_timeout）后先行提交，
+        # 之后断出的片段与之相同则保留音频，LLM 继续续写则丢弃；None 关闭
+        self.speculate_after = speculate_after
+        self.speculate_min_chars = speculate_min_chars
+        self.speculation = None
+        # latency_trace.TurnTracer：记录首句提交、首个音频 delta 与扬声器首次出声
+        self.tracer = tracer
+        self.scheduler.tracer = tracer
 
     # 读取本地文件的voice_id，与云端建立websockt连接，并上传音色参数voice_id
     def start(self, voice_name=VOICE_NAME):
@@ -190,42 +707,181 @@ class StreamingTTS():
             voice=voice_id,
             response_format=AudioFormat.PCM_24000HZ_MONO_16BIT,
             mode='commit',
-            speech_rate=1
+            speech_rate=self.speech_rate
         )
-        # 3. 启动发送线程
-        self.writer = threading.Thread(target=self.write_loop, daemon=True)
-        self.writer.start()
+        self.scheduler.cache_voice = (voice_id, self.model, self.speech_rate)
+        # 3. 启动播放：混音模式向混音器登记本路，回调模式启动音频流，阻塞模式启动写线程
+        if self.output_mode == "mixer":
+            self.mixer.add_source(self.name, self.pull_frame, self.gain)
+        elif self.output_mode == "callback":
+            self.callback._stream.start_stream()
+        else:
+            self.writer = threading.Thread(target=self.write_loop, daemon=True)
+            self.writer.start()
+        # 4. 启动空闲断句线程：LLM 停顿超过 idle_timeout 时提交剩余文本
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
 
 
     def write_loop(self):
+        # 按固定帧长从环形缓冲取数据，帧缓冲复用，不再为每个 delta 单独写一次
+        frame = bytearray(self.pcm_buffer.frame_bytes)
+        silence = bytes(len(frame))
         while True:
             try:
-                if self.callback.ifCanWrite:
-                    pcm_bytes = self.pcm_buffer.get(timeout=0.5)
-                    self.callback._stream.write(pcm_bytes)
-                else:
-                    time.sleep(0.2)
-            except queue.Empty:
-                continue
+                if not self.callback.ifCanWrite:
+                    # 暂停：缓冲保留，写静音帧维持设备节奏，恢复后下一帧即生效
+                    self.callback._stream.write(silence)
+                    continue
+                if not self.pcm_buffer.available() and not self.pcm_buffer.playing:
+                    # 空闲：先清事件再复查，避免清除前刚写入的数据被漏掉
+                    self.pcm_buffer.data_event.clear()
+                    if not self.pcm_buffer.available():
+                        self.pcm_buffer.data_event.wait(0.5)
+                    continue
+                # 抖动缓冲未攒够或播放途中放空时 read_into 返回（部分）静音帧，同样按设备节奏写出
+                got = self.pcm_buffer.read_into(frame)
+                if got and self.tracer:
+                    self.tracer.mark("first_audio")
+                self.callback._stream.write(bytes(frame))
             except Exception as e:
                 print(f"[WriteLoop error] {e}")
                 break
 
     
         
-    # tts 是否要加global
+    def audio_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio 回调：每次恰好取 frame_count 个采样，暂停时输出静音，不做任何阻塞操作"""
+        size = frame_count * BYTES_PER_SAMPLE
+        if len(self._callback_frame) != size:
+            self._callback_frame = bytearray(size)
+        self.pull_frame(self._callback_frame)
+        return bytes(self._callback_frame), pyaudio.paContinue
+
+    def pull_frame(self, frame):
+        """取一帧写入 frame（暂停时为静音），返回其中真实音频的字节数；供音频回调与 AudioMixer 调用"""
+        if not self.callback.ifCanWrite:
+            frame[:] = bytes(len(frame))
+            return 0
+        got = self.pcm_buffer.read_into(frame)
+        if got and self.tracer:
+            self.tracer.mark("first_audio")
+        return got
+
+    def pause(self):
+        """暂停播放，缓冲保留"""
+        self.callback.ifCanWrite = False
+
+    def resume(self):
+        self.callback.ifCanWrite = True
+
     def process_llm_chunk(self, chunk):
+        # 增量断句：只扫描新字符，句中任意位置的标点都能断开
+        stale = None
+        with self.currentSentenceCondition:
+            sentences = self.segmenter.feed(chunk)
+            generation = self.generation
+            if not sentences and self.speculation is not None and \
+                    clause_core(self.segmenter.buffer) != clause_core(self.speculation["sentence"]):
+                # LLM 仍在续写这一句，投机文本不可能是完整片段，尽早丢弃以空出名额
+                stale, self.speculation = self.speculation, None
+            self.currentSentenceCondition.notify_all()  # 唤醒空闲断句线程重新计时
+        if stale is not None:
+            self.scheduler.discard(stale)
+        for sentence in sentences:
+            self.commit_sentence(sentence, generation)
+
+    def commit_sentence(self, sentence, generation=None):
+        """generation 为断句时的 self.generation；期间发生过清空（打断）则丢弃该句"""
+        if self.tracer:
+            self.tracer.mark("sentence_commit")
+        with self.currentSentenceCondition:
+            if generation is not None and generation != self.generation:
+                logger.info(f'清空之前断出的句子，不再提交: {sentence}')
+                return
+            speculation, self.speculation = self.speculation, None
+            reuse = speculation is not None and clause_core(sentence) == clause_core(speculation["sentence"])
+            if not reuse:
+                # 检查 generation 与入队在同一把锁内，clear() 无法插在两者之间
+                self.sentence_queue.put(sentence)
+        if speculation is not None:
+            if reuse:
+                self.scheduler.confirm(speculation)
+                return
+            self.scheduler.discard(speculation)
+        # 尝试提交
+        self.scheduler.try_commit_next()
+
+    def flush_pending(self):
+        """LLM 流结束：立即提交尚未断句的剩余文本"""
+        with self.currentSentenceCondition:
+            sentence = self.segmenter.flush()
+            generation = self.generation
+        if sentence:
+            self.commit_sentence(sentence, generation)
+
+    def clear(self):
+        """清空待播语音：丢弃待提交句子、放弃在途 commit、清空待播放 PCM，不阻塞等待服务端"""
+        with self.currentSentenceCondition:
+            self.generation += 1
+            clear_queue_safely(self.sentence_queue)
+        abandoned = self.scheduler.abandon_all()
+        logger.info(f'清空语音，放弃在途 commit: {abandoned}')
+        self.pcm_buffer.clear()
+
+    def interrupt(self):
+        """
+        打断（barge-in）：立即静音并丢弃本轮全部语音，服务端正在合成的回复随后被取消。
+        只做内存操作，可在 UI / 键盘线程直接调用，不会阻塞。
+        """
+        self.reset_text()
+        self.clear()
+
+    def reset_text(self):
+        """丢弃尚未断句的文本（清空语音、开始新一轮对话时调用）"""
         with self.currentSentenceCondition:
-            self.currentSentence += chunk
-        # 断句
-        if is_sentence_end(self.currentSentence):
+            self.segmenter.flush()
+            speculation, self.speculation = self.speculation, None
+        if speculation is not None:
+            self.scheduler.discard(speculation)
+
+    def flush_loop(self):
+        while True:
+            sentence = None
+            speculated = False
             with self.currentSentenceCondition:
-                sentence = self.currentSentence.strip()
-                self.currentSentence = ""
-            self.sentence_queue.put(sentence)
-            # print(f'[Queue] add sentence: {sentence}')
-            # 尝试提交
-            try_commit_next(self.tts, self.sentence_queue, self.callback)
+                # 没有待断句文本时一直等待，有文本时等到空闲超时
+                while not self.segmenter.buffer.strip():
+                    self.currentSentenceCondition.wait()
+                quiet = time.monotonic() - self.segmenter.last_feed
+                remaining = self.segmenter.idle_timeout - quiet
+                if self.speculate_after is not None and self.speculation is None:
+                    if quiet >= self.speculate_after:
+                        speculated = self.try_speculate()
+                    else:
+                        remaining = min(remaining, self.speculate_after - quiet)
+                if remaining <= 0:
+                    sentence = self.segmenter.flush()
+                    generation = self.generation
+                elif not speculated:
+                    self.currentSentenceCondition.wait(remaining)
+            if speculated:
+                # 投机 commit 在锁外发送，连接卡住时不影响断句与打断
+                self.scheduler.send_pending()
+            if sentence:
+                logger.info(f'空闲超时，提交剩余文本: {sentence}')
+                self.commit_sentence(sentence, generation)
+
+    def try_speculate(self):
+        """在 currentSentenceCondition 内调用：把稳定下来的未断句文本登记为投机 commit，返回是否登记"""
+        text = self.segmenter.buffer.strip()
+        if len(clause_core(text)) < self.speculate_min_chars:
+            return False
+        self.speculation = self.scheduler.speculate(text)
+        if self.speculation is None:
+            return False
+        logger.info(f'投机合成: {text}')
+        return True
 
     def finish(self):
         self.tts.finish()
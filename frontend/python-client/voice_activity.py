@@ -0,0 +1,126 @@
+from collections import deque
+
+import numpy as np
+
+
+# =========================================
+# 本地语音活动检测（VAD）
+# =========================================
+# 位于麦克风回调与上传之间：只有判定为语音的音频才发往云端，静音不再占用上行带宽；
+# 语音结束后经过 hangover_ms 的静音即判定一句话结束，可以立即本地 commit，
+# 不必等服务端固定的静音阈值。能量按帧用 NumPy 一次算完，状态机只遍历每块里的几帧。
+
+class EnergyVad:
+    """
+    基于短时能量 + 自适应噪声底的 VAD，输入 16bit 单声道 PCM。
+    feed() 返回事件列表，元素为 (kind, payload)：
+        ("start", None)  语音开始（可用于打断 TTS）
+        ("audio", bytes) 应上传的音频，含开头的 pre_roll 与句尾 hangover 内的静音
+        ("end", None)    语音结束，可立即 commit
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, margin_db=12.0, min_speech_db=-50.0,
+                 start_ms=60, hangover_ms=400, pre_roll_ms=200, noise_adapt=0.05, speech_adapt=0.002):
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db          # 高于噪声底多少 dB 视为语音
+        self.min_speech_db = min_speech_db  # 语音帧能量下限（dBFS），避免安静环境里把底噪当语音
+        self.start_frames = max(1, start_ms // frame_ms)        # 连续多少个语音帧才算开口
+        self.hangover_frames = max(1, hangover_ms // frame_ms)  # 连续多少个静音帧才算说完
+        self.noise_adapt = noise_adapt      # 噪声底在静音帧上的跟随速度
+        # 语音帧上也以很慢的速度跟随（20ms 帧时约 10 秒时间常数）：正常说话只把噪声底抬高几 dB，
+        # 但背景噪声突然变大（风扇、空调启动）时噪声底最终会追上，不会把之后的所有帧都当成语音、永远不结束
+        self.speech_adapt = speech_adapt
+        self.noise_db = -60.0
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._remainder = b""
+        self._pre_roll = deque(maxlen=max(self.start_frames, pre_roll_ms // frame_ms))
+
+        # 统计
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+        self.segments = 0
+
+    def frame_energies(self, pcm):
+        """每帧能量（dBFS），pcm 长度需为帧长整数倍"""
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.frame_bytes // 2).astype(np.float32)
+        power = np.mean(samples * samples, axis=1) / (32768.0 * 32768.0)
+        return 10.0 * np.log10(power + 1e-10)
+
+    def feed(self, chunk):
+        data = self._remainder + bytes(chunk)
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return []
+
+        events = []
+        pending = []  # 本块内连续待上传的帧，合并成一次 audio 事件
+        energies = self.frame_energies(data[:usable])
+        for index, energy in enumerate(energies.tolist()):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            voiced = energy > max(self.noise_db + self.margin_db, self.min_speech_db)
+            if voiced:
+                self.speech_frames += 1
+                self.noise_db += (energy - self.noise_db) * self.speech_adapt
+            else:
+                self.silence_frames += 1
+                self.noise_db += (energy - self.noise_db) * self.noise_adapt
+
+            if not self.in_speech:
+                self._voiced_run = self._voiced_run + 1 if voiced else 0
+                if self._voiced_run < self.start_frames:
+                    if len(self._pre_roll) == self._pre_roll.maxlen:
+                        self.dropped_bytes += len(self._pre_roll[0])
+                    self._pre_roll.append(frame)
+                    continue
+                # 开口：补发 pre_roll 中的帧，避免吞掉第一个字的起音
+                self.in_speech = True
+                self._silent_run = 0
+                self.segments += 1
+                events.append(("start", None))
+                pending.extend(self._pre_roll)
+                self._pre_roll.clear()
+                pending.append(frame)
+                continue
+
+            pending.append(frame)
+            self._silent_run = 0 if voiced else self._silent_run + 1
+            if self._silent_run >= self.hangover_frames:
+                self.in_speech = False
+                self._voiced_run = 0
+                self._flush(events, pending)
+                events.append(("end", None))
+        self._flush(events, pending)
+        return events
+
+    def _flush(self, events, pending):
+        if pending:
+            audio = b"".join(pending)
+            self.sent_bytes += len(audio)
+            events.append(("audio", audio))
+            pending.clear()
+
+    def reset(self):
+        """丢弃未决状态（如 PTT 手动 commit 之后），噪声底保留"""
+        self.in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._remainder = b""
+        self.dropped_bytes += sum(len(frame) for frame in self._pre_roll)
+        self._pre_roll.clear()
+
+    def stats(self):
+        total = self.speech_frames + self.silence_frames
+        return {
+            "speech_ratio": self.speech_frames / total if total else 0.0,
+            "silence_ratio": self.silence_frames / total if total else 0.0,
+            "sent_bytes": self.sent_bytes,
+            "dropped_bytes": self.dropped_bytes,
+            "segments": self.segments,
+            "noise_db": self.noise_db,
+        }